@@ -0,0 +1,85 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import importlib
+
+# Classes are loaded from their modules on first access, so importing the package, or
+# a single device module, does not import every device module or the Phidget22 library:
+#
+#   import phidgets_python_api
+#   stepper = phidgets_python_api.Stepper(phidgets_python_api.StepperInfo(), 'stepper', logger)
+
+_LAZY_ATTRIBUTES = {
+    'Phidget': 'phidget',
+    'PhidgetInfo': 'phidget',
+    'Stepper': 'stepper',
+    'StepperInfo': 'stepper',
+    'DigitalInput': 'digital_input',
+    'DigitalInputInfo': 'digital_input',
+    'DigitalOutput': 'digital_output',
+    'DigitalOutputInfo': 'digital_output',
+    'VoltageRatioInput': 'voltage_ratio_input',
+    'VoltageRatioInputInfo': 'voltage_ratio_input',
+    'VoltageRatioInputGroup': 'voltage_ratio_input_group',
+    'VoltageRatioInputGroupInfo': 'voltage_ratio_input_group',
+    'StepperJoint': 'stepper_joint',
+    'StepperJointInfo': 'stepper_joint',
+    'StepperJointGroup': 'stepper_joint_group',
+    'StepperJointGroupInfo': 'stepper_joint_group',
+    'LedHub': 'led_hub',
+    'LedHubInfo': 'led_hub',
+    'LedPatternSequencer': 'led_hub',
+    'StepperTrajectory': 'stepper_trajectory',
+    'PositionTriggerTable': 'position_trigger_table',
+    'LoadCellCalibration': 'load_cell_calibration',
+    'LoadCellCalibrationStore': 'load_cell_calibration',
+    'DeviceManager': 'device_manager',
+    'DeviceDiscovery': 'device_discovery',
+    'ReconnectSupervisor': 'reconnect_supervisor',
+    'EventCoalescer': 'event_coalescer',
+    'EventRecorder': 'event_recorder',
+    'EventReplay': 'event_replay',
+    'DigitalOutputScheduler': 'digital_output_scheduler',
+    'PhidgetSimulator': 'simulator',
+    'RigConfigError': 'rig_config',
+    'load_rig_config': 'rig_config',
+    'get_backend': 'backend',
+    'set_backend': 'backend',
+}
+
+__all__ = sorted(_LAZY_ATTRIBUTES)
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError('module {0!r} has no attribute {1!r}'.format(__name__, name))
+    value = getattr(importlib.import_module('.' + module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,235 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import asyncio
+import collections
+import functools
+import threading
+import time
+
+from phidgets_python_api.stepper_joint import HOMING_FAILED, HOMING_HOMED, HOMING_IDLE
+
+# asyncio front-end for the callback driven device classes. Phidget22 events are
+# marshalled into the running loop with call_soon_threadsafe, and blocking device
+# calls run in the loop's default executor so the loop itself never waits on USB.
+
+class EventQueue():
+    # the Phidget22 event threads cannot wait for the consumer, so when the queue
+    # is full the oldest event is dropped and counted on the event thread, and at
+    # most one wakeup is scheduled on the loop at a time, so memory stays bounded
+    def __init__(self, loop, maxsize):
+        self._loop = loop
+        self._items = collections.deque(maxlen=maxsize)
+        self._lock = threading.Lock()
+        self._wakeup_scheduled = False
+        self._waiter = None
+        self.dropped_count = 0
+
+    def put_threadsafe(self, item):
+        with self._lock:
+            if len(self._items) == self._items.maxlen:
+                self.dropped_count += 1
+            self._items.append(item)
+            if self._wakeup_scheduled:
+                return
+            self._wakeup_scheduled = True
+        self._loop.call_soon_threadsafe(self._wakeup)
+
+    def _wakeup(self):
+        with self._lock:
+            self._wakeup_scheduled = False
+        _set_future_result(self._waiter, None)
+
+    def qsize(self):
+        return len(self._items)
+
+    async def get(self):
+        while True:
+            with self._lock:
+                if self._items:
+                    return self._items.popleft()
+            self._waiter = self._loop.create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+
+def _set_future_result(future, result):
+    if (future is not None) and (not future.done()):
+        future.set_result(result)
+
+def _set_future_exception(future, exception):
+    if not future.done():
+        future.set_exception(exception)
+
+async def _run_in_executor(function, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(function, *args))
+
+# installs handler alongside the handler already set, which keeps being called first,
+# and puts the previous handler back on exit unless the handler was replaced meanwhile
+class _ChainedHandler():
+    def __init__(self, get_handler, set_handler, handler):
+        self._get_handler = get_handler
+        self._set_handler = set_handler
+        self._handler = handler
+
+    def __enter__(self):
+        self._previous_handler = self._get_handler()
+        previous_handler = self._previous_handler
+        handler = self._handler
+        if previous_handler is None:
+            self._installed_handler = handler
+        else:
+            def chained_handler(*args):
+                previous_handler(*args)
+                handler(*args)
+            self._installed_handler = chained_handler
+        self._set_handler(self._installed_handler)
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        if self._get_handler() is self._installed_handler:
+            self._set_handler(self._previous_handler)
+
+class AsyncStepper:
+    def __init__(self, stepper):
+        self.stepper = stepper
+
+    # returns once the stepper stops, at the target position or where the soft limits
+    # clamped it, or earlier when it is stopped
+    async def move_to(self, target_position):
+        loop = asyncio.get_running_loop()
+        stopped = loop.create_future()
+        on_stopped_handler = lambda handle: loop.call_soon_threadsafe(_set_future_result, stopped, handle)
+        with _ChainedHandler(self.stepper.get_on_stopped_handler, self.stepper.set_on_stopped_handler, on_stopped_handler):
+            target_position = await _run_in_executor(self._start_move, target_position)
+            if (not await _run_in_executor(self.stepper.is_moving)) and (await _run_in_executor(self.stepper.get_position) == target_position):
+                _set_future_result(stopped, None)
+            await stopped
+
+    # returns the target position after soft limit clamping
+    def _start_move(self, target_position):
+        self.stepper.set_step_control_mode()
+        self.stepper.set_velocity_limit(self.stepper.stepper_info.velocity_limit)
+        self.stepper.set_target_position(target_position)
+        return self.stepper.get_target_position()
+
+    async def stop(self):
+        await _run_in_executor(self.stepper.stop)
+
+    async def get_position(self):
+        return await _run_in_executor(self.stepper.get_position)
+
+    # yields positions as they change, oldest positions are dropped if the consumer falls behind
+    async def positions(self, maxsize=64):
+        event_queue = EventQueue(asyncio.get_running_loop(), maxsize)
+        direction = self.stepper._direction
+        on_position_change_handler = lambda handle, position: event_queue.put_threadsafe(direction * position)
+        with _ChainedHandler(self.stepper.get_on_position_change_handler, self.stepper.set_on_position_change_handler, on_position_change_handler):
+            while True:
+                yield await event_queue.get()
+
+class AsyncStepperJoint(AsyncStepper):
+    def __init__(self, stepper_joint):
+        super().__init__(stepper_joint.stepper)
+        self.stepper_joint = stepper_joint
+
+    # raises RuntimeError when homing fails or is cancelled
+    async def home(self):
+        loop = asyncio.get_running_loop()
+        homed = loop.create_future()
+
+        def on_homing_phase_handler(handle, homing_phase):
+            if homing_phase == HOMING_HOMED:
+                loop.call_soon_threadsafe(_set_future_result, homed, handle)
+            elif homing_phase in (HOMING_FAILED, HOMING_IDLE):
+                loop.call_soon_threadsafe(_set_future_exception, homed, RuntimeError('{0} homing {1}'.format(self.stepper_joint.name, homing_phase)))
+
+        with _ChainedHandler(self.stepper_joint.get_on_homing_phase_handler, self.stepper_joint.set_on_homing_phase_handler, on_homing_phase_handler):
+            await _run_in_executor(self.stepper_joint.home)
+            await homed
+
+class AsyncDigitalInput:
+    def __init__(self, digital_input):
+        self.digital_input = digital_input
+
+    async def get_state(self):
+        return await _run_in_executor(self.digital_input.get_state)
+
+    async def wait_for(self, state):
+        loop = asyncio.get_running_loop()
+        reached = loop.create_future()
+
+        def on_state_change_handler(handle, new_state):
+            if new_state == state:
+                loop.call_soon_threadsafe(_set_future_result, reached, new_state)
+
+        with _ChainedHandler(self.digital_input.get_on_state_change_handler, self.digital_input.set_on_state_change_handler, on_state_change_handler):
+            if await _run_in_executor(self.digital_input.get_state) == state:
+                return state
+            return await reached
+
+    # yields (timestamp, state) for every state change
+    async def states(self, maxsize=64):
+        event_queue = EventQueue(asyncio.get_running_loop(), maxsize)
+        on_state_change_handler = lambda handle, state: event_queue.put_threadsafe((time.monotonic(), state))
+        with _ChainedHandler(self.digital_input.get_on_state_change_handler, self.digital_input.set_on_state_change_handler, on_state_change_handler):
+            while True:
+                yield await event_queue.get()
+
+class AsyncDigitalOutput:
+    def __init__(self, digital_output):
+        self.digital_output = digital_output
+
+    async def get_state(self):
+        return await _run_in_executor(self.digital_output.get_state)
+
+    async def set_state(self, state):
+        await _run_in_executor(self.digital_output.set_state, state)
+
+    async def activate(self):
+        await _run_in_executor(self.digital_output.activate)
+
+    async def deactivate(self):
+        await _run_in_executor(self.digital_output.deactivate)
+
+class AsyncVoltageRatioInput:
+    def __init__(self, voltage_ratio_input):
+        self.voltage_ratio_input = voltage_ratio_input
+
+    async def get_voltage_ratio(self):
+        return await _run_in_executor(self.voltage_ratio_input.get_voltage_ratio)
+
+    # yields (timestamp, voltage_ratio), after any voltage ratio filter that is set
+    async def samples(self, maxsize=1024):
+        event_queue = EventQueue(asyncio.get_running_loop(), maxsize)
+        on_voltage_ratio_change_handler = lambda handle, voltage_ratio: event_queue.put_threadsafe((time.monotonic(), voltage_ratio))
+        with _ChainedHandler(self.voltage_ratio_input.get_on_voltage_ratio_change_handler,
+                             self.voltage_ratio_input.set_on_voltage_ratio_change_handler, on_voltage_ratio_change_handler):
+            while True:
+                yield await event_queue.get()
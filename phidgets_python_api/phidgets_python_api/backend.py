@@ -0,0 +1,56 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import importlib
+import time
+
+# Channel handles are created through the current backend, so the device classes
+# can run against the Phidget22 library or against phidgets_python_api.simulator.
+
+class Phidget22Backend():
+    def create_handle(self, channel_class_name):
+        module = importlib.import_module('Phidget22.Devices.' + channel_class_name)
+        return getattr(module, channel_class_name)()
+
+    def create_manager(self):
+        import Phidget22.Manager
+        return Phidget22.Manager.Manager()
+
+    def monotonic(self):
+        return time.monotonic()
+
+_backend = Phidget22Backend()
+
+def get_backend():
+    return _backend
+
+# backend is any object with create_handle(channel_class_name), create_manager() if
+# DeviceDiscovery is used, and optionally monotonic(), the clock devices timestamp
+# events with (time.monotonic() otherwise), set it before constructing devices
+def set_backend(backend):
+    global _backend
+    _backend = backend
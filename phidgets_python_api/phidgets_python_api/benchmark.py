@@ -0,0 +1,375 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import argparse
+import json
+import logging
+import platform
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+
+from phidgets_python_api import backend
+from phidgets_python_api.device_manager import DeviceManager
+from phidgets_python_api.instrumentation import LatencyHistogram
+from phidgets_python_api.simulator import PhidgetSimulator
+
+# Benchmarks of the device classes against PhidgetSimulator, results are JSON so
+# they can be compared between releases:
+#
+#   python3 -m phidgets_python_api.benchmark --output benchmark.json
+
+def _latency_statistics(histogram):
+    return {'count': histogram.count,
+            'mean': histogram.total / max(histogram.count, 1) * 1e-9,
+            'p50': histogram.percentile(0.5) * 1e-9,
+            'p99': histogram.percentile(0.99) * 1e-9,
+            'max': histogram.max * 1e-9}
+
+class _SimulatorContext():
+    def __init__(self, time_scale=1.0):
+        self.simulator = PhidgetSimulator(time_scale)
+        self._previous_backend = None
+
+    def __enter__(self):
+        self._previous_backend = backend.get_backend()
+        backend.set_backend(self.simulator)
+        self.simulator.attach_delay = 0
+        self.simulator.start()
+        return self.simulator
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.simulator.stop()
+        backend.set_backend(self._previous_backend)
+
+def _open_all(devices, logger):
+    device_manager = DeviceManager(logger)
+    [device_manager.add_device(device) for device in devices]
+    report = device_manager.open_all(5.0)
+    if report['missing']:
+        raise RuntimeError('channels did not attach: {0}'.format(report['missing']))
+    return device_manager
+
+# events per second delivered to on_voltage_ratio_change_handler with every channel at
+# the minimum data interval, time_scale raises the demanded event rate past what the
+# simulator and handlers can sustain
+def benchmark_voltage_ratio_input_throughput(channel_count=4, duration=1.0, time_scale=10.0, logger=None):
+    if logger is None:
+        logger = logging.getLogger(__name__)
+    from phidgets_python_api.voltage_ratio_input import VoltageRatioInput, VoltageRatioInputInfo
+    with _SimulatorContext(time_scale) as simulator:
+        event_counts = [0] * channel_count
+        voltage_ratio_inputs = []
+        for channel in range(channel_count):
+            voltage_ratio_input_info = VoltageRatioInputInfo()
+            voltage_ratio_input_info.phidget_info.channel = channel
+            voltage_ratio_input_info.data_interval = simulator.min_data_interval
+            voltage_ratio_input = VoltageRatioInput(voltage_ratio_input_info, 'voltage_ratio_input_' + str(channel), logger)
+
+            def on_voltage_ratio_change_handler(handle, voltage_ratio, channel=channel):
+                event_counts[channel] += 1
+            voltage_ratio_input.set_on_voltage_ratio_change_handler(on_voltage_ratio_change_handler)
+            voltage_ratio_inputs.append(voltage_ratio_input)
+        device_manager = _open_all(voltage_ratio_inputs, logger)
+        time.sleep(0.1)
+        start_counts = sum(event_counts)
+        start_time = time.monotonic()
+        time.sleep(duration)
+        event_count = sum(event_counts) - start_counts
+        elapsed = time.monotonic() - start_time
+        device_manager.close_all()
+    demanded_rate = channel_count * time_scale * 1000.0 / simulator.min_data_interval
+    return {'channel_count': channel_count,
+            'events_per_second': event_count / elapsed,
+            'demanded_events_per_second': demanded_rate}
+
+# events per second delivered to on_position_change_handler with steppers running
+# continuously in velocity control mode
+def benchmark_stepper_position_change_throughput(stepper_count=4, duration=1.0, time_scale=10.0, logger=None):
+    if logger is None:
+        logger = logging.getLogger(__name__)
+    from phidgets_python_api.stepper import Stepper, StepperInfo
+    with _SimulatorContext(time_scale) as simulator:
+        event_counts = [0] * stepper_count
+        steppers = []
+        for hub_port in range(stepper_count):
+            stepper_info = StepperInfo()
+            stepper_info.phidget_info.hub_port = hub_port
+            stepper_info.data_interval = simulator.min_data_interval
+            stepper = Stepper(stepper_info, 'stepper_' + str(hub_port), logger)
+
+            def on_position_change_handler(handle, position, hub_port=hub_port):
+                event_counts[hub_port] += 1
+            stepper.set_on_position_change_handler(on_position_change_handler)
+            steppers.append(stepper)
+        device_manager = _open_all(steppers, logger)
+        for stepper in steppers:
+            stepper.set_velocity_control_mode()
+            stepper.set_velocity_limit(stepper.stepper_info.velocity_limit)
+        time.sleep(0.1)
+        start_counts = sum(event_counts)
+        start_time = time.monotonic()
+        time.sleep(duration)
+        event_count = sum(event_counts) - start_counts
+        elapsed = time.monotonic() - start_time
+        device_manager.close_all()
+    demanded_rate = stepper_count * time_scale * 1000.0 / simulator.min_data_interval
+    return {'stepper_count': stepper_count,
+            'events_per_second': event_count / elapsed,
+            'demanded_events_per_second': demanded_rate}
+
+# time from a home switch state change event to the Stepper.stop() call made by
+# StepperJoint._home_switch_handler
+def benchmark_home_switch_stop_latency(iterations=200, logger=None):
+    if logger is None:
+        logger = logging.getLogger(__name__)
+    from phidgets_python_api.stepper_joint import StepperJoint, StepperJointInfo
+    with _SimulatorContext() as simulator:
+        stepper_joint_info = StepperJointInfo()
+        stepper_joint_info.home_switch_info.phidget_info.hub_port = 1
+        stepper_joint_info.stepper_info.data_interval = simulator.min_data_interval
+        stepper_joint_info.stepper_info.acceleration = 1e6
+        # the simulated switch stays active, so latch at the end of the fast approach
+        stepper_joint_info.home_creep_velocity_limit = None
+        stepper_joint = StepperJoint(stepper_joint_info, 'stepper_joint', logger)
+        device_manager = _open_all([stepper_joint], logger)
+        stepper_handle = stepper_joint.stepper._stepper_handle
+        home_switch_handle = stepper_joint.home_switch._digital_input_handle
+        home_switch_handle = getattr(home_switch_handle, '_handle', home_switch_handle)
+        raw_stepper_handle = getattr(stepper_handle, '_handle', stepper_handle)
+
+        histogram = LatencyHistogram()
+        stop_times = []
+        set_velocity_limit = raw_stepper_handle.setVelocityLimit
+
+        def timed_set_velocity_limit(velocity_limit):
+            if velocity_limit == 0.0:
+                stop_times.append(time.perf_counter_ns())
+            set_velocity_limit(velocity_limit)
+        raw_stepper_handle.setVelocityLimit = timed_set_velocity_limit
+
+        homed = threading.Event()
+        stepper_joint.set_on_homed_handler(lambda handle: homed.set())
+        for iteration in range(iterations):
+            homed.clear()
+            home_switch_handle.simulate_state(False)
+            stepper_joint.home()
+            while not stepper_joint.stepper.is_moving():
+                time.sleep(0.001)
+            # homing writes a zero velocity limit before it starts the approach
+            stop_times.clear()
+            start_time = time.perf_counter_ns()
+            home_switch_handle.simulate_state(True)
+            if stop_times:
+                histogram.record(stop_times[0] - start_time)
+            homed.wait(1.0)
+        raw_stepper_handle.setVelocityLimit = set_velocity_limit
+        device_manager.close_all()
+    return _latency_statistics(histogram)
+
+# open() plus attach, including each channel's attach configuration
+def benchmark_open_attach(channel_count=32, attach_delay=0, logger=None):
+    if logger is None:
+        logger = logging.getLogger(__name__)
+    from phidgets_python_api.stepper import Stepper, StepperInfo
+    with _SimulatorContext() as simulator:
+        steppers = []
+        for hub_port in range(channel_count):
+            stepper_info = StepperInfo()
+            stepper_info.phidget_info.hub_port = hub_port
+            steppers.append(Stepper(stepper_info, 'stepper_' + str(hub_port), logger))
+        simulator.attach_delay = attach_delay
+        device_manager = DeviceManager(logger)
+        [device_manager.add_device(stepper) for stepper in steppers]
+        report = device_manager.open_all(10.0)
+        device_manager.close_all()
+    attach_times = sorted(attach_time for name, attach_time in report['attached'])
+    return {'channel_count': channel_count,
+            'attached_count': len(attach_times),
+            'elapsed': report['elapsed'],
+            'median_attach_time': attach_times[len(attach_times) // 2] if attach_times else None}
+
+# bytes allocated per device object, measured with tracemalloc
+def benchmark_memory_per_device(device_count=100, logger=None):
+    if logger is None:
+        logger = logging.getLogger(__name__)
+    from phidgets_python_api.digital_input import DigitalInput, DigitalInputInfo
+    from phidgets_python_api.stepper import Stepper, StepperInfo
+    from phidgets_python_api.stepper_joint import StepperJoint, StepperJointInfo
+    from phidgets_python_api.voltage_ratio_input import VoltageRatioInput, VoltageRatioInputInfo
+    device_classes = {'stepper': (Stepper, StepperInfo),
+                      'digital_input': (DigitalInput, DigitalInputInfo),
+                      'voltage_ratio_input': (VoltageRatioInput, VoltageRatioInputInfo),
+                      'stepper_joint': (StepperJoint, StepperJointInfo)}
+    results = {}
+    with _SimulatorContext():
+        for name, (device_class, info_class) in device_classes.items():
+            tracemalloc.start()
+            start_size, start_peak = tracemalloc.get_traced_memory()
+            devices = [device_class(info_class(), name + '_' + str(i), logger) for i in range(device_count)]
+            size, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results[name] = (size - start_size) / device_count
+            del devices
+    return results
+
+# seconds per EventRecorder.record() call, as made by a device event dispatcher, with
+# segment_event_count small enough that the run rolls over segments
+def benchmark_event_recorder_record(event_count=200000, segment_event_count=65536, logger=None):
+    import tempfile
+    from phidgets_python_api.event_recorder import EventRecorder, EVENT_POSITION_CHANGE
+    with tempfile.TemporaryDirectory() as directory:
+        event_recorder = EventRecorder(directory, segment_event_count=segment_event_count, flush_interval=0.1)
+        event_recorder.start()
+        record = event_recorder.record
+        start_time = time.perf_counter()
+        for index in range(event_count):
+            record(0, EVENT_POSITION_CHANGE, 1.0)
+        elapsed = time.perf_counter() - start_time
+        event_recorder.stop()
+    return {'event_count': event_recorder.get_event_count(),
+            'seconds_per_event': elapsed / event_count}
+
+# events per second EventReplay drives through a Stepper position handler when
+# replaying as fast as possible, from a recording spanning segment boundaries
+def benchmark_event_replay(event_count=200000, segment_event_count=65536, logger=None):
+    import tempfile
+    from phidgets_python_api.event_recorder import EventRecorder, EVENT_ATTACH, EVENT_POSITION_CHANGE
+    from phidgets_python_api.event_replay import EventReplay
+    from phidgets_python_api.stepper import Stepper, StepperInfo
+    if logger is None:
+        logger = logging.getLogger(__name__)
+    with tempfile.TemporaryDirectory() as directory:
+        event_recorder = EventRecorder(directory, segment_event_count=segment_event_count, flush_interval=0.1)
+        with _SimulatorContext():
+            event_recorder.add_device(Stepper(StepperInfo(), 'stepper', logger))
+        event_recorder.start()
+        event_recorder.record(0, EVENT_ATTACH, 0.0)
+        for index in range(event_count - 1):
+            event_recorder.record(0, EVENT_POSITION_CHANGE, float(index))
+        event_recorder.stop()
+        event_replay = EventReplay(directory)
+        previous_backend = backend.get_backend()
+        backend.set_backend(event_replay)
+        try:
+            stepper = event_replay.add_device(Stepper(StepperInfo(), 'stepper', logger))
+        finally:
+            backend.set_backend(previous_backend)
+        positions = []
+        stepper.set_on_position_change_handler(lambda handle, position: positions.append(position))
+        stepper.open()
+        result = event_replay.run()
+        stepper.close()
+    result['position_count'] = len(positions)
+    return result
+
+# seconds a fresh interpreter may spend importing each of IMPORT_TIME_MODULES
+IMPORT_TIME_BUDGET = 0.5
+
+IMPORT_TIME_MODULES = [
+    'phidgets_python_api',
+    'phidgets_python_api.stepper',
+    'phidgets_python_api.stepper_joint',
+    'phidgets_python_api.digital_input',
+    'phidgets_python_api.digital_output',
+    'phidgets_python_api.led_hub',
+    'phidgets_python_api.voltage_ratio_input',
+]
+
+_IMPORT_TIME_SCRIPT = '''
+import importlib, json, sys, time
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+seconds = time.perf_counter() - start
+phidget22_loaded = any(module_name.split('.')[0] == 'Phidget22' for module_name in sys.modules)
+print(json.dumps({'seconds': seconds, 'phidget22_loaded': phidget22_loaded}))
+'''
+
+# best of repeat imports of each module in a fresh interpreter, and whether the
+# import loaded the Phidget22 library, which should only happen on first device use
+def benchmark_import_time(modules=None, repeat=5, logger=None):
+    if modules is None:
+        modules = IMPORT_TIME_MODULES
+    results = {}
+    for module_name in modules:
+        runs = []
+        for iteration in range(repeat):
+            output = subprocess.run([sys.executable, '-c', _IMPORT_TIME_SCRIPT, module_name],
+                                    check=True, capture_output=True, text=True).stdout
+            runs.append(json.loads(output))
+        seconds = min(run['seconds'] for run in runs)
+        results[module_name] = {'seconds': seconds,
+                                'phidget22_loaded': any(run['phidget22_loaded'] for run in runs),
+                                'within_budget': seconds <= IMPORT_TIME_BUDGET}
+    return results
+
+BENCHMARKS = {
+    'voltage_ratio_input_throughput': benchmark_voltage_ratio_input_throughput,
+    'stepper_position_change_throughput': benchmark_stepper_position_change_throughput,
+    'home_switch_stop_latency': benchmark_home_switch_stop_latency,
+    'open_attach': benchmark_open_attach,
+    'memory_per_device': benchmark_memory_per_device,
+    'event_recorder_record': benchmark_event_recorder_record,
+    'event_replay': benchmark_event_replay,
+    'import_time': benchmark_import_time,
+}
+
+def run_benchmarks(names=None, logger=None):
+    if logger is None:
+        logger = logging.getLogger(__name__)
+    if names is None:
+        names = list(BENCHMARKS)
+    results = {'python_version': platform.python_version(),
+               'platform': platform.platform(),
+               'time': time.time(),
+               'benchmarks': {}}
+    for name in names:
+        results['benchmarks'][name] = BENCHMARKS[name](logger=logger)
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark phidgets_python_api against the simulator')
+    parser.add_argument('--output', help='write JSON results to this file instead of stdout')
+    parser.add_argument('benchmarks', nargs='*', help='benchmarks to run, all by default: ' + ', '.join(BENCHMARKS))
+    args = parser.parse_args(argv)
+    for name in args.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error('unknown benchmark: {0}'.format(name))
+    logging.basicConfig(level=logging.WARNING)
+    results = run_benchmarks(args.benchmarks or None)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent=2, sort_keys=True)
+    else:
+        json.dump(results, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write('\n')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,206 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import json
+import os
+import threading
+import time
+
+from phidgets_python_api.backend import get_backend
+from phidgets_python_api.phidget import ANY_SERIAL_NUMBER, ANY_HUB_PORT, ANY_CHANNEL
+
+# Enumerates every connected channel once with the Phidget22 Manager, indexes the
+# channels by label and serial number, and persists the index to a cache file so
+# later starts can resolve wildcard PhidgetInfo addresses to exact ones and open
+# channels without a wildcard match. A cached address can go stale when a device is
+# moved, open_device then drops it from the cache and discovers again.
+class DeviceDiscovery:
+    def __init__(self, logger, cache_path=None):
+        self.logger = logger
+        self.cache_path = cache_path
+        self.channels = []
+        self._index = {}
+        self._channels_lock = threading.Lock()
+        # {phidget_info: (serial_number, hub_port, channel)} from before resolve filled them in
+        self._wildcard_addresses = {}
+        if (self.cache_path is not None) and os.path.exists(self.cache_path):
+            self.load_cache()
+
+    # returns once no channel has attached for settle_time seconds, or after timeout
+    # seconds, see discover_in_background to not wait at all
+    def discover(self, timeout=1.0, settle_time=0.1):
+        channels = []
+        channel_attached = threading.Event()
+        manager = get_backend().create_manager()
+
+        def on_attach_handler(manager, channel_handle):
+            channel_class_name = channel_handle.getChannelClassName()
+            if channel_class_name.startswith('Phidget'):
+                channel_class_name = channel_class_name[len('Phidget'):]
+            with self._channels_lock:
+                channels.append({'channel_class_name': channel_class_name,
+                                 'serial_number': channel_handle.getDeviceSerialNumber(),
+                                 'label': channel_handle.getDeviceLabel(),
+                                 'hub_port': channel_handle.getHubPort(),
+                                 'channel': channel_handle.getChannel(),
+                                 'is_hub_port_device': channel_handle.getIsHubPortDevice()})
+            channel_attached.set()
+        manager.setOnAttachHandler(on_attach_handler)
+        manager.open()
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining_time = deadline - time.monotonic()
+            if remaining_time <= 0.0:
+                break
+            if channel_attached.wait(min(settle_time, remaining_time)):
+                channel_attached.clear()
+            elif channels:
+                break
+        manager.close()
+
+        with self._channels_lock:
+            self._set_channels(channels)
+        self.logger.info('discovered {0} channels'.format(len(self.channels)))
+        if self.cache_path is not None:
+            self.save_cache()
+        return self.channels
+
+    # def on_discovered_handler(channels):
+    # runs discover on its own thread and returns the thread
+    def discover_in_background(self, on_discovered_handler=None, timeout=1.0, settle_time=0.1):
+        def run():
+            channels = self.discover(timeout, settle_time)
+            if on_discovered_handler is not None:
+                on_discovered_handler(channels)
+        thread = threading.Thread(target=run, name='device_discovery', daemon=True)
+        thread.start()
+        return thread
+
+    def _set_channels(self, channels):
+        self.channels = channels
+        self._index = {}
+        for channel in channels:
+            self._index.setdefault((channel['channel_class_name'], 'serial_number', channel['serial_number']), []).append(channel)
+            if channel['label']:
+                self._index.setdefault((channel['channel_class_name'], 'label', channel['label']), []).append(channel)
+            self._index.setdefault((channel['channel_class_name'], None, None), []).append(channel)
+
+    def load_cache(self):
+        with open(self.cache_path, 'r') as cache_file:
+            cache = json.load(cache_file)
+        self._set_channels(cache['channels'])
+
+    def save_cache(self):
+        temporary_path = self.cache_path + '.tmp'
+        with open(temporary_path, 'w') as cache_file:
+            json.dump({'time': time.time(), 'channels': self.channels}, cache_file, indent=2)
+        os.replace(temporary_path, self.cache_path)
+
+    # wildcard values in phidget_info match any channel, an empty label is a wildcard too
+    # since the attach handler fills in '' for devices without a label
+    def find(self, channel_class_name, phidget_info):
+        if phidget_info.label:
+            candidates = self._index.get((channel_class_name, 'label', phidget_info.label), [])
+        elif phidget_info.serial_number != ANY_SERIAL_NUMBER:
+            candidates = self._index.get((channel_class_name, 'serial_number', phidget_info.serial_number), [])
+        else:
+            candidates = self._index.get((channel_class_name, None, None), [])
+        return [channel for channel in candidates
+                if ((phidget_info.serial_number == ANY_SERIAL_NUMBER) or (channel['serial_number'] == phidget_info.serial_number))
+                and ((phidget_info.hub_port == ANY_HUB_PORT) or (channel['hub_port'] == phidget_info.hub_port))
+                and ((phidget_info.channel == ANY_CHANNEL) or (channel['channel'] == phidget_info.channel))
+                and (channel['is_hub_port_device'] == phidget_info.is_hub_port_device)]
+
+    # fills in an exact serial number, hub port and channel when exactly one channel matches
+    def resolve(self, channel_class_name, phidget_info):
+        channels = self.find(channel_class_name, phidget_info)
+        if len(channels) != 1:
+            return False
+        if (phidget_info not in self._wildcard_addresses) and ((phidget_info.serial_number == ANY_SERIAL_NUMBER) or
+                                                               (phidget_info.hub_port == ANY_HUB_PORT) or
+                                                               (phidget_info.channel == ANY_CHANNEL)):
+            self._wildcard_addresses[phidget_info] = (phidget_info.serial_number, phidget_info.hub_port, phidget_info.channel)
+        phidget_info.serial_number = channels[0]['serial_number']
+        phidget_info.hub_port = channels[0]['hub_port']
+        phidget_info.channel = channels[0]['channel']
+        return True
+
+    # resolves every channel of a Phidget or composite device before it is opened,
+    # returns the names of the channels that could not be resolved
+    def resolve_device(self, device):
+        unresolved = []
+        for phidget in device.phidgets():
+            if not self.resolve(phidget.CHANNEL_CLASS_NAME, phidget.phidget_info):
+                unresolved.append(phidget.name)
+        if unresolved:
+            self.logger.warning('could not resolve {0}'.format(', '.join(unresolved)))
+        return unresolved
+
+    # drops the cached channel at the address resolve filled into phidget_info and puts
+    # the wildcard address back, returns False if resolve did not fill it in
+    def invalidate(self, channel_class_name, phidget_info):
+        wildcard_address = self._wildcard_addresses.pop(phidget_info, None)
+        if wildcard_address is None:
+            return False
+        with self._channels_lock:
+            channels = [channel for channel in self.channels
+                        if not ((channel['channel_class_name'] == channel_class_name)
+                                and (channel['serial_number'] == phidget_info.serial_number)
+                                and (channel['hub_port'] == phidget_info.hub_port)
+                                and (channel['channel'] == phidget_info.channel))]
+            self._set_channels(channels)
+        if self.cache_path is not None:
+            self.save_cache()
+        phidget_info.serial_number, phidget_info.hub_port, phidget_info.channel = wildcard_address
+        return True
+
+    # resolves and opens device, and when channels resolved from the cache do not attach
+    # within timeout seconds, invalidates their cached addresses, discovers again and
+    # reopens them, returns the names of the channels that did not attach
+    def open_device(self, device, timeout=2.0, discover_timeout=1.0):
+        self.resolve_device(device)
+        device.open()
+        missing = self._wait_for_attach(device, timeout)
+        stale = [phidget for phidget in missing if phidget.phidget_info in self._wildcard_addresses]
+        if stale:
+            self.logger.warning('{0} did not attach at the cached address, discovering again'.format(', '.join(phidget.name for phidget in stale)))
+            for phidget in stale:
+                self.invalidate(phidget.CHANNEL_CLASS_NAME, phidget.phidget_info)
+            self.discover(discover_timeout)
+            for phidget in stale:
+                self.resolve(phidget.CHANNEL_CLASS_NAME, phidget.phidget_info)
+                phidget.reopen()
+            missing = self._wait_for_attach(device, timeout)
+        return [phidget.name for phidget in missing]
+
+    def _wait_for_attach(self, device, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            missing = [phidget for phidget in device.phidgets() if not phidget.is_attached()]
+            if (not missing) or (time.monotonic() >= deadline):
+                return missing
+            time.sleep(0.01)
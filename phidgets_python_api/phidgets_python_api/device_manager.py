@@ -0,0 +1,124 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import concurrent.futures
+import functools
+import threading
+import time
+
+# Opens Phidgets and composite devices (StepperJoint, LedHub, ...) concurrently and
+# waits for every channel to attach against one overall deadline. Each channel's
+# attach handler still configures its own channel, and Phidget22 runs the attach
+# handlers of different channels on their own threads, so configuration of all
+# channels proceeds in parallel once the opens have been issued.
+class DeviceManager:
+    def __init__(self, logger, max_workers=16):
+        self.logger = logger
+        self.devices = []
+        self.max_workers = max_workers
+        self._attach_events = {}
+        self._attach_times = {}
+        self._open_time = None
+        self._on_attach_handler = None
+
+    def add_device(self, device):
+        self.devices.append(device)
+        return device
+
+    def phidgets(self):
+        return [phidget for device in self.devices for phidget in device.phidgets()]
+
+    # def on_attach_handler(handle):
+    # called after the channel has applied its own attach configuration
+    def set_on_attach_handler(self, on_attach_handler):
+        self._on_attach_handler = on_attach_handler
+
+    # chained to the attach handler the channel had, which configures it
+    def _attach_handler(self, phidget, previous_attach_handler, handle):
+        if previous_attach_handler is not None:
+            previous_attach_handler(handle)
+        self._attach_times[phidget] = time.monotonic() - self._open_time
+        self._attach_events[phidget].set()
+        if self._on_attach_handler is not None:
+            self._on_attach_handler(handle)
+
+    # returns {'attached': [(name, seconds)], 'missing': [name], 'elapsed': seconds},
+    # attached in the order the channels attached, the channels get back the attach
+    # handlers they had before
+    def open_all(self, timeout):
+        phidgets = self.phidgets()
+        self._attach_events = {phidget: threading.Event() for phidget in phidgets}
+        self._attach_times = {}
+        previous_attach_handlers = [(phidget, phidget.get_on_attach_handler()) for phidget in phidgets]
+        for phidget, previous_attach_handler in previous_attach_handlers:
+            phidget.set_on_attach_handler(functools.partial(self._attach_handler, phidget, previous_attach_handler))
+        try:
+            return self._open_all(phidgets, timeout)
+        finally:
+            for phidget, previous_attach_handler in previous_attach_handlers:
+                phidget.set_on_attach_handler(previous_attach_handler)
+
+    def _open_all(self, phidgets, timeout):
+
+        self._open_time = time.monotonic()
+        deadline = self._open_time + timeout
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers)
+        futures = {executor.submit(device.open): device for device in self.devices}
+        try:
+            for future in concurrent.futures.as_completed(futures, timeout=max(deadline - time.monotonic(), 0.0)):
+                exception = future.exception()
+                if exception is not None:
+                    self.logger.error('{0} open failed: {1}'.format(futures[future].name, exception))
+        except concurrent.futures.TimeoutError:
+            self.logger.error('device opens did not return before the deadline')
+        executor.shutdown(wait=False)
+
+        for attach_event in self._attach_events.values():
+            if not attach_event.wait(max(deadline - time.monotonic(), 0.0)):
+                break
+
+        attach_times = dict(self._attach_times)
+        attached = [(phidget.name, attach_time) for phidget, attach_time in sorted(attach_times.items(), key=lambda item: item[1])]
+        missing = [phidget.name for phidget in phidgets if phidget not in attach_times]
+        elapsed = time.monotonic() - self._open_time
+        msg = 'opened {0} of {1} channels in {2:.3f} s'.format(len(attached), len(phidgets), elapsed)
+        if missing:
+            msg += ', not attached: {0}'.format(', '.join(missing))
+            self.logger.warning(msg)
+        else:
+            self.logger.info(msg)
+        return {'attached': attached, 'missing': missing, 'elapsed': elapsed}
+
+    def close_all(self):
+        for device in self.devices:
+            device.close()
+
+    def is_attached(self):
+        for device in self.devices:
+            if not device.is_attached():
+                return False
+        return True
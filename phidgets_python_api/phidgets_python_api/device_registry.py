@@ -0,0 +1,56 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import threading
+import weakref
+
+from phidgets_python_api.instrumentation import InstrumentedHandle
+
+# Maps channel handles to the Phidget that owns them, so attach, detach and event
+# handlers shared by many devices find their device with one dictionary lookup.
+# Handles are keyed by id, the Phidget keeps its handle alive for as long as it is
+# registered, and Phidgets are held weakly so ones that are no longer used drop out.
+
+_phidgets = weakref.WeakValueDictionary()
+_phidgets_lock = threading.Lock()
+
+def _handle_key(handle):
+    if isinstance(handle, InstrumentedHandle):
+        handle = handle._handle
+    return id(handle)
+
+def register(handle, phidget):
+    with _phidgets_lock:
+        _phidgets[_handle_key(handle)] = phidget
+
+def unregister(handle):
+    with _phidgets_lock:
+        _phidgets.pop(_handle_key(handle), None)
+
+# returns the Phidget owning handle, or None
+def lookup(handle):
+    return _phidgets.get(_handle_key(handle))
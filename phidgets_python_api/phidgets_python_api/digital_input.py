@@ -25,27 +25,45 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
-from Phidget22.PhidgetException import *
-import Phidget22.Devices.DigitalInput
+import threading
 
+from phidgets_python_api.backend import get_backend
+from phidgets_python_api.event_recorder import EVENT_STATE_CHANGE
 from phidgets_python_api.phidget import Phidget, PhidgetInfo
 
+EDGE_BOTH = 'both'
+EDGE_RISING = 'rising'
+EDGE_FALLING = 'falling'
+
 class DigitalInputInfo():
+    __slots__ = ('phidget_info', 'active_low', 'debounce_interval', 'edge_filter', 'edge_tracking_enabled',
+                 'pulse_rate_smoothing')
+
     def __init__(self):
         self.phidget_info = PhidgetInfo()
         self.phidget_info.is_hub_port_device = True
         self.active_low = True
+        self.debounce_interval = 0
+        self.edge_filter = EDGE_BOTH
+        self.edge_tracking_enabled = False
+        self.pulse_rate_smoothing = 0.2
 
 class DigitalInput(Phidget):
+    CHANNEL_CLASS_NAME = 'DigitalInput'
+
     def __init__(self, digital_input_info, name, logger):
         super().__init__(digital_input_info.phidget_info, name, logger)
         self.digital_input_info = digital_input_info
+        self._on_state_change_handler = None
+        self._edge_lock = threading.RLock()
+        self._settle_timer = None
+        self.reset_edge_statistics()
 
-        self._set_handle_and_on_attach_handler(Phidget22.Devices.DigitalInput.DigitalInput())
+        self._set_handle_and_on_attach_handler(get_backend().create_handle(self.CHANNEL_CLASS_NAME))
 
     def _set_handle_and_on_attach_handler(self, digital_input_handle):
         super()._set_handle_and_on_attach_handler(digital_input_handle)
-        self._digital_input_handle = digital_input_handle
+        self._digital_input_handle = self._phidget_handle
         self.set_on_attach_handler(self._on_attach_handler)
 
     def _on_attach_handler(self, handle):
@@ -53,6 +71,7 @@ class DigitalInput(Phidget):
 
     def close(self):
         self.set_on_state_change_handler(None)
+        self._cancel_settle_timer()
         super().close()
 
     def has_handle(self, handle):
@@ -60,7 +79,127 @@ class DigitalInput(Phidget):
 
     # def on_state_change_handler(self, handle, state):
     def set_on_state_change_handler(self, on_state_change_handler):
-        self._digital_input_handle.setOnStateChangeHandler(on_state_change_handler)
+        self._on_state_change_handler = on_state_change_handler
+        self._update_state_change_handler()
+
+    def get_on_state_change_handler(self):
+        return self._on_state_change_handler
+
+    def _update_state_change_handler(self):
+        if self._is_filtering_edges() or (self._event_recorder is not None):
+            self._digital_input_handle.setOnStateChangeHandler(self._state_change_handler)
+        else:
+            self._digital_input_handle.setOnStateChangeHandler(self._on_state_change_handler)
+
+    def _update_event_handlers(self):
+        self._update_state_change_handler()
+
+    def _is_filtering_edges(self):
+        return ((self.digital_input_info.debounce_interval > 0) or
+                (self.digital_input_info.edge_filter != EDGE_BOTH) or
+                self.digital_input_info.edge_tracking_enabled)
+
+    # debounce_interval in ms, edge_filter one of EDGE_BOTH, EDGE_RISING or EDGE_FALLING
+    def set_debounce(self, debounce_interval, edge_filter=EDGE_BOTH):
+        self.digital_input_info.debounce_interval = debounce_interval
+        self.digital_input_info.edge_filter = edge_filter
+        self._update_state_change_handler()
+
+    def set_edge_tracking_enabled(self, edge_tracking_enabled):
+        self.digital_input_info.edge_tracking_enabled = edge_tracking_enabled
+        self._update_state_change_handler()
+
+    def _state_change_handler(self, handle, state):
+        event_recorder = self._event_recorder
+        if event_recorder is not None:
+            event_recorder.record(self._event_channel_id, EVENT_STATE_CHANGE, state)
+        if self._is_filtering_edges():
+            self._filter_state_change(handle, state)
+        elif self._on_state_change_handler is not None:
+            self._on_state_change_handler(handle, state)
+
+    # Leading edge debounce: an edge is reported as soon as it arrives and further
+    # edges are ignored for debounce_interval. If the input leaves the reported state
+    # during that window, a timer checks it again when the window ends and reports
+    # the state it settled in, with the time of its last change, from the timer thread.
+    def _filter_state_change(self, handle, state):
+        timestamp = self._monotonic()
+        with self._edge_lock:
+            previous_raw_state = self._raw_state
+            self._raw_state = state
+            self._raw_state_time = timestamp
+            remaining_time = self._last_edge_time + self.digital_input_info.debounce_interval / 1000.0 - timestamp
+            if remaining_time > 0.0:
+                if (state != self._debounced_state) and (self._settle_timer is None):
+                    self._settle_timer = threading.Timer(remaining_time, self._settle_handler, args=(handle,))
+                    self._settle_timer.daemon = True
+                    self._settle_timer.start()
+                return
+            if state == self._debounced_state:
+                if previous_raw_state == state:
+                    return
+                self._report_edge(handle, not state, timestamp)
+            self._report_edge(handle, state, timestamp)
+
+    def _settle_handler(self, handle):
+        with self._edge_lock:
+            self._settle_timer = None
+            if self._raw_state != self._debounced_state:
+                self._report_edge(handle, self._raw_state, self._raw_state_time)
+
+    def _cancel_settle_timer(self):
+        with self._edge_lock:
+            if self._settle_timer is not None:
+                self._settle_timer.cancel()
+                self._settle_timer = None
+
+    def _report_edge(self, handle, state, timestamp):
+        self._last_edge_time = timestamp
+        self._debounced_state = state
+        if state:
+            if self.rising_edge_count > 0:
+                interval = timestamp - self.last_rising_edge_time
+                if self._rising_edge_interval is None:
+                    self._rising_edge_interval = interval
+                else:
+                    self._rising_edge_interval += self.digital_input_info.pulse_rate_smoothing * (interval - self._rising_edge_interval)
+            self.rising_edge_count += 1
+            self.last_rising_edge_time = timestamp
+            if self.digital_input_info.edge_filter == EDGE_FALLING:
+                return
+        else:
+            self.falling_edge_count += 1
+            self.last_falling_edge_time = timestamp
+            if self.digital_input_info.edge_filter == EDGE_RISING:
+                return
+        if self._on_state_change_handler is not None:
+            self._on_state_change_handler(handle, state)
+
+    def reset_edge_statistics(self):
+        self._cancel_settle_timer()
+        self._raw_state = None
+        self._raw_state_time = None
+        self._debounced_state = None
+        self._last_edge_time = float('-inf')
+        self._rising_edge_interval = None
+        self.rising_edge_count = 0
+        self.falling_edge_count = 0
+        self.last_rising_edge_time = None
+        self.last_falling_edge_time = None
+
+    # rising edges per second, smoothed over recent edges, 0.0 before two rising edges
+    def get_pulse_rate(self):
+        if not self._rising_edge_interval:
+            return 0.0
+        return 1.0 / self._rising_edge_interval
+
+    # edge times are from the backend clock, time.monotonic() unless replaying
+    def get_edge_statistics(self):
+        return {'rising_edge_count': self.rising_edge_count,
+                'falling_edge_count': self.falling_edge_count,
+                'last_rising_edge_time': self.last_rising_edge_time,
+                'last_falling_edge_time': self.last_falling_edge_time,
+                'pulse_rate': self.get_pulse_rate()}
 
     def get_state(self):
         return self._digital_input_handle.getState()
@@ -25,27 +25,32 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
-from Phidget22.PhidgetException import *
-import Phidget22.Devices.DigitalOutput
-
+from phidgets_python_api.backend import get_backend
 from phidgets_python_api.phidget import Phidget, PhidgetInfo
 
+# the value of Phidget22.ErrorCode.ErrorCode.EPHIDGET_OK, passed to async handlers
+EPHIDGET_OK = 0
+
 class DigitalOutputInfo():
+    __slots__ = ('phidget_info', 'active_high')
+
     def __init__(self):
         self.phidget_info = PhidgetInfo()
         self.phidget_info.is_hub_port_device = True
         self.active_high = True
 
 class DigitalOutput(Phidget):
+    CHANNEL_CLASS_NAME = 'DigitalOutput'
+
     def __init__(self, digital_output_info, name, logger):
         super().__init__(digital_output_info.phidget_info, name, logger)
         self.digital_output_info = digital_output_info
 
-        self._set_handle_and_on_attach_handler(Phidget22.Devices.DigitalOutput.DigitalOutput())
+        self._set_handle_and_on_attach_handler(get_backend().create_handle(self.CHANNEL_CLASS_NAME))
 
     def _set_handle_and_on_attach_handler(self, digital_output_handle):
         super()._set_handle_and_on_attach_handler(digital_output_handle)
-        self._digital_output_handle = digital_output_handle
+        self._digital_output_handle = self._phidget_handle
         self.set_on_attach_handler(self._on_attach_handler)
 
     def _on_attach_handler(self, handle):
@@ -58,10 +63,37 @@ class DigitalOutput(Phidget):
         return self._digital_output_handle == handle
 
     def get_state(self):
-        return self._digital_output_handle.getState()
+        return self._get_attribute('state', self._digital_output_handle.getState)
 
     def set_state(self, state):
-        self._digital_output_handle.setState(state)
+        self._set_attribute('state', state, self._digital_output_handle.setState)
+
+    # def async_handler(handle, result, details):
+    # returns without waiting for the device, the handler is called when the write completes,
+    # or right away when state is the cached state and the write is skipped
+    # the state is cached when the write is issued and dropped again if the write fails,
+    # so that writing the same state again is not suppressed
+    def set_state_async(self, state, async_handler=None):
+        if self._is_attribute_current('state', state):
+            if async_handler is not None:
+                async_handler(self._digital_output_handle, EPHIDGET_OK, '')
+            return
+
+        def on_write_done_handler(handle, result, details):
+            if result != EPHIDGET_OK:
+                self._invalidate_attribute('state')
+                self.logger.warning('{0} set state {1} failed: {2}'.format(self.name, state, details))
+            if async_handler is not None:
+                async_handler(handle, result, details)
+
+        self._record_written_attribute('state', state, self._digital_output_handle.setState)
+        self._digital_output_handle.setState_async(state, on_write_done_handler)
+
+    def get_active_state(self, active):
+        if self.digital_output_info.active_high:
+            return active
+        else:
+            return not active
 
     def is_active(self):
         if self.digital_output_info.active_high:
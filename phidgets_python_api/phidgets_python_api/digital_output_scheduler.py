@@ -0,0 +1,179 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+from phidgets_python_api.instrumentation import LatencyHistogram
+
+class _OutputJob():
+    def __init__(self, digital_output, high_time, low_time, count):
+        self.digital_output = digital_output
+        self.high_time = high_time
+        self.low_time = low_time
+        self.remaining_count = count
+        self.cancelled = False
+        self.write_failed = False
+
+# Generates pulse trains and software PWM on many DigitalOutputs from one thread.
+# Edges are kept in a deadline heap, edges due within coincidence_window of each
+# other are written together, and the lateness of every edge is recorded.
+# Times are in ms. A failed write, for example to a detached output, is logged and
+# the job keeps its timing, so the other outputs are not affected.
+class DigitalOutputScheduler:
+    def __init__(self, coincidence_window=0.5, name='digital_output_scheduler', logger=None):
+        self.coincidence_window = coincidence_window
+        self.name = name
+        if logger is None:
+            logger = logging.getLogger(__name__)
+        self.logger = logger
+        self.jitter_histogram = LatencyHistogram()
+        self._edges = []
+        self._jobs = {}
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+
+    def start(self):
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    # count pulses of pulse_width, one every period, count None repeats until cancelled
+    def add_pulse_train(self, digital_output, pulse_width, period, count=None, start_delay=0.0):
+        if pulse_width >= period:
+            raise ValueError('pulse_width must be shorter than period')
+        job = _OutputJob(digital_output, pulse_width, period - pulse_width, count)
+        self._add_job(job, start_delay)
+        return job
+
+    # duty_cycle from 0.0 to 1.0, the output is held constant at either end
+    def set_pwm(self, digital_output, frequency, duty_cycle):
+        if not 0.0 < duty_cycle < 1.0:
+            self.cancel(digital_output)
+            digital_output.set_state(digital_output.get_active_state(duty_cycle >= 1.0))
+            return None
+        period = 1000.0 / frequency
+        job = _OutputJob(digital_output, duty_cycle * period, (1.0 - duty_cycle) * period, None)
+        self._add_job(job, 0.0)
+        return job
+
+    # stops the job driving digital_output and leaves it inactive
+    def cancel(self, digital_output):
+        with self._condition:
+            job = self._jobs.pop(digital_output, None)
+            if job is not None:
+                job.cancelled = True
+        if job is not None:
+            digital_output.deactivate()
+
+    def _add_job(self, job, start_delay):
+        with self._condition:
+            previous_job = self._jobs.get(job.digital_output)
+            if previous_job is not None:
+                previous_job.cancelled = True
+            self._jobs[job.digital_output] = job
+            self._push_edge(time.monotonic() + start_delay / 1000.0, job, True)
+            self._condition.notify()
+
+    def _push_edge(self, deadline, job, active):
+        heapq.heappush(self._edges, (deadline, next(self._sequence), job, active))
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._running:
+                    if self._edges:
+                        wait_time = self._edges[0][0] - time.monotonic()
+                        if wait_time <= 0.0:
+                            break
+                        self._condition.wait(wait_time)
+                    else:
+                        self._condition.wait()
+                if not self._running:
+                    return
+                batch_deadline = time.monotonic() + self.coincidence_window / 1000.0
+                batch = []
+                while self._edges and (self._edges[0][0] <= batch_deadline):
+                    batch.append(heapq.heappop(self._edges))
+            self._write_edges(batch)
+
+    def _write_edges(self, batch):
+        for deadline, sequence, job, active in batch:
+            if job.cancelled:
+                continue
+            try:
+                if active:
+                    job.digital_output.activate()
+                else:
+                    job.digital_output.deactivate()
+            except Exception as e:
+                # logged once per run of failures so a detached output does not flood the log
+                if not job.write_failed:
+                    self.logger.error('{0} write failed: {1}'.format(job.digital_output.name, e))
+                    job.write_failed = True
+                continue
+            job.write_failed = False
+            self.jitter_histogram.record(int(abs(time.monotonic() - deadline) * 1e9))
+        with self._condition:
+            for deadline, sequence, job, active in batch:
+                if job.cancelled:
+                    continue
+                if active:
+                    self._push_edge(deadline + job.high_time / 1000.0, job, False)
+                    continue
+                if job.remaining_count is not None:
+                    job.remaining_count -= 1
+                    if job.remaining_count <= 0:
+                        if self._jobs.get(job.digital_output) is job:
+                            del self._jobs[job.digital_output]
+                        continue
+                self._push_edge(deadline + job.low_time / 1000.0, job, True)
+
+    # seconds between each edge deadline and its write
+    def get_jitter_statistics(self):
+        histogram = self.jitter_histogram
+        return {'count': histogram.count,
+                'mean': histogram.total / max(histogram.count, 1) * 1e-9,
+                'p50': histogram.percentile(0.5) * 1e-9,
+                'p99': histogram.percentile(0.99) * 1e-9,
+                'max': histogram.max * 1e-9}
@@ -0,0 +1,146 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import logging
+import threading
+import time
+
+class _CoalescedEvent():
+    __slots__ = ('handler', 'min_interval', 'min_change', 'wake', 'lock', 'handle', 'value',
+                 'delivered_value', 'dirty', 'next_delivery_time')
+
+    def __init__(self, handler, min_interval, min_change, wake):
+        self.handler = handler
+        self.min_interval = min_interval
+        self.min_change = min_change
+        self.wake = wake
+        self.lock = threading.Lock()
+        self.handle = None
+        self.value = None
+        self.delivered_value = None
+        self.dirty = False
+        self.next_delivery_time = 0.0
+
+    # runs on the Phidget22 event thread, only stores the latest value
+    def update(self, handle, value):
+        with self.lock:
+            self.handle = handle
+            self.value = value
+            self.dirty = True
+        if (self.min_change is not None) and ((self.delivered_value is None) or (abs(value - self.delivered_value) >= self.min_change)):
+            self.wake.set()
+
+# Keeps only the latest position or velocity of each stepper and delivers it from a
+# single dispatcher thread, at most max_rate times per second per event, or as soon
+# as it has moved min_change from the last delivered value. Handler exceptions are
+# logged and do not stop the dispatcher.
+class EventCoalescer:
+    def __init__(self, max_rate=50.0, name='event_coalescer', logger=None):
+        self.max_rate = max_rate
+        self.name = name
+        if logger is None:
+            logger = logging.getLogger(__name__)
+        self.logger = logger
+        self._events = {}
+        self._events_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._running = False
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._running = False
+        self._wake.set()
+        self._thread.join()
+        self._thread = None
+
+    # def on_position_change_handler(handle, position):
+    def coalesce_position_change(self, stepper, on_position_change_handler, max_rate=None, min_change=None):
+        coalesced_event = self._add(stepper, 'position_change', on_position_change_handler, max_rate, min_change)
+        stepper.set_on_position_change_handler(coalesced_event.update)
+
+    # def on_velocity_change_handler(handle, velocity):
+    def coalesce_velocity_change(self, stepper, on_velocity_change_handler, max_rate=None, min_change=None):
+        coalesced_event = self._add(stepper, 'velocity_change', on_velocity_change_handler, max_rate, min_change)
+        stepper.set_on_velocity_change_handler(coalesced_event.update)
+
+    def remove(self, stepper):
+        with self._events_lock:
+            event_names = [event_name for (event_stepper, event_name) in self._events if event_stepper is stepper]
+            for event_name in event_names:
+                del self._events[(stepper, event_name)]
+        if 'position_change' in event_names:
+            stepper.set_on_position_change_handler(None)
+        if 'velocity_change' in event_names:
+            stepper.set_on_velocity_change_handler(None)
+
+    def _add(self, stepper, event_name, handler, max_rate, min_change):
+        if max_rate is None:
+            max_rate = self.max_rate
+        coalesced_event = _CoalescedEvent(handler, 1.0 / max_rate, min_change, self._wake)
+        with self._events_lock:
+            self._events[(stepper, event_name)] = coalesced_event
+        return coalesced_event
+
+    def _run(self):
+        while self._running:
+            with self._events_lock:
+                coalesced_events = list(self._events.values())
+            # wakes at the fastest configured rate, or early for a significant change
+            timeout = min([coalesced_event.min_interval for coalesced_event in coalesced_events], default=1.0 / self.max_rate)
+            self._wake.wait(timeout)
+            self._wake.clear()
+            if not self._running:
+                return
+            now = time.monotonic()
+            for coalesced_event in coalesced_events:
+                # the value is taken and dirty cleared together, so an update that lands
+                # during delivery stays dirty for the next pass
+                with coalesced_event.lock:
+                    if not coalesced_event.dirty:
+                        continue
+                    handle = coalesced_event.handle
+                    value = coalesced_event.value
+                    significant = ((coalesced_event.min_change is not None) and
+                                   ((coalesced_event.delivered_value is None) or (abs(value - coalesced_event.delivered_value) >= coalesced_event.min_change)))
+                    if not (significant or (now >= coalesced_event.next_delivery_time)):
+                        continue
+                    coalesced_event.dirty = False
+                coalesced_event.delivered_value = value
+                coalesced_event.next_delivery_time = now + coalesced_event.min_interval
+                try:
+                    coalesced_event.handler(handle, value)
+                except Exception as e:
+                    self.logger.error('{0} handler failed: {1}'.format(self.name, e))
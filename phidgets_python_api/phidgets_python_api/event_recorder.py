@@ -0,0 +1,278 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import json
+import os
+import threading
+import time
+
+EVENT_ATTACH = 0
+EVENT_DETACH = 1
+EVENT_POSITION_CHANGE = 2
+EVENT_VELOCITY_CHANGE = 3
+EVENT_STOPPED = 4
+EVENT_STATE_CHANGE = 5
+EVENT_VOLTAGE_RATIO_CHANGE = 6
+
+EVENT_TYPE_NAMES = {
+    EVENT_ATTACH: 'attach',
+    EVENT_DETACH: 'detach',
+    EVENT_POSITION_CHANGE: 'position_change',
+    EVENT_VELOCITY_CHANGE: 'velocity_change',
+    EVENT_STOPPED: 'stopped',
+    EVENT_STATE_CHANGE: 'state_change',
+    EVENT_VOLTAGE_RATIO_CHANGE: 'voltage_ratio_change',
+}
+
+# column name, numpy dtype, one raw little endian file per column and segment
+EVENT_COLUMNS = (
+    ('timestamp', '<f8'),
+    ('channel_id', '<u2'),
+    ('event_type', 'u1'),
+    ('value', '<f8'),
+)
+
+_monotonic = time.monotonic
+
+MANIFEST_FILE_NAME = 'manifest.json'
+EVENT_RECORDER_VERSION = 1
+
+def segment_column_path(directory, segment_index, column_name):
+    return os.path.join(directory, 'segment_{0:06d}_{1}.bin'.format(segment_index, column_name))
+
+class _Segment():
+    __slots__ = ('directory', 'index', 'columns', 'event_count')
+
+    def __init__(self, directory, index, capacity):
+        # numpy is only needed once recording, it is not imported with the device modules
+        import numpy
+        self.directory = directory
+        self.index = index
+        self.columns = [numpy.memmap(segment_column_path(directory, index, column_name), dtype=dtype, mode='w+', shape=(capacity,))
+                        for column_name, dtype in EVENT_COLUMNS]
+        self.event_count = 0
+
+    def flush(self):
+        [column.flush() for column in self.columns]
+
+    # unmaps the columns, and with trim shortens the files to the recorded events
+    def close(self, trim=False):
+        item_sizes = [column.dtype.itemsize for column in self.columns]
+        self.flush()
+        self.columns = []
+        if trim:
+            for (column_name, dtype), item_size in zip(EVENT_COLUMNS, item_sizes):
+                os.truncate(segment_column_path(self.directory, self.index, column_name), self.event_count * item_size)
+
+    def remove(self):
+        self.columns = []
+        for column_name, dtype in EVENT_COLUMNS:
+            path = segment_column_path(self.directory, self.index, column_name)
+            if os.path.exists(path):
+                os.remove(path)
+
+# Records raw device events into preallocated memory-mapped column files.
+#
+# The recording Phidget's event dispatcher calls record() on the Phidget22 event thread,
+# which only stores four numbers into the current segment under a lock, so recording
+# allocates nothing per event. When a segment is full the next one, prepared ahead by
+# the flush thread, takes its place. Every flush_interval seconds the flush thread
+# writes the mapped pages back, prepares the next segment, deletes the oldest segments
+# beyond max_segment_count and rewrites manifest.json, which names the channels, the
+# columns and the number of events in each segment. Timestamps are time.monotonic().
+class EventRecorder:
+    def __init__(self, directory, segment_event_count=1048576, flush_interval=1.0, max_segment_count=None, name='event_recorder'):
+        self.directory = directory
+        self.segment_event_count = segment_event_count
+        self.flush_interval = flush_interval
+        self.max_segment_count = max_segment_count
+        self.name = name
+        self.channels = []
+        self._phidgets = []
+        self._segments = []
+        self._segment = None
+        self._next_segment = None
+        self._segment_index_count = 0
+        self._columns = None
+        self._event_count = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._thread_stop = threading.Event()
+
+    # channel ids are assigned in order, composite devices add each of their channels
+    def add_device(self, device):
+        for phidget in device.phidgets():
+            channel_id = len(self.channels)
+            self.channels.append({'channel_id': channel_id,
+                                  'name': phidget.name,
+                                  'channel_class_name': phidget.CHANNEL_CLASS_NAME,
+                                  'serial_number': phidget.phidget_info.serial_number,
+                                  'label': phidget.phidget_info.label,
+                                  'hub_port': phidget.phidget_info.hub_port,
+                                  'channel': phidget.phidget_info.channel})
+            self._phidgets.append(phidget)
+            if self._thread is not None:
+                phidget.set_event_recorder(self, channel_id)
+        return device
+
+    def start(self):
+        if self._thread is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._segment_index_count = 0
+        self._segment = self._create_segment(self._allocate_segment_index())
+        self._columns = self._segment.columns
+        self._event_count = 0
+        self._segments = [self._segment]
+        for channel_id, phidget in enumerate(self._phidgets):
+            phidget.set_event_recorder(self, channel_id)
+        self._write_manifest(False)
+        self._thread_stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    # detaches from every channel, closes the segments filled since the last flush and
+    # trims the last segment to its events
+    def stop(self):
+        if self._thread is None:
+            return
+        [phidget.set_event_recorder(None) for phidget in self._phidgets]
+        self._thread_stop.set()
+        self._thread.join()
+        self._thread = None
+        with self._lock:
+            segment = self._segment
+            segment.event_count = self._event_count
+            full_segments = [full_segment for full_segment in self._segments[:-1] if full_segment.columns]
+            self._segment = None
+            self._columns = None
+        [full_segment.close() for full_segment in full_segments]
+        segment.close(trim=True)
+        if self._next_segment is not None:
+            self._next_segment.remove()
+            self._next_segment = None
+        self._remove_old_segments()
+        self._write_manifest(True)
+
+    def is_recording(self):
+        return self._thread is not None
+
+    def get_event_count(self):
+        with self._lock:
+            return sum(segment.event_count for segment in self._segments[:-1]) + self._event_count
+
+    # called from the event threads of the recorded channels, the clock is read straight
+    # into the mapped slot, so its float is released before the next event reuses it
+    def record(self, channel_id, event_type, value):
+        with self._lock:
+            columns = self._columns
+            if columns is None:
+                return
+            index = self._event_count
+            if index == self.segment_event_count:
+                self._roll_segment()
+                columns = self._columns
+                index = 0
+            columns[0][index] = _monotonic()
+            columns[1][index] = channel_id
+            columns[2][index] = event_type
+            columns[3][index] = value
+            self._event_count = index + 1
+
+    # holds the lock
+    def _roll_segment(self):
+        self._segment.event_count = self._event_count
+        segment = self._next_segment
+        if segment is None:
+            segment = self._create_segment(self._allocate_segment_index())
+        self._next_segment = None
+        self._segment = segment
+        self._segments.append(segment)
+        self._columns = segment.columns
+        self._event_count = 0
+
+    # indexes are only handed out once, so the flush thread preparing a segment while
+    # the event thread rolls over never maps the same files twice
+    def _allocate_segment_index(self):
+        segment_index = self._segment_index_count
+        self._segment_index_count += 1
+        return segment_index
+
+    def _create_segment(self, index):
+        return _Segment(self.directory, index, self.segment_event_count)
+
+    def _run(self):
+        while not self._thread_stop.wait(self.flush_interval):
+            self._flush()
+
+    def _flush(self):
+        with self._lock:
+            current_segment = self._segment
+            full_segments = [segment for segment in self._segments[:-1] if segment.columns]
+            if self._next_segment is None:
+                next_segment_index = self._allocate_segment_index()
+            else:
+                next_segment_index = None
+        # full segments are complete, only the current one stays mapped for writing
+        [segment.close() for segment in full_segments]
+        current_segment.flush()
+        if next_segment_index is not None:
+            next_segment = self._create_segment(next_segment_index)
+            with self._lock:
+                if self._next_segment is None:
+                    self._next_segment = next_segment
+                    next_segment = None
+            if next_segment is not None:
+                next_segment.remove()
+        self._remove_old_segments()
+        self._write_manifest(False)
+
+    def _remove_old_segments(self):
+        if self.max_segment_count is None:
+            return
+        with self._lock:
+            removed_segments = self._segments[:-self.max_segment_count]
+            self._segments = self._segments[-self.max_segment_count:]
+        [segment.remove() for segment in removed_segments]
+
+    def _write_manifest(self, closed):
+        with self._lock:
+            segments = [{'index': segment.index, 'event_count': segment.event_count} for segment in self._segments]
+            if self._segment is not None:
+                segments[-1]['event_count'] = self._event_count
+        manifest = {'version': EVENT_RECORDER_VERSION,
+                    'closed': closed,
+                    'segment_event_count': self.segment_event_count,
+                    'columns': [{'name': column_name, 'dtype': dtype} for column_name, dtype in EVENT_COLUMNS],
+                    'event_types': {name: event_type for event_type, name in EVENT_TYPE_NAMES.items()},
+                    'channels': self.channels,
+                    'segments': segments}
+        path = os.path.join(self.directory, MANIFEST_FILE_NAME)
+        temporary_path = path + '.tmp'
+        with open(temporary_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(temporary_path, path)
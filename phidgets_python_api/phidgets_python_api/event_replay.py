@@ -0,0 +1,274 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import heapq
+import json
+import os
+import time
+
+import numpy
+
+from phidgets_python_api.event_recorder import (EVENT_ATTACH, EVENT_DETACH, EVENT_POSITION_CHANGE, EVENT_VELOCITY_CHANGE,
+                                                EVENT_STOPPED, EVENT_STATE_CHANGE, EVENT_VOLTAGE_RATIO_CHANGE,
+                                                EVENT_COLUMNS, EVENT_RECORDER_VERSION, MANIFEST_FILE_NAME,
+                                                segment_column_path)
+
+# Stands in for a Phidget22 channel handle during a replay. Setters store their value,
+# getters return the last stored or replayed value, and every event handler is kept
+# so the replay can call it. Commands (targets, velocity limits, outputs) do not
+# change what happens next, the replay feeds back what the devices reported.
+class ReplayHandle():
+    def __init__(self, channel_class_name):
+        self.channel_class_name = channel_class_name
+        self._properties = {'Attached': False,
+                            'DeviceSerialNumber': -1,
+                            'DeviceLabel': None,
+                            'HubPort': -1,
+                            'Channel': -1,
+                            'Position': 0.0,
+                            'Velocity': 0.0,
+                            'IsMoving': False,
+                            'State': False,
+                            'VoltageRatio': 0.0}
+        self._handlers = {}
+        self._replay_event_handlers = {EVENT_ATTACH: self._replay_attach,
+                                       EVENT_DETACH: self._replay_detach,
+                                       EVENT_POSITION_CHANGE: self._replay_position_change,
+                                       EVENT_VELOCITY_CHANGE: self._replay_velocity_change,
+                                       EVENT_STOPPED: self._replay_stopped,
+                                       EVENT_STATE_CHANGE: self._replay_state_change,
+                                       EVENT_VOLTAGE_RATIO_CHANGE: self._replay_voltage_ratio_change}
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if name.startswith('setOn') and name.endswith('Handler'):
+            event_name = name[5:-7]
+
+            def method(handler):
+                self._handlers[event_name] = handler
+        elif name.startswith('set'):
+            property_name = name[3:]
+            if property_name.endswith('_async'):
+                property_name = property_name[:-6]
+
+                def method(value, async_handler=None):
+                    self._properties[property_name] = value
+                    if async_handler is not None:
+                        async_handler(self, 0, '')
+            else:
+                def method(value):
+                    self._properties[property_name] = value
+        elif name.startswith('get'):
+            property_name = name[3:]
+
+            def method():
+                return self._properties.get(property_name)
+        else:
+            raise AttributeError(name)
+        setattr(self, name, method)
+        return method
+
+    def open(self):
+        pass
+
+    def openWaitForAttachment(self, timeout):
+        pass
+
+    def close(self):
+        pass
+
+    def addPositionOffset(self, position_offset):
+        self._properties['Position'] += position_offset
+        self._properties['TargetPosition'] = self._properties.get('TargetPosition', 0.0) + position_offset
+
+    def _fire(self, event_name, *args):
+        handler = self._handlers.get(event_name)
+        if handler is not None:
+            handler(self, *args)
+
+    def _replay_attach(self, value):
+        self._properties['Attached'] = True
+        self._fire('Attach')
+
+    def _replay_detach(self, value):
+        self._properties['Attached'] = False
+        self._fire('Detach')
+
+    def _replay_position_change(self, value):
+        self._properties['Position'] = value
+        self._fire('PositionChange', value)
+
+    def _replay_velocity_change(self, value):
+        self._properties['Velocity'] = value
+        self._properties['IsMoving'] = value != 0.0
+        self._fire('VelocityChange', value)
+
+    def _replay_stopped(self, value):
+        self._properties['Velocity'] = 0.0
+        self._properties['IsMoving'] = False
+        self._fire('Stopped')
+
+    def _replay_state_change(self, value):
+        state = value != 0.0
+        self._properties['State'] = state
+        self._fire('StateChange', state)
+
+    def _replay_voltage_ratio_change(self, value):
+        self._properties['VoltageRatio'] = value
+        self._fire('VoltageRatioChange', value)
+
+# Replays a recording made by EventRecorder through the handlers of real device objects.
+#
+# The replay is the backend the devices are constructed with, so their handles are
+# ReplayHandles and their clock is the timestamp of the event being replayed:
+#
+#   event_replay = EventReplay('recording')
+#   backend.set_backend(event_replay)
+#   stepper_joint = StepperJoint(stepper_joint_info, 'x_axis', logger)
+#   event_replay.add_device(stepper_joint)
+#   stepper_joint.open()
+#   event_replay.run()
+#
+# Channels are matched by name, so devices need the names they were recorded with.
+# Commands the application issued during the recording (home, set_target_position)
+# are not in the recording, schedule them at their recorded time with call_at.
+# Events are replayed on the calling thread in timestamp order, one segment at a time,
+# either as fast as possible or at speed times real time. Timers that device code
+# starts itself (for example the homing timeout) still run in real time.
+class EventReplay:
+    def __init__(self, directory, block_event_count=65536):
+        self.directory = directory
+        self.block_event_count = block_event_count
+        with open(os.path.join(directory, MANIFEST_FILE_NAME)) as f:
+            self.manifest = json.load(f)
+        if self.manifest['version'] != EVENT_RECORDER_VERSION:
+            raise ValueError('unsupported recording version {0}'.format(self.manifest['version']))
+        self.channels = {channel['name']: channel for channel in self.manifest['channels']}
+        self._handles = [None] * len(self.manifest['channels'])
+        self._time = self._first_timestamp()
+        self._scheduled = []
+        self._scheduled_count = 0
+
+    # backend interface
+    def create_handle(self, channel_class_name):
+        return ReplayHandle(channel_class_name)
+
+    def monotonic(self):
+        return self._time
+
+    def get_event_count(self):
+        return sum(segment['event_count'] for segment in self.manifest['segments'])
+
+    # callback() runs on the replay thread before the first event at or after timestamp
+    def call_at(self, timestamp, callback):
+        heapq.heappush(self._scheduled, (timestamp, self._scheduled_count, callback))
+        self._scheduled_count += 1
+
+    # raises ValueError for channels that are not in the recording
+    def add_device(self, device):
+        for phidget in device.phidgets():
+            channel = self.channels.get(phidget.name)
+            if channel is None:
+                raise ValueError('{0} is not in the recording'.format(phidget.name))
+            handle = phidget._phidget_handle
+            # instrumented handles wrap the replay handle
+            handle = getattr(handle, '_handle', handle)
+            handle._properties.update({'DeviceSerialNumber': channel['serial_number'],
+                                       'DeviceLabel': channel['label'],
+                                       'HubPort': channel['hub_port'],
+                                       'Channel': channel['channel']})
+            self._handles[channel['channel_id']] = handle
+        return device
+
+    # speed None replays as fast as possible, events between start_time and end_time
+    # (recorded timestamps) only, returns {'event_count', 'elapsed', 'events_per_second'}
+    def run(self, speed=None, start_time=None, end_time=None):
+        replay_event_handlers = [handle._replay_event_handlers if handle is not None else None for handle in self._handles]
+        scheduled = self._scheduled
+        event_count = 0
+        wall_start_time = time.monotonic()
+        first_timestamp = None
+        for timestamps, channel_ids, event_types, values in self._blocks(start_time, end_time):
+            for timestamp, channel_id, event_type, value in zip(timestamps, channel_ids, event_types, values):
+                handlers = replay_event_handlers[channel_id]
+                if handlers is None:
+                    continue
+                if speed is not None:
+                    if first_timestamp is None:
+                        first_timestamp = timestamp
+                    wait_time = (timestamp - first_timestamp) / speed - (time.monotonic() - wall_start_time)
+                    if wait_time > 0.0:
+                        time.sleep(wait_time)
+                while scheduled and scheduled[0][0] <= timestamp:
+                    scheduled_timestamp, _, callback = heapq.heappop(scheduled)
+                    self._time = max(self._time, scheduled_timestamp)
+                    callback()
+                self._time = timestamp
+                handlers[event_type](value)
+                event_count += 1
+        elapsed = time.monotonic() - wall_start_time
+        return {'event_count': event_count,
+                'elapsed': elapsed,
+                'events_per_second': event_count / elapsed if elapsed > 0.0 else 0.0}
+
+    # yields (timestamps, channel_ids, event_types, values) lists of at most
+    # block_event_count events, sorted by timestamp within each segment
+    # The recorder reads the clock under its lock, so its events are stored in
+    # timestamp order across segments and the sort leaves them as they are. Older
+    # recordings timestamped before taking the lock, neighbours there may swap, and the
+    # sort orders them within each segment only, not across a segment boundary.
+    def _blocks(self, start_time, end_time):
+        for segment in self.manifest['segments']:
+            columns = self._read_segment(segment)
+            if columns is None:
+                continue
+            timestamps = columns[0]
+            order = numpy.argsort(timestamps, kind='stable')
+            mask = numpy.ones(len(order), dtype=bool)
+            if start_time is not None:
+                mask &= timestamps[order] >= start_time
+            if end_time is not None:
+                mask &= timestamps[order] <= end_time
+            order = order[mask]
+            for start in range(0, len(order), self.block_event_count):
+                block = order[start:start + self.block_event_count]
+                yield [column[block].tolist() for column in columns]
+
+    def _read_segment(self, segment):
+        event_count = segment['event_count']
+        if event_count == 0:
+            return None
+        return [numpy.memmap(segment_column_path(self.directory, segment['index'], column_name), dtype=dtype, mode='r', shape=(event_count,))
+                for column_name, dtype in EVENT_COLUMNS]
+
+    def _first_timestamp(self):
+        for segment in self.manifest['segments']:
+            columns = self._read_segment(segment)
+            if columns is not None:
+                return float(columns[0].min())
+        return 0.0
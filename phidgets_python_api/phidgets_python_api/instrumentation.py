@@ -0,0 +1,186 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import array
+import threading
+import time
+
+class LatencyHistogram():
+    # logarithmic buckets over nanoseconds, SUB_BUCKET_COUNT buckets per power of two
+    SUB_BUCKET_BITS = 2
+    SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+    BUCKET_COUNT = 64 * SUB_BUCKET_COUNT
+
+    def __init__(self):
+        self._counts = array.array('Q', [0] * self.BUCKET_COUNT)
+        self.reset()
+
+    def reset(self):
+        for i in range(self.BUCKET_COUNT):
+            self._counts[i] = 0
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    @classmethod
+    def _bucket(cls, duration):
+        bit_length = duration.bit_length()
+        if bit_length <= cls.SUB_BUCKET_BITS:
+            return duration
+        sub_bucket = (duration >> (bit_length - cls.SUB_BUCKET_BITS - 1)) & (cls.SUB_BUCKET_COUNT - 1)
+        return (bit_length - cls.SUB_BUCKET_BITS) * cls.SUB_BUCKET_COUNT + sub_bucket
+
+    @classmethod
+    def _bucket_upper_bound(cls, bucket):
+        if bucket < cls.SUB_BUCKET_COUNT:
+            return bucket
+        bit_length = bucket // cls.SUB_BUCKET_COUNT + cls.SUB_BUCKET_BITS
+        sub_bucket = bucket % cls.SUB_BUCKET_COUNT
+        return ((cls.SUB_BUCKET_COUNT + sub_bucket + 1) << (bit_length - cls.SUB_BUCKET_BITS - 1)) - 1
+
+    # duration in nanoseconds
+    def record(self, duration):
+        self._counts[self._bucket(duration)] += 1
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+
+    # nanoseconds, the upper bound of the bucket holding the percentile
+    def percentile(self, fraction):
+        if self.count == 0:
+            return 0
+        threshold = fraction * self.count
+        cumulative_count = 0
+        for bucket in range(self.BUCKET_COUNT):
+            cumulative_count += self._counts[bucket]
+            if cumulative_count >= threshold:
+                return min(self._bucket_upper_bound(bucket), self.max)
+        return self.max
+
+class PhidgetInstrumentation():
+    def __init__(self, name):
+        self.name = name
+        self.histograms = {}
+        self._start_time = time.monotonic()
+        self._log_thread = None
+        self._log_thread_stop = threading.Event()
+
+    def histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms.setdefault(name, LatencyHistogram())
+        return histogram
+
+    def reset(self):
+        [histogram.reset() for histogram in self.histograms.values()]
+        self._start_time = time.monotonic()
+
+    # durations in seconds
+    def snapshot(self):
+        elapsed = max(time.monotonic() - self._start_time, 1e-9)
+        snapshot = {}
+        for name, histogram in sorted(self.histograms.items()):
+            if histogram.count == 0:
+                continue
+            snapshot[name] = {'count': histogram.count,
+                              'per_second': histogram.count / elapsed,
+                              'mean': histogram.total / histogram.count * 1e-9,
+                              'p50': histogram.percentile(0.5) * 1e-9,
+                              'p99': histogram.percentile(0.99) * 1e-9,
+                              'max': histogram.max * 1e-9}
+        return snapshot
+
+    def log_summary(self, logger):
+        for name, statistics in self.snapshot().items():
+            msg = '{0} {1}: {2[count]} calls, {2[per_second]:.1f}/s, p50 {3:.1f} us, p99 {4:.1f} us, max {5:.1f} us'
+            msg = msg.format(self.name, name, statistics, statistics['p50'] * 1e6, statistics['p99'] * 1e6, statistics['max'] * 1e6)
+            logger.info(msg)
+
+    # interval in seconds
+    def start_periodic_log(self, logger, interval):
+        self.stop_periodic_log()
+        self._log_thread_stop.clear()
+        self._log_thread = threading.Thread(target=self._log_loop, args=(logger, interval), name=self.name + '_instrumentation', daemon=True)
+        self._log_thread.start()
+
+    def stop_periodic_log(self):
+        if self._log_thread is not None:
+            self._log_thread_stop.set()
+            self._log_thread.join()
+            self._log_thread = None
+
+    def _log_loop(self, logger, interval):
+        while not self._log_thread_stop.wait(interval):
+            self.log_summary(logger)
+
+# Stands in for a Phidget22 channel handle, timing every method call and every
+# event handler registered through it. Only used when instrumentation is enabled.
+class InstrumentedHandle():
+    def __init__(self, handle, instrumentation):
+        self._handle = handle
+        self._instrumentation = instrumentation
+
+    def __eq__(self, other):
+        if isinstance(other, InstrumentedHandle):
+            other = other._handle
+        return self._handle == other
+
+    def __hash__(self):
+        return hash(self._handle)
+
+    def __getattr__(self, name):
+        method = getattr(self._handle, name)
+        if not callable(method):
+            return method
+        histogram = self._instrumentation.histogram(name)
+        if name.startswith('setOn') and name.endswith('Handler'):
+            handler_histogram = self._instrumentation.histogram(name[3:])
+
+            def set_handler(handler):
+                if handler is not None:
+                    handler = self._timed(handler, handler_histogram)
+                start = time.perf_counter_ns()
+                try:
+                    return method(handler)
+                finally:
+                    histogram.record(time.perf_counter_ns() - start)
+            timed_method = set_handler
+        else:
+            timed_method = self._timed(method, histogram)
+        setattr(self, name, timed_method)
+        return timed_method
+
+    @staticmethod
+    def _timed(function, histogram):
+        def timed_function(*args):
+            start = time.perf_counter_ns()
+            try:
+                return function(*args)
+            finally:
+                histogram.record(time.perf_counter_ns() - start)
+        return timed_function
@@ -25,17 +25,38 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
-from Phidget22.PhidgetException import *
+import threading
+
+from phidgets_python_api import device_registry
 from phidgets_python_api.digital_output import DigitalOutput, DigitalOutputInfo
 
+def blink_frames(led_mask):
+    return [led_mask, 0]
+
+def chase_frames(led_count):
+    return [1 << led_index for led_index in range(led_count)]
+
 class LedHubInfo():
+    __slots__ = ('led_count', '_leds_info')
+
     def __init__(self):
         self.led_count = 6
-        self.leds_info = []
-        for i in range(self.led_count):
-            led_info = DigitalOutputInfo()
-            led_info.phidget_info.label = 'led_hub'
-            self.leds_info.append(led_info)
+        self._leds_info = None
+
+    # built on first use, for led_count as set by then
+    @property
+    def leds_info(self):
+        if self._leds_info is None:
+            self._leds_info = []
+            for i in range(self.led_count):
+                led_info = DigitalOutputInfo()
+                led_info.phidget_info.label = 'led_hub'
+                self._leds_info.append(led_info)
+        return self._leds_info
+
+    @leds_info.setter
+    def leds_info(self, leds_info):
+        self._leds_info = leds_info
 
 class LedHub:
     def __init__(self, led_hub_info, name, logger):
@@ -46,6 +67,13 @@ class LedHub:
         self.leds = []
         for i in range(self.led_hub_info.led_count):
             led = DigitalOutput(self.led_hub_info.leds_info[i], self.name + '_' + str(i), self.logger)
+            self.leds.append(led)
+        self._led_set = set(self.leds)
+
+        self._pending_write_count = 0
+        self._pending_write_lock = threading.Lock()
+        self._writes_done = threading.Event()
+        self._writes_done.set()
 
     def open(self):
         [led.open() for led in self.leds]
@@ -54,16 +82,23 @@ class LedHub:
         [led.close() for led in self.leds]
 
     def has_handle(self, handle):
-        for led in self.leds:
-            if led.has_handle(handle):
-                return True
-        return False
+        return device_registry.lookup(handle) in self._led_set
 
     def set_on_attach_handler(self, on_attach_handler):
         [led.set_on_attach_handler(on_attach_handler) for led in self.leds]
 
     def _on_attach_handler(self, handle):
-        [led._on_attach_handler(handle) for led in self.leds if led.has_handle(handle)]
+        led = device_registry.lookup(handle)
+        if led in self._led_set:
+            led._on_attach_handler(handle)
+
+    def set_on_detach_handler(self, on_detach_handler):
+        [led.set_on_detach_handler(on_detach_handler) for led in self.leds]
+
+    def _on_detach_handler(self, handle):
+        led = device_registry.lookup(handle)
+        if led in self._led_set:
+            led._on_detach_handler(handle)
 
     def is_attached(self):
         for led in self.leds:
@@ -71,8 +106,91 @@ class LedHub:
                 return False
         return True
 
+    def phidgets(self):
+        return list(self.leds)
+
     def turn_on_led(self, led_index):
         self.leds[led_index].activate()
 
     def turn_off_led(self, led_index):
         self.leds[led_index].deactivate()
+
+    # frame is a bitmask, bit i is led i, or a sequence of bools, True turns the led on
+    # only leds whose last written state differs are written, all writes are issued
+    # before any completes, wait blocks until the device has applied them (timeout in s)
+    def set_led_frame(self, frame, wait=False, timeout=1.0):
+        if isinstance(frame, int):
+            frame = [bool(frame & (1 << led_index)) for led_index in range(len(self.leds))]
+        writes = []
+        for led, led_on in zip(self.leds, frame):
+            state = led.get_active_state(bool(led_on))
+            if led._get_cached_attribute('state') != state:
+                writes.append((led, state))
+        if not writes:
+            return True
+        with self._pending_write_lock:
+            self._pending_write_count += len(writes)
+            self._writes_done.clear()
+        for led, state in writes:
+            led.set_state_async(state, self._on_write_done_handler)
+        if wait:
+            return self._writes_done.wait(timeout)
+        return True
+
+    def _on_write_done_handler(self, handle, *result):
+        with self._pending_write_lock:
+            self._pending_write_count -= 1
+            if self._pending_write_count <= 0:
+                self._pending_write_count = 0
+                self._writes_done.set()
+
+class LedPatternSequencer:
+    # one thread steps patterns on any number of led hubs, frame_interval in ms
+    def __init__(self, frame_interval, name='led_pattern_sequencer'):
+        self.frame_interval = frame_interval
+        self.name = name
+        self._patterns = {}
+        self._patterns_lock = threading.Lock()
+        self._thread = None
+        self._thread_stop = threading.Event()
+
+    # frames as accepted by LedHub.set_led_frame, see blink_frames and chase_frames
+    def set_pattern(self, led_hub, frames, repeat=True):
+        with self._patterns_lock:
+            self._patterns[led_hub] = [list(frames), 0, repeat]
+
+    def clear_pattern(self, led_hub):
+        with self._patterns_lock:
+            self._patterns.pop(led_hub, None)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread_stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._thread_stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        frame_interval = self.frame_interval / 1000.0
+        while not self._thread_stop.wait(frame_interval):
+            self.step()
+
+    def step(self):
+        with self._patterns_lock:
+            patterns = list(self._patterns.items())
+        for led_hub, pattern in patterns:
+            frames, frame_index, repeat = pattern
+            if frame_index >= len(frames):
+                if not repeat:
+                    self.clear_pattern(led_hub)
+                    continue
+                frame_index = 0
+            led_hub.set_led_frame(frames[frame_index])
+            pattern[1] = frame_index + 1
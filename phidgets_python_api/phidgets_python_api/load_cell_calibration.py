@@ -0,0 +1,91 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import json
+import os
+import numpy
+
+class LoadCellCalibration():
+    def __init__(self):
+        # polynomial coefficients, highest power first, force = polyval(coefficients, voltage_ratio)
+        self.coefficients = [1.0, 0.0]
+        self.tare_offset = 0.0
+
+    def fit(self, voltage_ratios, forces, degree=1):
+        voltage_ratios = numpy.asarray(voltage_ratios, dtype=numpy.float64)
+        forces = numpy.asarray(forces, dtype=numpy.float64)
+        if len(voltage_ratios) <= degree:
+            raise ValueError('fitting a degree {0} calibration needs at least {1} points'.format(degree, degree + 1))
+        self.coefficients = numpy.polyfit(voltage_ratios, forces, degree).tolist()
+        self.tare_offset = 0.0
+
+    def convert(self, voltage_ratios):
+        forces = numpy.polyval(self.coefficients, numpy.asarray(voltage_ratios, dtype=numpy.float64))
+        forces -= self.tare_offset
+        return forces
+
+    def tare(self, voltage_ratio):
+        self.tare_offset = float(numpy.polyval(self.coefficients, voltage_ratio))
+
+    def to_dict(self):
+        return {'coefficients': list(self.coefficients), 'tare_offset': self.tare_offset}
+
+    @classmethod
+    def from_dict(cls, calibration_dict):
+        calibration = cls()
+        calibration.coefficients = [float(coefficient) for coefficient in calibration_dict['coefficients']]
+        calibration.tare_offset = float(calibration_dict.get('tare_offset', 0.0))
+        return calibration
+
+class LoadCellCalibrationStore():
+    def __init__(self, path):
+        self.path = path
+        self._calibrations = {}
+        if os.path.exists(self.path):
+            self.load()
+
+    @staticmethod
+    def _key(phidget_info):
+        return '{0.serial_number}/{0.hub_port}/{0.channel}'.format(phidget_info)
+
+    def load(self):
+        with open(self.path, 'r') as calibration_file:
+            calibrations = json.load(calibration_file)
+        self._calibrations = {key: LoadCellCalibration.from_dict(value) for key, value in calibrations.items()}
+
+    def save(self):
+        calibrations = {key: calibration.to_dict() for key, calibration in self._calibrations.items()}
+        temporary_path = self.path + '.tmp'
+        with open(temporary_path, 'w') as calibration_file:
+            json.dump(calibrations, calibration_file, indent=2, sort_keys=True)
+        os.replace(temporary_path, self.path)
+
+    def get(self, phidget_info):
+        return self._calibrations.get(self._key(phidget_info))
+
+    def set(self, phidget_info, calibration):
+        self._calibrations[self._key(phidget_info)] = calibration
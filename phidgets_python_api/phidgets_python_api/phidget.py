@@ -25,34 +25,84 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
-import Phidget22
-from Phidget22.PhidgetException import *
+import time
+
+from phidgets_python_api import device_registry
+from phidgets_python_api.backend import get_backend
+from phidgets_python_api.event_recorder import EVENT_ATTACH, EVENT_DETACH
+from phidgets_python_api.instrumentation import InstrumentedHandle, PhidgetInstrumentation
+
+# the values of Phidget22.Phidget.Phidget.ANY_*, defined here so that importing this
+# package does not load the Phidget22 library, Phidget22 device modules are only
+# imported when a device handle is created or an enumeration value is needed
+ANY_SERIAL_NUMBER = -1
+ANY_HUB_PORT = -1
+ANY_CHANNEL = -1
+ANY_LABEL = None
 
 class PhidgetInfo():
+    __slots__ = ('serial_number', 'label', 'channel', 'hub_port', 'is_hub_port_device',
+                 'attribute_cache_enabled', 'instrumentation_enabled')
+
     def __init__(self):
-        self.serial_number = Phidget22.Phidget.Phidget.ANY_SERIAL_NUMBER
-        self.label = Phidget22.Phidget.Phidget.ANY_LABEL
-        self.channel = Phidget22.Phidget.Phidget.ANY_CHANNEL
-        self.hub_port = Phidget22.Phidget.Phidget.ANY_HUB_PORT
+        self.serial_number = ANY_SERIAL_NUMBER
+        self.label = ANY_LABEL
+        self.channel = ANY_CHANNEL
+        self.hub_port = ANY_HUB_PORT
         self.is_hub_port_device = False
+        self.attribute_cache_enabled = True
+        self.instrumentation_enabled = False
+
+_NOT_CACHED = object()
 
 class Phidget:
+    CHANNEL_CLASS_NAME = None
+
     def __init__(self, phidget_info, name, logger):
         self.phidget_info = phidget_info
         self.name = name
         self.logger = logger
 
+        self._attach_handler = None
+        self._attribute_cache = {}
+        self._attribute_cache_hit_count = 0
+        self._attribute_cache_miss_count = 0
+        self._written_attributes = {}
+        self._event_recorder = None
+        self._event_channel_id = None
+        self._monotonic = getattr(get_backend(), 'monotonic', time.monotonic)
+
+        if self.phidget_info.instrumentation_enabled:
+            self.instrumentation = PhidgetInstrumentation(self.name)
+        else:
+            self.instrumentation = None
+
         self._set_handle_and_on_attach_handler(None)
 
+    # subclasses use self._phidget_handle after this call, which may be an InstrumentedHandle
     def _set_handle_and_on_attach_handler(self, phidget_handle):
+        if phidget_handle is not None:
+            device_registry.register(phidget_handle, self)
+        if (self.instrumentation is not None) and (phidget_handle is not None):
+            phidget_handle = InstrumentedHandle(phidget_handle, self.instrumentation)
         self._phidget_handle = phidget_handle
         self.set_on_attach_handler(self._on_attach_handler)
+        self.set_on_detach_handler(self._on_detach_handler)
 
     def _on_attach_handler(self, handle):
-        self.phidget_info.serial_number = self._phidget_handle.getDeviceSerialNumber()
-        self.phidget_info.label = self._phidget_handle.getDeviceLabel()
-        self.phidget_info.channel = self._phidget_handle.getChannel()
-        self.phidget_info.hub_port = self._phidget_handle.getHubPort()
+        if self._event_recorder is not None:
+            self._event_recorder.record(self._event_channel_id, EVENT_ATTACH, 0.0)
+        self._attribute_cache.clear()
+        # only wildcard addresses need reading back, after the first attach they are exact
+        if self.phidget_info.serial_number == ANY_SERIAL_NUMBER:
+            self.phidget_info.serial_number = self._phidget_handle.getDeviceSerialNumber()
+        if self.phidget_info.label == ANY_LABEL:
+            self.phidget_info.label = self._phidget_handle.getDeviceLabel()
+        if self.phidget_info.channel == ANY_CHANNEL:
+            self.phidget_info.channel = self._phidget_handle.getChannel()
+        if self.phidget_info.hub_port == ANY_HUB_PORT:
+            self.phidget_info.hub_port = self._phidget_handle.getHubPort()
+        # has no wildcard, but the device may report otherwise than configured
         self.phidget_info.is_hub_port_device = self._phidget_handle.getIsHubPortDevice()
 
         if self.phidget_info.label:
@@ -62,6 +112,101 @@ class Phidget:
         msg = msg.format(self.name, self.phidget_info)
         self.logger.info(msg)
 
+    def _on_detach_handler(self, handle):
+        if self._event_recorder is not None:
+            self._event_recorder.record(self._event_channel_id, EVENT_DETACH, 0.0)
+        self._attribute_cache.clear()
+
+    # event_recorder is an EventRecorder, or None to stop recording, see event_recorder.py
+    # the raw device events are recorded before any filtering or dispatch
+    def set_event_recorder(self, event_recorder, channel_id=None):
+        self._event_recorder = event_recorder
+        self._event_channel_id = channel_id
+        self._update_event_handlers()
+
+    # subclasses reinstall their event dispatchers, which record when a recorder is set
+    def _update_event_handlers(self):
+        pass
+
+    # Write-through cache of device attributes. Writes of the value last written are
+    # skipped, and getters of values that only change when written, or never change
+    # (limits), are answered from the cache. The cache is cleared on attach and detach.
+    def _set_attribute(self, name, value, setter):
+        if self._is_attribute_current(name, value):
+            return
+        setter(value)
+        self._record_written_attribute(name, value, setter)
+
+    # counts a cache hit when value is the cached one and the write can be skipped
+    def _is_attribute_current(self, name, value):
+        if not self.phidget_info.attribute_cache_enabled:
+            return False
+        if self._attribute_cache.get(name, _NOT_CACHED) == value:
+            self._attribute_cache_hit_count += 1
+            return True
+        self._attribute_cache_miss_count += 1
+        return False
+
+    # setter is what restore_state calls, also for values written some other way
+    def _record_written_attribute(self, name, value, setter):
+        # kept in order of last write so a replay reproduces the same sequence
+        self._written_attributes.pop(name, None)
+        self._written_attributes[name] = (value, setter)
+        if self.phidget_info.attribute_cache_enabled:
+            self._attribute_cache[name] = value
+
+    def _get_attribute(self, name, getter):
+        if self.phidget_info.attribute_cache_enabled:
+            value = self._attribute_cache.get(name, _NOT_CACHED)
+            if value is not _NOT_CACHED:
+                self._attribute_cache_hit_count += 1
+                return value
+            self._attribute_cache_miss_count += 1
+        value = getter()
+        if self.phidget_info.attribute_cache_enabled:
+            self._attribute_cache[name] = value
+        return value
+
+    # the cached value without a device call, default when the value is not cached
+    def _get_cached_attribute(self, name, default=None):
+        return self._attribute_cache.get(name, default)
+
+    # the next get reads the device, for example after a write failed
+    def _invalidate_attribute(self, name):
+        self._attribute_cache.pop(name, None)
+
+    # {name: (value, setter)} of every attribute written through _set_attribute
+    def get_written_attributes(self):
+        return dict(self._written_attributes)
+
+    # rewrites the attributes of an earlier get_written_attributes(), or the ones last
+    # written, after a channel reattached with its power on defaults and the attach
+    # handler applied the configured ones; values that are already current are skipped
+    def restore_state(self, written_attributes=None):
+        if written_attributes is None:
+            written_attributes = self.get_written_attributes()
+        for name, (value, setter) in self._get_restorable_attributes(written_attributes).items():
+            self._set_attribute(name, value, setter)
+
+    # the attributes restore_state writes, subclasses leave out motion commands
+    def _get_restorable_attributes(self, written_attributes):
+        return written_attributes
+
+    def clear_attribute_cache(self):
+        self._attribute_cache.clear()
+
+    # {name: {'count', 'per_second', 'mean', 'p50', 'p99', 'max'}} for every timed
+    # device call and event handler, or None when instrumentation is not enabled
+    def get_instrumentation_snapshot(self):
+        if self.instrumentation is None:
+            return None
+        return self.instrumentation.snapshot()
+
+    def get_attribute_cache_statistics(self):
+        return {'hits': self._attribute_cache_hit_count,
+                'misses': self._attribute_cache_miss_count,
+                'size': len(self._attribute_cache)}
+
     def open(self):
         self._phidget_handle.setDeviceSerialNumber(self.phidget_info.serial_number)
         if self.phidget_info.label:
@@ -70,23 +215,40 @@ class Phidget:
         self._phidget_handle.setHubPort(self.phidget_info.hub_port)
         self._phidget_handle.setIsHubPortDevice(self.phidget_info.is_hub_port_device)
 
+        device_registry.register(self._phidget_handle, self)
         self._phidget_handle.open()
 
+    # the handle stays registered until the detach reported by close has been dispatched
     def close(self):
         if self._phidget_handle is not None:
             self._phidget_handle.close()
+            device_registry.unregister(self._phidget_handle)
+
+    # closes and opens the channel handle again, keeping handlers and state
+    def reopen(self):
+        self._phidget_handle.close()
+        self.open()
 
     def is_attached(self):
         if self._phidget_handle is None:
             return False
         return self._phidget_handle.getAttached()
 
+    def phidgets(self):
+        return [self]
+
     # def on_attach_handler(self, handle):
     def set_on_attach_handler(self, on_attach_handler):
+        self._attach_handler = on_attach_handler
         if self._phidget_handle is not None:
             self._phidget_handle.setOnAttachHandler(on_attach_handler)
 
+    # the handler last set with set_on_attach_handler, by default _on_attach_handler
+    def get_on_attach_handler(self):
+        return self._attach_handler
+
     # def on_detach_handler(self, handle):
+    # like the attach handler, a replacement handler should call self._on_detach_handler(handle)
     def set_on_detach_handler(self, on_detach_handler):
         if self._phidget_handle is not None:
             self._phidget_handle.setOnDetachHandler(on_detach_handler)
@@ -0,0 +1,101 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import bisect
+import itertools
+import threading
+
+CROSS_BOTH = 'both'
+CROSS_ABOVE = 'above'
+CROSS_BELOW = 'below'
+
+# Trigger positions kept sorted, so each position update finds the crossed positions
+# by bisecting between the previous and the new position, and only those are visited.
+# A position is crossed above when previous < trigger_position <= position, and
+# crossed below when position < trigger_position <= previous.
+class PositionTriggerTable:
+    def __init__(self):
+        self._trigger_positions = []
+        self._triggers = []
+        self._trigger_ids = itertools.count()
+        self._trigger_positions_by_id = {}
+        self._lock = threading.Lock()
+        self._previous_position = None
+
+    def __len__(self):
+        return len(self._triggers)
+
+    # def on_position_trigger_handler(handle, position, trigger_position, crossed_above):
+    # returns a trigger id for remove
+    def add(self, trigger_position, on_position_trigger_handler, direction=CROSS_BOTH):
+        trigger_id = next(self._trigger_ids)
+        with self._lock:
+            index = bisect.bisect_right(self._trigger_positions, trigger_position)
+            self._trigger_positions.insert(index, trigger_position)
+            self._triggers.insert(index, (trigger_id, on_position_trigger_handler, direction))
+            self._trigger_positions_by_id[trigger_id] = trigger_position
+        return trigger_id
+
+    def remove(self, trigger_id):
+        with self._lock:
+            trigger_position = self._trigger_positions_by_id.pop(trigger_id, None)
+            if trigger_position is None:
+                return
+            index = bisect.bisect_left(self._trigger_positions, trigger_position)
+            while self._triggers[index][0] != trigger_id:
+                index += 1
+            del self._trigger_positions[index]
+            del self._triggers[index]
+
+    def clear(self):
+        with self._lock:
+            self._trigger_positions = []
+            self._triggers = []
+            self._trigger_positions_by_id = {}
+
+    # forgets the previous position, so a jump (position offset, reattach) is not a crossing
+    def reset(self):
+        self._previous_position = None
+
+    def update(self, handle, position):
+        previous_position = self._previous_position
+        self._previous_position = position
+        if (previous_position is None) or (position == previous_position):
+            return
+        with self._lock:
+            start = bisect.bisect_right(self._trigger_positions, min(previous_position, position))
+            end = bisect.bisect_right(self._trigger_positions, max(previous_position, position))
+            crossed = list(zip(self._trigger_positions[start:end], self._triggers[start:end]))
+        crossed_above = position > previous_position
+        if crossed_above:
+            skipped_direction = CROSS_BELOW
+        else:
+            skipped_direction = CROSS_ABOVE
+            crossed.reverse()
+        for trigger_position, (trigger_id, on_position_trigger_handler, direction) in crossed:
+            if direction != skipped_direction:
+                on_position_trigger_handler(handle, position, trigger_position, crossed_above)
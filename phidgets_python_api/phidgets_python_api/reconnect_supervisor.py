@@ -0,0 +1,189 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import functools
+import threading
+import time
+
+class _Recovery():
+    __slots__ = ('device', 'phidget', 'written_attributes', 'detach_time', 'reopen_delay', 'next_reopen_time', 'reopen_count')
+
+    def __init__(self, device, phidget, detach_time, reopen_delay):
+        self.device = device
+        self.phidget = phidget
+        # taken at detach, the attach handler overwrites the record with configured values
+        self.written_attributes = phidget.get_written_attributes()
+        self.detach_time = detach_time
+        self.reopen_delay = reopen_delay
+        self.next_reopen_time = detach_time + reopen_delay
+        self.reopen_count = 0
+
+# Supervises open Phidgets and composite devices (StepperJoint, LedHub, ...) after
+# they have attached. Phidget22 reattaches a channel on its own when its device comes
+# back, so a detached channel is first given reopen_delay seconds to return, then its
+# handle is closed and opened again with a delay doubling up to max_reopen_delay.
+# After the channel reattaches and its attach handler has applied the configured
+# values, every value written since (limits, currents, data intervals, control mode,
+# output states, ...) is written again from the record taken when it detached.
+# Target positions are not restored, a stepper restarts at position 0 so the joint
+# is marked as not homed by its detach handler instead.
+# start() replaces the attach and detach handlers of every channel, call it after
+# the devices have been opened (for example by DeviceManager.open_all).
+class ReconnectSupervisor:
+    def __init__(self, logger, reopen_delay=2.0, max_reopen_delay=30.0, restore_state=True, name='reconnect_supervisor'):
+        self.logger = logger
+        self.devices = []
+        self.reopen_delay = reopen_delay
+        self.max_reopen_delay = max_reopen_delay
+        self.restore_state = restore_state
+        self.name = name
+        self._recoveries = {}
+        self._recoveries_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._running = False
+        self._on_detach_handler = None
+        self._on_recovered_handler = None
+        self._detach_count = 0
+        self._reopen_count = 0
+        self._recovery_times = []
+
+    def add_device(self, device):
+        self.devices.append(device)
+        return device
+
+    def phidgets(self):
+        return [phidget for device in self.devices for phidget in device.phidgets()]
+
+    # def on_detach_handler(handle):
+    # called after the channel has handled its own detach
+    def set_on_detach_handler(self, on_detach_handler):
+        self._on_detach_handler = on_detach_handler
+
+    # def on_recovered_handler(phidget, recovery_time):
+    # called after the channel has reattached and its state has been restored
+    def set_on_recovered_handler(self, on_recovered_handler):
+        self._on_recovered_handler = on_recovered_handler
+
+    def start(self):
+        if self._thread is not None:
+            return
+        for device in self.devices:
+            for phidget in device.phidgets():
+                phidget.set_on_attach_handler(functools.partial(self._attach_handler, device, phidget))
+                phidget.set_on_detach_handler(functools.partial(self._detach_handler, device, phidget))
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._running = False
+        self._wake.set()
+        self._thread.join()
+        self._thread = None
+
+    def is_recovering(self):
+        with self._recoveries_lock:
+            return len(self._recoveries) > 0
+
+    # returns {'detaches', 'reopens', 'recoveries', 'pending': [name],
+    # 'last', 'mean', 'max'}, recovery times in seconds or None before the first one
+    def get_recovery_statistics(self):
+        with self._recoveries_lock:
+            pending = list(self._recoveries)
+            recovery_times = list(self._recovery_times)
+        statistics = {'detaches': self._detach_count,
+                      'reopens': self._reopen_count,
+                      'recoveries': len(recovery_times),
+                      'pending': pending,
+                      'last': None,
+                      'mean': None,
+                      'max': None}
+        if recovery_times:
+            statistics['last'] = recovery_times[-1]
+            statistics['mean'] = sum(recovery_times) / len(recovery_times)
+            statistics['max'] = max(recovery_times)
+        return statistics
+
+    def _detach_handler(self, device, phidget, handle):
+        device._on_detach_handler(handle)
+        now = time.monotonic()
+        with self._recoveries_lock:
+            # closing the handle for a reopen may report the detach again
+            if phidget.name not in self._recoveries:
+                self._recoveries[phidget.name] = _Recovery(device, phidget, now, self.reopen_delay)
+                self._detach_count += 1
+                self.logger.warning('{0} detached'.format(phidget.name))
+        self._wake.set()
+        if self._on_detach_handler is not None:
+            self._on_detach_handler(handle)
+
+    def _attach_handler(self, device, phidget, handle):
+        device._on_attach_handler(handle)
+        with self._recoveries_lock:
+            recovery = self._recoveries.pop(phidget.name, None)
+        if recovery is None:
+            return
+        if self.restore_state:
+            try:
+                phidget.restore_state(recovery.written_attributes)
+            except Exception as e:
+                self.logger.error('{0} state restore failed: {1}'.format(phidget.name, e))
+        recovery_time = time.monotonic() - recovery.detach_time
+        with self._recoveries_lock:
+            self._recovery_times.append(recovery_time)
+        self.logger.info('{0} recovered in {1:.3f} s after {2} reopens'.format(phidget.name, recovery_time, recovery.reopen_count))
+        if self._on_recovered_handler is not None:
+            self._on_recovered_handler(phidget, recovery_time)
+
+    def _run(self):
+        while self._running:
+            with self._recoveries_lock:
+                next_reopen_times = [recovery.next_reopen_time for recovery in self._recoveries.values()]
+            timeout = None
+            if next_reopen_times:
+                timeout = max(min(next_reopen_times) - time.monotonic(), 0.0)
+            self._wake.wait(timeout)
+            self._wake.clear()
+            if not self._running:
+                return
+            now = time.monotonic()
+            with self._recoveries_lock:
+                due_recoveries = [recovery for recovery in self._recoveries.values() if recovery.next_reopen_time <= now]
+            # reopened from this thread, closing a handle from its own event thread blocks
+            for recovery in due_recoveries:
+                recovery.reopen_count += 1
+                self._reopen_count += 1
+                recovery.reopen_delay = min(2.0 * recovery.reopen_delay, self.max_reopen_delay)
+                recovery.next_reopen_time = time.monotonic() + recovery.reopen_delay
+                self.logger.warning('{0} still detached, reopening (attempt {1})'.format(recovery.phidget.name, recovery.reopen_count))
+                try:
+                    recovery.phidget.reopen()
+                except Exception as e:
+                    self.logger.error('{0} reopen failed: {1}'.format(recovery.phidget.name, e))
@@ -0,0 +1,316 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import hashlib
+import importlib
+import json
+import os
+import pickle
+
+from phidgets_python_api.phidget import PhidgetInfo, ANY_SERIAL_NUMBER, ANY_HUB_PORT, ANY_CHANNEL
+from phidgets_python_api.stepper import Stepper, StepperInfo
+from phidgets_python_api.digital_input import DigitalInput, DigitalInputInfo, EDGE_BOTH, EDGE_RISING, EDGE_FALLING
+from phidgets_python_api.digital_output import DigitalOutput, DigitalOutputInfo
+from phidgets_python_api.voltage_ratio_input import VoltageRatioInput, VoltageRatioInputInfo
+from phidgets_python_api.voltage_ratio_input_group import VoltageRatioInputGroup, VoltageRatioInputGroupInfo
+from phidgets_python_api.stepper_joint import StepperJoint, StepperJointInfo
+from phidgets_python_api.stepper_joint_group import StepperJointGroup, StepperJointGroupInfo
+from phidgets_python_api.led_hub import LedHub, LedHubInfo
+
+# Compiles a rig description into Info objects and constructs its devices.
+#
+# A description is a YAML (.yaml, .yml) or JSON file with one entry per device:
+#
+#   devices:
+#     x_axis:
+#       type: stepper_joint
+#       stepper_info:
+#         phidget_info: {serial_number: 123456, hub_port: 0}
+#         velocity_limit: 5000
+#       home_switch_info:
+#         phidget_info: {serial_number: 123456, hub_port: 1}
+#     load_cells:
+#       type: voltage_ratio_input_group
+#       voltage_ratio_input_info:
+#         phidget_info: {serial_number: 654321}
+#         bridge_gain: BRIDGE_GAIN_128
+#
+# Fields are the attribute names of the Info class of the device type, nested Info
+# objects are mappings, and fields left out keep their defaults. Every error in the
+# description is collected and raised together in a RigConfigError, before any
+# device is constructed.
+
+RIG_CONFIG_CACHE_VERSION = 1
+
+DEVICE_TYPES = {
+    'stepper': (Stepper, StepperInfo),
+    'digital_input': (DigitalInput, DigitalInputInfo),
+    'digital_output': (DigitalOutput, DigitalOutputInfo),
+    'voltage_ratio_input': (VoltageRatioInput, VoltageRatioInputInfo),
+    'voltage_ratio_input_group': (VoltageRatioInputGroup, VoltageRatioInputGroupInfo),
+    'stepper_joint': (StepperJoint, StepperJointInfo),
+    'stepper_joint_group': (StepperJointGroup, StepperJointGroupInfo),
+    'led_hub': (LedHub, LedHubInfo),
+}
+
+# fields whose default is None but that hold an Info object when given
+_OPTIONAL_INFO_CLASSES = {
+    (StepperJointInfo, 'limit_switch_info'): DigitalInputInfo,
+}
+
+# fields holding a mapping of names to Info objects
+_MAPPED_INFO_CLASSES = {
+    (StepperJointGroupInfo, 'stepper_joints_info'): StepperJointInfo,
+}
+
+# fields that also accept the name of a Phidget22 enumeration member, as
+# (module, class) so the Phidget22 module is only imported when one is used
+_ENUMERATION_CLASSES = {
+    (VoltageRatioInputInfo, 'bridge_gain'): ('Phidget22.Devices.VoltageRatioInput', 'BridgeGain'),
+    (VoltageRatioInputInfo, 'sensor_type'): ('Phidget22.Devices.VoltageRatioInput', 'VoltageRatioSensorType'),
+}
+
+_FIELD_CHOICES = {
+    (DigitalInputInfo, 'edge_filter'): (EDGE_BOTH, EDGE_RISING, EDGE_FALLING),
+}
+
+_INFO_CLASSES = (PhidgetInfo, StepperInfo, DigitalInputInfo, DigitalOutputInfo, VoltageRatioInputInfo,
+                 VoltageRatioInputGroupInfo, StepperJointInfo, StepperJointGroupInfo, LedHubInfo)
+
+# a cached RigConfig pickles the slots of its Info objects, so a cache written
+# before an Info class gained or lost a field is not reused
+def _info_layout_digest():
+    layout = [(info_class.__name__, info_class.__slots__) for info_class in _INFO_CLASSES]
+    return hashlib.sha256(repr(layout).encode()).hexdigest()
+
+_INFO_LAYOUT_DIGEST = _info_layout_digest()
+
+class RigConfigError(ValueError):
+    def __init__(self, errors):
+        super().__init__('invalid rig configuration:\n  ' + '\n  '.join(errors))
+        self.errors = errors
+
+class RigConfig():
+    __slots__ = ('devices_info',)
+
+    # devices_info is a list of (name, device_type, info)
+    def __init__(self, devices_info):
+        self.devices_info = devices_info
+
+    # returns {name: device}, in description order, none of them opened
+    def create_devices(self, logger):
+        devices = {}
+        for name, device_type, info in self.devices_info:
+            device_class, info_class = DEVICE_TYPES[device_type]
+            devices[name] = device_class(info, name, logger)
+        return devices
+
+# description is the parsed file content, a mapping with a devices mapping
+def compile_rig_config(description):
+    errors = []
+    devices_info = []
+    if (not isinstance(description, dict)) or (not isinstance(description.get('devices'), dict)):
+        raise RigConfigError(['devices: expected a mapping of device names to devices'])
+    for name, device_description in description['devices'].items():
+        path = 'devices.' + str(name)
+        if not isinstance(device_description, dict):
+            errors.append('{0}: expected a mapping'.format(path))
+            continue
+        device_description = dict(device_description)
+        device_type = device_description.pop('type', None)
+        if device_type not in DEVICE_TYPES:
+            errors.append('{0}.type: expected one of {1}, got {2!r}'.format(path, ', '.join(DEVICE_TYPES), device_type))
+            continue
+        device_class, info_class = DEVICE_TYPES[device_type]
+        info = info_class()
+        _compile_info(info, device_description, path, errors)
+        devices_info.append((name, device_type, info))
+    _check_channel_addresses(devices_info, errors)
+    if errors:
+        raise RigConfigError(errors)
+    return RigConfig(devices_info)
+
+# cache_path stores the compiled form, reused while the file content is unchanged
+def load_rig_config(path, cache_path=None):
+    with open(path, 'rb') as f:
+        content = f.read()
+    digest = hashlib.sha256(content).hexdigest()
+    if (cache_path is not None) and os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'rb') as f:
+                cache = pickle.load(f)
+            if ((cache['version'] == RIG_CONFIG_CACHE_VERSION) and (cache['info_layout'] == _INFO_LAYOUT_DIGEST) and
+                    (cache['digest'] == digest)):
+                return cache['rig_config']
+        except Exception:
+            pass
+
+    if os.path.splitext(path)[1] in ('.yaml', '.yml'):
+        import yaml
+        try:
+            description = yaml.safe_load(content)
+        except yaml.YAMLError as e:
+            raise RigConfigError(['{0}: {1}'.format(path, e)])
+    else:
+        try:
+            description = json.loads(content)
+        except ValueError as e:
+            raise RigConfigError(['{0}: {1}'.format(path, e)])
+    rig_config = compile_rig_config(description)
+
+    if cache_path is not None:
+        cache = {'version': RIG_CONFIG_CACHE_VERSION, 'info_layout': _INFO_LAYOUT_DIGEST, 'digest': digest,
+                 'rig_config': rig_config}
+        temporary_path = cache_path + '.tmp'
+        with open(temporary_path, 'wb') as f:
+            pickle.dump(cache, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, cache_path)
+    return rig_config
+
+def _compile_info(info, description, path, errors):
+    info_class = type(info)
+    fields = [field.lstrip('_') for field in info_class.__slots__]
+    # scalars first, so led_count is set before leds_info is built
+    for field in sorted(description, key=lambda field: isinstance(description[field], (dict, list))):
+        field_path = '{0}.{1}'.format(path, field)
+        if field not in fields:
+            errors.append('{0}: unknown field of {1}'.format(field_path, info_class.__name__))
+            continue
+        value = description[field]
+        key = (info_class, field)
+        default = getattr(info, field)
+        if isinstance(default, _INFO_CLASSES):
+            if _expect(isinstance(value, dict), field_path, 'a mapping', value, errors):
+                _compile_info(default, value, field_path, errors)
+        elif key in _OPTIONAL_INFO_CLASSES:
+            if value is None:
+                setattr(info, field, None)
+            elif _expect(isinstance(value, dict), field_path, 'a mapping or null', value, errors):
+                field_info = _OPTIONAL_INFO_CLASSES[key]()
+                _compile_info(field_info, value, field_path, errors)
+                setattr(info, field, field_info)
+        elif key in _MAPPED_INFO_CLASSES:
+            if _expect(isinstance(value, dict), field_path, 'a mapping', value, errors):
+                mapped_info = {}
+                for name, item in value.items():
+                    item_path = '{0}.{1}'.format(field_path, name)
+                    if _expect(isinstance(item, dict), item_path, 'a mapping', item, errors):
+                        mapped_info[name] = _MAPPED_INFO_CLASSES[key]()
+                        _compile_info(mapped_info[name], item, item_path, errors)
+                setattr(info, field, mapped_info)
+        elif isinstance(default, list) and default and isinstance(default[0], _INFO_CLASSES):
+            # overrides of the default list entries, for example the LEDs of a LedHub
+            if _expect(isinstance(value, list) and (len(value) <= len(default)), field_path, 'a list of at most {0} mappings'.format(len(default)), value, errors):
+                for index, item in enumerate(value):
+                    item_path = '{0}[{1}]'.format(field_path, index)
+                    if _expect(isinstance(item, dict), item_path, 'a mapping', item, errors):
+                        _compile_info(default[index], item, item_path, errors)
+        elif key in _ENUMERATION_CLASSES:
+            if isinstance(value, str):
+                module_name, class_name = _ENUMERATION_CLASSES[key]
+                try:
+                    enumeration_class = getattr(importlib.import_module(module_name), class_name)
+                except (ImportError, AttributeError) as e:
+                    errors.append('{0}: cannot look up member {1!r} of {2}: {3}'.format(field_path, value, class_name, e))
+                    continue
+                if _expect(hasattr(enumeration_class, value), field_path, 'a member of {0}'.format(enumeration_class.__name__), value, errors):
+                    setattr(info, field, getattr(enumeration_class, value))
+            elif _expect(_is_number(value), field_path, 'a member name or number', value, errors):
+                setattr(info, field, value)
+        elif key in _FIELD_CHOICES:
+            if _expect(value in _FIELD_CHOICES[key], field_path, 'one of {0}'.format(', '.join(_FIELD_CHOICES[key])), value, errors):
+                setattr(info, field, value)
+        elif isinstance(default, bool):
+            if _expect(isinstance(value, bool), field_path, 'true or false', value, errors):
+                setattr(info, field, value)
+        elif _is_number(default):
+            if _expect(_is_number(value), field_path, 'a number', value, errors):
+                setattr(info, field, value)
+        elif isinstance(default, str):
+            if _expect(isinstance(value, str), field_path, 'a string', value, errors):
+                setattr(info, field, value)
+        elif isinstance(default, list):
+            if _expect(isinstance(value, list) and all(_is_number(item) for item in value), field_path, 'a list of numbers', value, errors):
+                setattr(info, field, value)
+        elif default is None:
+            if _expect((value is None) or _is_number(value) or isinstance(value, str), field_path, 'a number, string or null', value, errors):
+                setattr(info, field, value)
+        else:
+            errors.append('{0}: not configurable'.format(field_path))
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _expect(valid, path, expected, value, errors):
+    if not valid:
+        errors.append('{0}: expected {1}, got {2!r}'.format(path, expected, value))
+    return valid
+
+def _channel_infos(device_type, info):
+    if device_type in ('stepper', 'digital_input', 'digital_output', 'voltage_ratio_input'):
+        return [(DEVICE_TYPES[device_type][0].CHANNEL_CLASS_NAME, info.phidget_info)]
+    if device_type == 'stepper_joint':
+        channel_infos = [('Stepper', info.stepper_info.phidget_info), ('DigitalInput', info.home_switch_info.phidget_info)]
+        if info.limit_switch_info is not None:
+            channel_infos.append(('DigitalInput', info.limit_switch_info.phidget_info))
+        return channel_infos
+    if device_type == 'stepper_joint_group':
+        return [channel_info for stepper_joint_info in info.stepper_joints_info.values() for channel_info in _channel_infos('stepper_joint', stepper_joint_info)]
+    if device_type == 'led_hub':
+        return [('DigitalOutput', led_info.phidget_info) for led_info in info.leds_info]
+    if device_type == 'voltage_ratio_input_group':
+        phidget_info = info.voltage_ratio_input_info.phidget_info
+        channel_infos = []
+        for channel in info.channels:
+            channel_phidget_info = PhidgetInfo()
+            for field in PhidgetInfo.__slots__:
+                setattr(channel_phidget_info, field, getattr(phidget_info, field))
+            channel_phidget_info.channel = channel
+            channel_infos.append(('VoltageRatioInput', channel_phidget_info))
+        return channel_infos
+    return []
+
+# two devices opening the same channel would both wait on it, only one can attach,
+# Phidget22 gives each open with an ANY_* address field a channel of its own, so
+# only fully specified addresses are compared
+def _check_channel_addresses(devices_info, errors):
+    addresses = {}
+    for name, device_type, info in devices_info:
+        for channel_class_name, phidget_info in _channel_infos(device_type, info):
+            if _has_wildcard_address(phidget_info):
+                continue
+            address = (channel_class_name, phidget_info.serial_number, phidget_info.label, phidget_info.hub_port,
+                       phidget_info.channel, phidget_info.is_hub_port_device)
+            if address in addresses and addresses[address] != name:
+                errors.append('devices.{0}: {1} channel also used by devices.{2}'.format(name, channel_class_name, addresses[address]))
+            elif address in addresses:
+                errors.append('devices.{0}: {1} channel used twice'.format(name, channel_class_name))
+            addresses[address] = name
+
+def _has_wildcard_address(phidget_info):
+    return (((phidget_info.serial_number == ANY_SERIAL_NUMBER) and (not phidget_info.label)) or
+            (phidget_info.hub_port == ANY_HUB_PORT) or (phidget_info.channel == ANY_CHANNEL))
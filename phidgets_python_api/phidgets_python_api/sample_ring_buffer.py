@@ -0,0 +1,85 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import numpy
+
+# Holds the last size samples in size + 1 slots. The slot at the write count is the one
+# the producer may be writing, so the consumer never copies it, and a sample is only
+# published by advancing the write count after its slot is fully written.
+class SampleRingBuffer():
+    def __init__(self, size):
+        self.size = size
+        self._slot_count = size + 1
+        self._timestamps = numpy.zeros(self._slot_count, dtype=numpy.float64)
+        self._values = numpy.zeros(self._slot_count, dtype=numpy.float64)
+        self._write_count = 0
+        self._read_count = 0
+        self.dropped_count = 0
+
+    # single producer, called from the Phidget22 event thread
+    def write(self, timestamp, value):
+        write_count = self._write_count
+        index = write_count % self._slot_count
+        self._timestamps[index] = timestamp
+        self._values[index] = value
+        self._write_count = write_count + 1
+
+    def __len__(self):
+        return min(self._write_count - self._read_count, self.size)
+
+    def clear(self):
+        self._read_count = self._write_count
+
+    # single consumer, returns (timestamps, values) copies of the oldest unread samples
+    def read_block(self, max_samples=None):
+        write_count = self._write_count
+        read_count = self._read_count
+        if (write_count - read_count) > self.size:
+            self.dropped_count += write_count - read_count - self.size
+            read_count = write_count - self.size
+        sample_count = write_count - read_count
+        if (max_samples is not None) and (max_samples < sample_count):
+            sample_count = max_samples
+        start = read_count % self._slot_count
+        stop = start + sample_count
+        if stop <= self._slot_count:
+            timestamps = self._timestamps[start:stop].copy()
+            values = self._values[start:stop].copy()
+        else:
+            stop -= self._slot_count
+            timestamps = numpy.concatenate((self._timestamps[start:], self._timestamps[:stop]))
+            values = numpy.concatenate((self._values[start:], self._values[:stop]))
+        # samples the producer reached while they were copied, counting the slot it may
+        # be writing now
+        overwritten_count = self._write_count + 1 - self._slot_count - read_count
+        if overwritten_count > 0:
+            overwritten_count = min(overwritten_count, sample_count)
+            timestamps = timestamps[overwritten_count:]
+            values = values[overwritten_count:]
+            self.dropped_count += overwritten_count
+        self._read_count = read_count + sample_count
+        return timestamps, values
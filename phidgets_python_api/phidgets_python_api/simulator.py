@@ -0,0 +1,688 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import heapq
+import itertools
+import math
+import random
+import threading
+import time
+
+# In-process stand-in for Phidget22 channels, for running and benchmarking the
+# device classes without hardware:
+#
+#   simulator = PhidgetSimulator()
+#   phidgets_python_api.backend.set_backend(simulator)
+#   simulator.start()
+#
+# Handles created by the simulator implement the parts of the Phidget22 channel API
+# used by this package. One scheduler thread models attach and detach, stepper
+# kinematics, digital input edges and voltage ratio sample streams, and calls the
+# event handlers. Intervals are in simulated milliseconds, time_scale simulated
+# seconds pass per real second.
+#
+# By default any opened handle attaches. Once channels are connected with
+# add_connected_channel, a handle only attaches to a connected channel matching its
+# address, and the manager from create_manager reports the connected channels.
+
+ANY_SERIAL_NUMBER = -1
+ANY_HUB_PORT = -1
+ANY_CHANNEL = -1
+CONTROL_MODE_STEP = 0
+CONTROL_MODE_RUN = 1
+
+class PhidgetSimulator():
+    def __init__(self, time_scale=1.0):
+        self.time_scale = time_scale
+        self.attach_delay = 10
+        self.min_data_interval = 1
+        self.serial_number = 100000
+        self.handles = []
+        self.connected_channels = None
+        self._events = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+        self._start_time = time.monotonic()
+
+    def start(self):
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name='phidget_simulator', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if (self._thread is not None) and (self._thread is not threading.current_thread()):
+            self._thread.join()
+        self._thread = None
+
+    # simulated milliseconds since the simulator was created
+    def get_time(self):
+        return (time.monotonic() - self._start_time) * self.time_scale * 1000.0
+
+    # backend interface, see phidgets_python_api.backend
+    def create_handle(self, channel_class_name):
+        handle = _SIMULATED_CHANNEL_CLASSES[channel_class_name](self)
+        self.handles.append(handle)
+        return handle
+
+    def create_manager(self):
+        return SimulatedManager(self)
+
+    def add_connected_channel(self, channel_class_name, serial_number=None, hub_port=0, channel=0, label='', is_hub_port_device=False):
+        if serial_number is None:
+            serial_number = self.serial_number
+        if self.connected_channels is None:
+            self.connected_channels = []
+        connected_channel = {'channel_class_name': channel_class_name,
+                             'serial_number': serial_number,
+                             'label': label,
+                             'hub_port': hub_port,
+                             'channel': channel,
+                             'is_hub_port_device': is_hub_port_device}
+        self.connected_channels.append(connected_channel)
+        return connected_channel
+
+    def remove_connected_channel(self, connected_channel):
+        self.connected_channels.remove(connected_channel)
+
+    # the first connected channel a handle with these address fields attaches to
+    def find_connected_channel(self, channel_class_name, serial_number, label, hub_port, channel, is_hub_port_device):
+        for connected_channel in self.connected_channels:
+            if ((connected_channel['channel_class_name'] == channel_class_name)
+                    and ((serial_number == ANY_SERIAL_NUMBER) or (connected_channel['serial_number'] == serial_number))
+                    and ((not label) or (connected_channel['label'] == label))
+                    and ((hub_port == ANY_HUB_PORT) or (connected_channel['hub_port'] == hub_port))
+                    and ((channel == ANY_CHANNEL) or (connected_channel['channel'] == channel))
+                    and (connected_channel['is_hub_port_device'] == is_hub_port_device)):
+                return connected_channel
+        return None
+
+    def find_handles(self, channel_class_name=None, hub_port=None, channel=None):
+        return [handle for handle in self.handles
+                if ((channel_class_name is None) or (handle.CHANNEL_CLASS_NAME == channel_class_name))
+                and ((hub_port is None) or (handle.getHubPort() == hub_port))
+                and ((channel is None) or (handle.getChannel() == channel))]
+
+    # delay in simulated milliseconds, returns an event that can be passed to cancel()
+    def schedule(self, delay, callback, *args):
+        with self._condition:
+            event = [self.get_time() + delay, next(self._sequence), callback, args]
+            heapq.heappush(self._events, event)
+            self._condition.notify()
+        return event
+
+    def cancel(self, event):
+        if event is not None:
+            event[2] = None
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._running:
+                    if self._events:
+                        wait_time = (self._events[0][0] - self.get_time()) / (self.time_scale * 1000.0)
+                        if wait_time <= 0.0:
+                            break
+                        self._condition.wait(wait_time)
+                    else:
+                        self._condition.wait()
+                if not self._running:
+                    return
+                deadline, sequence, callback, args = heapq.heappop(self._events)
+            if callback is not None:
+                callback(*args)
+
+    # drives a simulated digital input from a simulated stepper position, for example
+    # a home switch that becomes active at or below a position
+    def link_switch(self, stepper_handle, digital_input_handle, position, active_state=True, active_below=True):
+        stepper_handle._linked_switches.append((digital_input_handle, position, active_state, active_below))
+
+class SimulatedPhidget():
+    CHANNEL_CLASS_NAME = None
+
+    def __init__(self, simulator):
+        self.simulator = simulator
+        self._serial_number = ANY_SERIAL_NUMBER
+        self._label = None
+        self._channel = ANY_CHANNEL
+        self._hub_port = ANY_HUB_PORT
+        self._is_hub_port_device = False
+        self._attached = False
+        self._open = False
+        self._handlers = {}
+        self._attach_event = None
+        self._data_event = None
+        self._reset()
+
+    def _reset(self):
+        self._data_interval = 250
+        self._min_data_interval = self.simulator.min_data_interval
+        self._max_data_interval = 60000
+
+    def _fire(self, handler_name, *args):
+        handler = self._handlers.get(handler_name)
+        if handler is not None:
+            handler(self, *args)
+
+    def getDeviceSerialNumber(self):
+        return self._serial_number
+
+    def setDeviceSerialNumber(self, serial_number):
+        self._serial_number = serial_number
+
+    def getDeviceLabel(self):
+        return self._label
+
+    def setDeviceLabel(self, label):
+        self._label = label
+
+    def getChannel(self):
+        return self._channel
+
+    def setChannel(self, channel):
+        self._channel = channel
+
+    def getHubPort(self):
+        return self._hub_port
+
+    def setHubPort(self, hub_port):
+        self._hub_port = hub_port
+
+    def getIsHubPortDevice(self):
+        return self._is_hub_port_device
+
+    def setIsHubPortDevice(self, is_hub_port_device):
+        self._is_hub_port_device = is_hub_port_device
+
+    def getChannelClassName(self):
+        return self.CHANNEL_CLASS_NAME
+
+    def getAttached(self):
+        return self._attached
+
+    def setOnAttachHandler(self, handler):
+        self._handlers['attach'] = handler
+
+    def setOnDetachHandler(self, handler):
+        self._handlers['detach'] = handler
+
+    def setOnErrorHandler(self, handler):
+        self._handlers['error'] = handler
+
+    def getDataInterval(self):
+        return self._data_interval
+
+    def setDataInterval(self, data_interval):
+        self._data_interval = min(max(data_interval, self._min_data_interval), self._max_data_interval)
+
+    def getMinDataInterval(self):
+        return self._min_data_interval
+
+    def getMaxDataInterval(self):
+        return self._max_data_interval
+
+    def open(self):
+        self._open = True
+        self._attach_event = self.simulator.schedule(self.simulator.attach_delay, self.simulate_attach)
+
+    def close(self):
+        self.simulator.cancel(self._attach_event)
+        if self._attached:
+            self.simulate_detach()
+        self._open = False
+
+    def simulate_attach(self):
+        if (not self._open) or self._attached:
+            return
+        if self.simulator.connected_channels is not None:
+            connected_channel = self.simulator.find_connected_channel(self.CHANNEL_CLASS_NAME, self._serial_number, self._label,
+                                                                      self._hub_port, self._channel, self._is_hub_port_device)
+            if connected_channel is None:
+                return
+            self._serial_number = connected_channel['serial_number']
+            self._label = connected_channel['label']
+            self._hub_port = connected_channel['hub_port']
+            self._channel = connected_channel['channel']
+        if self._serial_number == ANY_SERIAL_NUMBER:
+            self._serial_number = self.simulator.serial_number
+        if self._hub_port == ANY_HUB_PORT:
+            self._hub_port = 0
+        if self._channel == ANY_CHANNEL:
+            self._channel = 0
+        self._reset()
+        self._attached = True
+        self._fire('attach')
+        self._schedule_data()
+
+    def simulate_detach(self):
+        if not self._attached:
+            return
+        self._attached = False
+        self.simulator.cancel(self._data_event)
+        self._data_event = None
+        self._fire('detach')
+
+    def _schedule_data(self):
+        if self._attached and self._has_data():
+            self._data_event = self.simulator.schedule(self._data_interval, self._on_data_interval)
+
+    def _has_data(self):
+        return False
+
+    def _on_data_interval(self):
+        if not self._attached:
+            return
+        self._update(self._data_interval / 1000.0)
+        self._schedule_data()
+
+    def _update(self, dt):
+        pass
+
+class SimulatedStepper(SimulatedPhidget):
+    CHANNEL_CLASS_NAME = 'Stepper'
+
+    def __init__(self, simulator):
+        self._linked_switches = []
+        super().__init__(simulator)
+
+    def _reset(self):
+        super()._reset()
+        self._control_mode = CONTROL_MODE_STEP
+        self._engaged = False
+        self._acceleration = 10000.0
+        self._min_acceleration = 0.1
+        self._max_acceleration = 1e7
+        self._velocity_limit = 10000.0
+        self._min_velocity_limit = 0.0
+        self._max_velocity_limit = 1e6
+        self._current_limit = 0.1
+        self._min_current_limit = 0.0
+        self._max_current_limit = 4.0
+        self._holding_current_limit = 0.0
+        self._rescale_factor = 1.0
+        self._position = 0.0
+        self._target_position = 0.0
+        self._velocity = 0.0
+        self._moving = False
+
+    def _has_data(self):
+        return True
+
+    def setOnPositionChangeHandler(self, handler):
+        self._handlers['position_change'] = handler
+
+    def setOnVelocityChangeHandler(self, handler):
+        self._handlers['velocity_change'] = handler
+
+    def setOnStoppedHandler(self, handler):
+        self._handlers['stopped'] = handler
+
+    def getAcceleration(self):
+        return self._acceleration
+
+    def setAcceleration(self, acceleration):
+        self._acceleration = min(max(acceleration, self._min_acceleration), self._max_acceleration)
+
+    def getMinAcceleration(self):
+        return self._min_acceleration
+
+    def getMaxAcceleration(self):
+        return self._max_acceleration
+
+    def getControlMode(self):
+        return self._control_mode
+
+    def setControlMode(self, control_mode):
+        self._control_mode = control_mode
+
+    def getCurrentLimit(self):
+        return self._current_limit
+
+    def setCurrentLimit(self, current_limit):
+        self._current_limit = current_limit
+
+    def getMinCurrentLimit(self):
+        return self._min_current_limit
+
+    def getMaxCurrentLimit(self):
+        return self._max_current_limit
+
+    def getHoldingCurrentLimit(self):
+        return self._holding_current_limit
+
+    def setHoldingCurrentLimit(self, holding_current_limit):
+        self._holding_current_limit = holding_current_limit
+
+    def getEngaged(self):
+        return self._engaged
+
+    def setEngaged(self, engaged):
+        self._engaged = engaged
+
+    def getIsMoving(self):
+        return self._moving
+
+    def getPosition(self):
+        return self._position
+
+    def addPositionOffset(self, position_offset):
+        self._position += position_offset
+        self._target_position += position_offset
+
+    def getRescaleFactor(self):
+        return self._rescale_factor
+
+    def setRescaleFactor(self, rescale_factor):
+        self._rescale_factor = rescale_factor
+
+    def getTargetPosition(self):
+        return self._target_position
+
+    def setTargetPosition(self, target_position):
+        self._target_position = target_position
+
+    def getVelocity(self):
+        return self._velocity
+
+    def getVelocityLimit(self):
+        return self._velocity_limit
+
+    def setVelocityLimit(self, velocity_limit):
+        self._velocity_limit = velocity_limit
+
+    def getMinVelocityLimit(self):
+        return self._min_velocity_limit
+
+    def getMaxVelocityLimit(self):
+        return self._max_velocity_limit
+
+    def _update(self, dt):
+        position = self._position
+        velocity = self._velocity
+        if not self._engaged:
+            velocity = 0.0
+        elif self._control_mode == CONTROL_MODE_STEP:
+            velocity, position = self._step_toward_target(velocity, position, dt)
+        else:
+            velocity = self._accelerate_toward(velocity, self._velocity_limit, dt)
+            position += velocity * dt
+        moving = velocity != 0.0
+        position_changed = position != self._position
+        velocity_changed = velocity != self._velocity
+        self._position = position
+        self._velocity = velocity
+        was_moving = self._moving
+        self._moving = moving
+        if position_changed:
+            self._update_linked_switches()
+            self._fire('position_change', self._position)
+        if velocity_changed:
+            self._fire('velocity_change', self._velocity)
+        if was_moving and not moving:
+            self._fire('stopped')
+
+    def _accelerate_toward(self, velocity, target_velocity, dt):
+        velocity_change = self._acceleration * dt
+        if abs(target_velocity - velocity) <= velocity_change:
+            return target_velocity
+        return velocity + math.copysign(velocity_change, target_velocity - velocity)
+
+    def _step_toward_target(self, velocity, position, dt):
+        distance = self._target_position - position
+        if (distance == 0.0) and (abs(velocity) <= self._acceleration * dt):
+            return 0.0, position
+        stopping_distance = velocity * velocity / (2.0 * self._acceleration)
+        if (distance * velocity > 0.0) and (abs(distance) <= stopping_distance):
+            target_velocity = 0.0
+        else:
+            target_velocity = math.copysign(abs(self._velocity_limit), distance)
+        velocity = self._accelerate_toward(velocity, target_velocity, dt)
+        if (velocity == 0.0) and (distance != 0.0) and (self._velocity_limit != 0.0):
+            velocity = math.copysign(min(self._acceleration * dt, abs(self._velocity_limit)), distance)
+        position += velocity * dt
+        if (self._target_position - position) * distance <= 0.0:
+            return 0.0, self._target_position
+        return velocity, position
+
+    def _update_linked_switches(self):
+        for digital_input_handle, position, active_state, active_below in self._linked_switches:
+            if active_below:
+                active = self._position <= position
+            else:
+                active = self._position >= position
+            state = active_state if active else (not active_state)
+            digital_input_handle.simulate_state(state)
+
+class SimulatedDigitalInput(SimulatedPhidget):
+    CHANNEL_CLASS_NAME = 'DigitalInput'
+
+    def _reset(self):
+        super()._reset()
+        if not hasattr(self, '_state'):
+            self._state = False
+
+    def setOnStateChangeHandler(self, handler):
+        self._handlers['state_change'] = handler
+
+    def getState(self):
+        return self._state
+
+    def simulate_state(self, state):
+        if state == self._state:
+            return
+        self._state = state
+        if self._attached:
+            self._fire('state_change', state)
+
+    # delay in simulated milliseconds
+    def schedule_state(self, delay, state):
+        return self.simulator.schedule(delay, self.simulate_state, state)
+
+    # toggles bounce_count times, bounce_interval apart, before settling on state
+    def schedule_bouncing_state(self, delay, state, bounce_count, bounce_interval):
+        for i in range(bounce_count):
+            self.schedule_state(delay + i * bounce_interval, state if (i % 2 == 0) else (not state))
+        return self.schedule_state(delay + bounce_count * bounce_interval, state)
+
+class SimulatedDigitalOutput(SimulatedPhidget):
+    CHANNEL_CLASS_NAME = 'DigitalOutput'
+
+    def __init__(self, simulator):
+        # error code passed to async handlers, nonzero simulates failed writes
+        self.async_result = 0
+        super().__init__(simulator)
+
+    def _reset(self):
+        super()._reset()
+        self._state = False
+
+    def getState(self):
+        return self._state
+
+    def setState(self, state):
+        self._state = state
+
+    def setState_async(self, state, async_handler):
+        result = self.async_result
+        if result == 0:
+            self._state = state
+        if async_handler is not None:
+            self.simulator.schedule(0, async_handler, self, result, '' if result == 0 else 'simulated write failure')
+
+class SimulatedVoltageRatioInput(SimulatedPhidget):
+    CHANNEL_CLASS_NAME = 'VoltageRatioInput'
+
+    def __init__(self, simulator):
+        self.voltage_ratio_source = None
+        self.noise = 0.0
+        super().__init__(simulator)
+
+    def _reset(self):
+        super()._reset()
+        self._bridge_enabled = True
+        self._bridge_gain = 1
+        self._sensor_type = 0
+        self._sensor_value_change_trigger = 0.0
+        self._voltage_ratio_change_trigger = 0.0
+        self._voltage_ratio = 0.0
+        self._last_reported_voltage_ratio = None
+
+    def _has_data(self):
+        return True
+
+    def setOnSensorChangeHandler(self, handler):
+        self._handlers['sensor_change'] = handler
+
+    def setOnVoltageRatioChangeHandler(self, handler):
+        self._handlers['voltage_ratio_change'] = handler
+
+    def getBridgeEnabled(self):
+        return self._bridge_enabled
+
+    def setBridgeEnabled(self, bridge_enabled):
+        self._bridge_enabled = bridge_enabled
+
+    def getBridgeGain(self):
+        return self._bridge_gain
+
+    def setBridgeGain(self, bridge_gain):
+        self._bridge_gain = bridge_gain
+
+    def getSensorType(self):
+        return self._sensor_type
+
+    def setSensorType(self, sensor_type):
+        self._sensor_type = sensor_type
+
+    def getSensorUnit(self):
+        return None
+
+    def getSensorValue(self):
+        return self._voltage_ratio
+
+    def getSensorValueChangeTrigger(self):
+        return self._sensor_value_change_trigger
+
+    def setSensorValueChangeTrigger(self, sensor_value_change_trigger):
+        self._sensor_value_change_trigger = sensor_value_change_trigger
+
+    def getVoltageRatio(self):
+        return self._voltage_ratio
+
+    def getMinVoltageRatio(self):
+        return -1.0
+
+    def getMaxVoltageRatio(self):
+        return 1.0
+
+    def getVoltageRatioChangeTrigger(self):
+        return self._voltage_ratio_change_trigger
+
+    def setVoltageRatioChangeTrigger(self, voltage_ratio_change_trigger):
+        self._voltage_ratio_change_trigger = voltage_ratio_change_trigger
+
+    def getMinVoltageRatioChangeTrigger(self):
+        return 0.0
+
+    def getMaxVoltageRatioChangeTrigger(self):
+        return 1.0
+
+    # voltage_ratio_source(time) returns the voltage ratio at a simulated time in seconds
+    def set_voltage_ratio_source(self, voltage_ratio_source, noise=0.0):
+        self.voltage_ratio_source = voltage_ratio_source
+        self.noise = noise
+
+    def _update(self, dt):
+        if not self._bridge_enabled:
+            return
+        voltage_ratio = 0.0
+        if self.voltage_ratio_source is not None:
+            voltage_ratio = self.voltage_ratio_source(self.simulator.get_time() / 1000.0)
+        if self.noise:
+            voltage_ratio += random.gauss(0.0, self.noise)
+        self._voltage_ratio = voltage_ratio
+        if (self._last_reported_voltage_ratio is None) or (abs(voltage_ratio - self._last_reported_voltage_ratio) >= self._voltage_ratio_change_trigger):
+            self._last_reported_voltage_ratio = voltage_ratio
+            self._fire('voltage_ratio_change', voltage_ratio)
+
+# reports every connected channel shortly after open, like the Phidget22 Manager
+class SimulatedManager():
+    def __init__(self, simulator):
+        self.simulator = simulator
+        self._on_attach_handler = None
+        self._events = []
+
+    def setOnAttachHandler(self, handler):
+        self._on_attach_handler = handler
+
+    def open(self):
+        for connected_channel in self.simulator.connected_channels or []:
+            self._events.append(self.simulator.schedule(self.simulator.attach_delay, self._attach, connected_channel))
+
+    def close(self):
+        [self.simulator.cancel(event) for event in self._events]
+        self._events = []
+
+    def _attach(self, connected_channel):
+        if self._on_attach_handler is not None:
+            self._on_attach_handler(self, _SimulatedChannelInfo(connected_channel))
+
+class _SimulatedChannelInfo():
+    def __init__(self, connected_channel):
+        self._connected_channel = connected_channel
+
+    def getChannelClassName(self):
+        return 'Phidget' + self._connected_channel['channel_class_name']
+
+    def getDeviceSerialNumber(self):
+        return self._connected_channel['serial_number']
+
+    def getDeviceLabel(self):
+        return self._connected_channel['label']
+
+    def getHubPort(self):
+        return self._connected_channel['hub_port']
+
+    def getChannel(self):
+        return self._connected_channel['channel']
+
+    def getIsHubPortDevice(self):
+        return self._connected_channel['is_hub_port_device']
+
+_SIMULATED_CHANNEL_CLASSES = {
+    'Stepper': SimulatedStepper,
+    'DigitalInput': SimulatedDigitalInput,
+    'DigitalOutput': SimulatedDigitalOutput,
+    'VoltageRatioInput': SimulatedVoltageRatioInput,
+}
@@ -25,13 +25,22 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
-from Phidget22.PhidgetException import *
-import Phidget22
-import Phidget22.Devices.Stepper
-
+from phidgets_python_api.backend import get_backend
+from phidgets_python_api.event_recorder import EVENT_POSITION_CHANGE, EVENT_VELOCITY_CHANGE, EVENT_STOPPED
 from phidgets_python_api.phidget import Phidget, PhidgetInfo
+from phidgets_python_api.position_trigger_table import PositionTriggerTable, CROSS_BOTH
+from phidgets_python_api.stepper_trajectory import StepperTrajectory
+
+# the values of Phidget22.Devices.Stepper.StepperControlMode, so that switching
+# control modes does not need the Phidget22 library
+CONTROL_MODE_STEP = 0
+CONTROL_MODE_RUN = 1
 
 class StepperInfo():
+    __slots__ = ('phidget_info', 'data_interval', 'rescale_factor', 'acceleration', 'velocity_limit',
+                 'home_velocity_limit', 'home_target_position', 'current_limit', 'holding_current_limit',
+                 'invert_direction')
+
     def __init__(self):
         self.phidget_info = PhidgetInfo()
         self.data_interval = 100
@@ -45,22 +54,37 @@ class StepperInfo():
         self.invert_direction = False
 
 class Stepper(Phidget):
+    CHANNEL_CLASS_NAME = 'Stepper'
+
     def __init__(self, stepper_info, name, logger):
         super().__init__(stepper_info.phidget_info, name, logger)
         self.stepper_info = stepper_info
-
-        self._set_handle_and_on_attach_handler(Phidget22.Devices.Stepper.Stepper())
+        self._on_position_change_handler = None
+        self._on_velocity_change_handler = None
+        self._on_stopped_handler = None
+        self._trajectory = None
+        self._position_triggers = PositionTriggerTable()
+        self._min_position = None
+        self._max_position = None
+        self._soft_limits_enabled = True
+        self._outside_soft_limits = False
+        self._soft_limit_position = None
+        self._on_soft_limit_handler = None
+
+        self._set_handle_and_on_attach_handler(get_backend().create_handle(self.CHANNEL_CLASS_NAME))
 
         self._step_control_mode = True
         self._direction = 1
 
     def _set_handle_and_on_attach_handler(self, stepper_handle):
         super()._set_handle_and_on_attach_handler(stepper_handle)
-        self._stepper_handle = stepper_handle
+        self._stepper_handle = self._phidget_handle
         self.set_on_attach_handler(self._on_attach_handler)
 
     def _on_attach_handler(self, handle):
         super()._on_attach_handler(handle)
+        self._position_triggers.reset()
+        self._soft_limit_position = None
         self.set_data_interval(self.stepper_info.data_interval)
         self.set_rescale_factor(self.stepper_info.rescale_factor)
         self.set_acceleration(self.stepper_info.acceleration)
@@ -73,6 +97,7 @@ class Stepper(Phidget):
         self.enable()
 
     def close(self):
+        self.cancel_trajectory()
         self.set_on_position_change_handler(None)
         self.set_on_velocity_change_handler(None)
         self.set_on_stopped_handler(None)
@@ -84,77 +109,251 @@ class Stepper(Phidget):
 
     # def on_position_change_handler(self, handle, position):
     def set_on_position_change_handler(self, on_position_change_handler):
-        self._stepper_handle.setOnPositionChangeHandler(on_position_change_handler)
+        self._on_position_change_handler = on_position_change_handler
+        self._update_position_change_handler()
+
+    def get_on_position_change_handler(self):
+        return self._on_position_change_handler
+
+    def _update_position_change_handler(self):
+        if ((self._trajectory is not None) or (len(self._position_triggers) > 0) or self._has_soft_limits() or
+                (self._event_recorder is not None)):
+            self._stepper_handle.setOnPositionChangeHandler(self._position_change_handler)
+        else:
+            self._stepper_handle.setOnPositionChangeHandler(self._on_position_change_handler)
+
+    # the user handler gets the device position, like when it is installed directly
+    def _position_change_handler(self, handle, position):
+        event_recorder = self._event_recorder
+        if event_recorder is not None:
+            event_recorder.record(self._event_channel_id, EVENT_POSITION_CHANGE, position)
+        joint_position = self._direction * position
+        if self._has_soft_limits():
+            self._check_soft_limits(handle, joint_position)
+        trajectory = self._trajectory
+        if trajectory is not None:
+            trajectory._on_position_change(joint_position)
+        self._position_triggers.update(handle, joint_position)
+        if self._on_position_change_handler is not None:
+            self._on_position_change_handler(handle, position)
 
     # def on_velocity_change_handler(self, handle, velocity):
     def set_on_velocity_change_handler(self, on_velocity_change_handler):
-        self._stepper_handle.setOnVelocityChangeHandler(on_velocity_change_handler)
+        self._on_velocity_change_handler = on_velocity_change_handler
+        self._update_velocity_change_handler()
+
+    def _update_velocity_change_handler(self):
+        if self._event_recorder is not None:
+            self._stepper_handle.setOnVelocityChangeHandler(self._velocity_change_handler)
+        else:
+            self._stepper_handle.setOnVelocityChangeHandler(self._on_velocity_change_handler)
+
+    def _velocity_change_handler(self, handle, velocity):
+        event_recorder = self._event_recorder
+        if event_recorder is not None:
+            event_recorder.record(self._event_channel_id, EVENT_VELOCITY_CHANGE, velocity)
+        if self._on_velocity_change_handler is not None:
+            self._on_velocity_change_handler(handle, velocity)
 
     # def on_stopped_handler(self, handle):
     def set_on_stopped_handler(self, on_stopped_handler):
-        self._stepper_handle.setOnStoppedHandler(on_stopped_handler)
+        self._on_stopped_handler = on_stopped_handler
+        self._update_stopped_handler()
+
+    def get_on_stopped_handler(self):
+        return self._on_stopped_handler
+
+    def _update_stopped_handler(self):
+        if (self._trajectory is not None) or (self._event_recorder is not None):
+            self._stepper_handle.setOnStoppedHandler(self._stopped_handler)
+        else:
+            self._stepper_handle.setOnStoppedHandler(self._on_stopped_handler)
+
+    def _stopped_handler(self, handle):
+        event_recorder = self._event_recorder
+        if event_recorder is not None:
+            event_recorder.record(self._event_channel_id, EVENT_STOPPED, 0.0)
+        trajectory = self._trajectory
+        if trajectory is not None:
+            trajectory._on_stopped(handle)
+        if self._on_stopped_handler is not None:
+            self._on_stopped_handler(handle)
+
+    def _update_event_handlers(self):
+        self._update_position_change_handler()
+        self._update_velocity_change_handler()
+        self._update_stopped_handler()
+
+    # def on_finished_handler(handle):
+    # waypoints are positions or (position, velocity_limit) pairs, any iterable or generator
+    def follow_trajectory(self, waypoints, on_finished_handler=None, look_ahead_count=8):
+        self.cancel_trajectory()
+        trajectory = StepperTrajectory(self, waypoints, look_ahead_count)
+        trajectory.set_on_finished_handler(on_finished_handler)
+        self._trajectory = trajectory
+        self._update_position_change_handler()
+        self._update_stopped_handler()
+        trajectory.start()
+        return trajectory
+
+    def cancel_trajectory(self):
+        if self._trajectory is not None:
+            self._trajectory.cancel()
+
+    def is_following_trajectory(self):
+        return self._trajectory is not None
+
+    def _on_trajectory_finished(self, trajectory):
+        if self._trajectory is trajectory:
+            self._trajectory = None
+            self._update_position_change_handler()
+            self._update_stopped_handler()
+
+    # def on_position_trigger_handler(handle, position, trigger_position, crossed_above):
+    # direction one of CROSS_BOTH, CROSS_ABOVE or CROSS_BELOW, returns a trigger id
+    # triggers are checked on position change events, so they fire up to one
+    # data_interval late, with the position of the event that crossed them
+    def add_position_trigger(self, trigger_position, on_position_trigger_handler, direction=CROSS_BOTH):
+        trigger_id = self._position_triggers.add(trigger_position, on_position_trigger_handler, direction)
+        self._update_position_change_handler()
+        return trigger_id
+
+    def remove_position_trigger(self, trigger_id):
+        self._position_triggers.remove(trigger_id)
+        self._update_position_change_handler()
+
+    def clear_position_triggers(self):
+        self._position_triggers.clear()
+        self._update_position_change_handler()
+
+    # Soft travel limits, None leaves that side unlimited. Target positions outside the
+    # limits are clamped, and the stepper is stopped when a position change event
+    # reports it outside of them, for example while moving in velocity control mode.
+    def set_soft_limits(self, min_position, max_position):
+        self._min_position = min_position
+        self._max_position = max_position
+        self._outside_soft_limits = False
+        self._update_position_change_handler()
+
+    def get_soft_limits(self):
+        return self._min_position, self._max_position
+
+    # homing has to move outside the limits of the previous origin
+    def set_soft_limits_enabled(self, soft_limits_enabled):
+        self._soft_limits_enabled = soft_limits_enabled
+        self._outside_soft_limits = False
+        self._update_position_change_handler()
+
+    def is_soft_limits_enabled(self):
+        return self._soft_limits_enabled
+
+    # def on_soft_limit_handler(handle, position):
+    def set_on_soft_limit_handler(self, on_soft_limit_handler):
+        self._on_soft_limit_handler = on_soft_limit_handler
+
+    def _has_soft_limits(self):
+        return self._soft_limits_enabled and ((self._min_position is not None) or (self._max_position is not None))
+
+    def _clamp_to_soft_limits(self, target_position):
+        if not self._has_soft_limits():
+            return target_position
+        if (self._min_position is not None) and (target_position < self._min_position):
+            self.logger.warning('{0} target position {1} clamped to soft limit {2}'.format(self.name, target_position, self._min_position))
+            return self._min_position
+        if (self._max_position is not None) and (target_position > self._max_position):
+            self.logger.warning('{0} target position {1} clamped to soft limit {2}'.format(self.name, target_position, self._max_position))
+            return self._max_position
+        return target_position
+
+    # only moves further outside stop, so a stepper that ended up outside can move back
+    def _check_soft_limits(self, handle, position):
+        previous_position = self._soft_limit_position
+        self._soft_limit_position = position
+        if previous_position is None:
+            return
+        outside_soft_limits = (((self._min_position is not None) and (position < self._min_position) and (position < previous_position)) or
+                               ((self._max_position is not None) and (position > self._max_position) and (position > previous_position)))
+        if outside_soft_limits and not self._outside_soft_limits:
+            self.stop()
+            self.logger.warning('{0} stopped at {1}, outside the soft limits'.format(self.name, position))
+            if self._on_soft_limit_handler is not None:
+                self._on_soft_limit_handler(handle, position)
+        self._outside_soft_limits = outside_soft_limits
+
+    # in run mode the velocity limit is a velocity command, so a stepper that was moving
+    # when it detached is restored stopped, with a zero velocity limit written before
+    # the control mode, target positions are never written through _set_attribute
+    def _get_restorable_attributes(self, written_attributes):
+        control_mode = written_attributes.get('control_mode')
+        if (control_mode is None) or (control_mode[0] != CONTROL_MODE_RUN):
+            return written_attributes
+        restorable_attributes = {'velocity_limit': (0.0, self._stepper_handle.setVelocityLimit)}
+        for name, value_setter in written_attributes.items():
+            if name != 'velocity_limit':
+                restorable_attributes[name] = value_setter
+        return restorable_attributes
 
     def get_acceleration(self):
-        return self._stepper_handle.getAcceleration()
+        return self._get_attribute('acceleration', self._stepper_handle.getAcceleration)
 
     def set_acceleration(self, acceleration):
-        self._stepper_handle.setAcceleration(acceleration)
+        self._set_attribute('acceleration', acceleration, self._stepper_handle.setAcceleration)
 
     def get_min_acceleration(self):
-        return self._stepper_handle.getMinAcceleration()
+        return self._get_attribute('min_acceleration', self._stepper_handle.getMinAcceleration)
 
     def get_max_acceleration(self):
-        return self._stepper_handle.getMaxAcceleration()
+        return self._get_attribute('max_acceleration', self._stepper_handle.getMaxAcceleration)
 
     def in_step_control_mode(self):
         return self._step_control_mode
 
     def set_step_control_mode(self):
-        self._stepper_handle.setControlMode(Phidget22.Devices.Stepper.StepperControlMode.CONTROL_MODE_STEP)
+        self._set_attribute('control_mode', CONTROL_MODE_STEP, self._stepper_handle.setControlMode)
         self._step_control_mode = True
 
     def set_velocity_control_mode(self):
-        self._stepper_handle.setControlMode(Phidget22.Devices.Stepper.StepperControlMode.CONTROL_MODE_RUN)
+        self._set_attribute('control_mode', CONTROL_MODE_RUN, self._stepper_handle.setControlMode)
         self._step_control_mode = False
 
     def get_current_limit(self):
-        return self._stepper_handle.getCurrentLimit()
+        return self._get_attribute('current_limit', self._stepper_handle.getCurrentLimit)
 
     def set_current_limit(self, current_limit):
-        self._stepper_handle.setCurrentLimit(current_limit)
+        self._set_attribute('current_limit', current_limit, self._stepper_handle.setCurrentLimit)
 
     def get_min_current_limit(self):
-        return self._stepper_handle.getMinCurrentLimit()
+        return self._get_attribute('min_current_limit', self._stepper_handle.getMinCurrentLimit)
 
     def get_max_current_limit(self):
-        return self._stepper_handle.getMinCurrentLimit()
+        return self._get_attribute('max_current_limit', self._stepper_handle.getMaxCurrentLimit)
 
     def get_data_interval(self):
-        return self._stepper_handle.getDataInterval()
+        return self._get_attribute('data_interval', self._stepper_handle.getDataInterval)
 
     def set_data_interval(self, data_interval):
-        self._stepper_handle.setDataInterval(data_interval)
+        self._set_attribute('data_interval', data_interval, self._stepper_handle.setDataInterval)
 
     def get_min_data_interval(self):
-        return self._stepper_handle.getMinDataInterval()
+        return self._get_attribute('min_data_interval', self._stepper_handle.getMinDataInterval)
 
     def get_max_data_interval(self):
-        return self._stepper_handle.getMaxDataInterval()
+        return self._get_attribute('max_data_interval', self._stepper_handle.getMaxDataInterval)
 
     def enable(self):
-        self._stepper_handle.setEngaged(True)
+        self._set_attribute('engaged', True, self._stepper_handle.setEngaged)
 
     def disable(self):
-        self._stepper_handle.setEngaged(False)
+        self._set_attribute('engaged', False, self._stepper_handle.setEngaged)
 
     def is_enabled(self):
-        return self._stepper_handle.getEngaged()
+        return self._get_attribute('engaged', self._stepper_handle.getEngaged)
 
     def get_holding_current_limit(self):
-        return self._stepper_handle.getHoldingCurrentLimit()
+        return self._get_attribute('holding_current_limit', self._stepper_handle.getHoldingCurrentLimit)
 
     def set_holding_current_limit(self, holding_current_limit):
-        self._stepper_handle.setHoldingCurrentLimit(holding_current_limit)
+        self._set_attribute('holding_current_limit', holding_current_limit, self._stepper_handle.setHoldingCurrentLimit)
 
     def is_moving(self):
         return self._stepper_handle.getIsMoving()
@@ -163,12 +362,19 @@ class Stepper(Phidget):
         return self._direction * self._stepper_handle.getPosition()
 
     def add_position_offset(self, position_offset):
+        self._position_triggers.reset()
+        self._soft_limit_position = None
         self._stepper_handle.addPositionOffset(self._direction * position_offset)
 
     def get_rescale_factor(self):
-        return self._stepper_handle.getRescaleFactor()
+        return self._get_attribute('rescale_factor', self._stepper_handle.getRescaleFactor)
 
     def set_rescale_factor(self, rescale_factor):
+        self._set_attribute('rescale_factor', rescale_factor, self._set_rescale_factor)
+
+    def _set_rescale_factor(self, rescale_factor):
+        # limits and settings are reported in rescaled units, so every cached value changes
+        self.clear_attribute_cache()
         self._stepper_handle.setRescaleFactor(rescale_factor)
 
     def get_target_position(self):
@@ -176,6 +382,7 @@ class Stepper(Phidget):
 
     def set_target_position(self, target_position):
         if self.in_step_control_mode():
+            target_position = self._clamp_to_soft_limits(target_position)
             self._stepper_handle.setTargetPosition(self._direction * target_position)
 
     def get_velocity(self):
@@ -183,15 +390,20 @@ class Stepper(Phidget):
 
     def set_velocity_limit(self, velocity_limit):
         if self.in_step_control_mode():
-            self._stepper_handle.setVelocityLimit(abs(velocity_limit))
+            self._set_attribute('velocity_limit', abs(velocity_limit), self._stepper_handle.setVelocityLimit)
         else:
-            self._stepper_handle.setVelocityLimit(self._direction * velocity_limit)
+            self._set_attribute('velocity_limit', self._direction * velocity_limit, self._stepper_handle.setVelocityLimit)
+
+    def get_velocity_limit(self):
+        return self._get_attribute('velocity_limit', self._stepper_handle.getVelocityLimit)
 
     def get_min_velocity_limit(self):
-        return self._stepper_handle.getMinVelocityLimit()
+        return self._get_attribute('min_velocity_limit', self._stepper_handle.getMinVelocityLimit)
 
     def get_max_velocity_limit(self):
-        return self._stepper_handle.getMaxVelocityLimit()
+        return self._get_attribute('max_velocity_limit', self._stepper_handle.getMaxVelocityLimit)
 
+    # also cancels a trajectory, whose stopped handler would otherwise send the next waypoint
     def stop(self):
+        self.cancel_trajectory()
         self.set_velocity_limit(0.0)
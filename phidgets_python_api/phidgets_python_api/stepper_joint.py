@@ -25,17 +25,40 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
-from Phidget22.PhidgetException import *
+import math
+import threading
+
+from phidgets_python_api import device_registry
 from phidgets_python_api.stepper import Stepper, StepperInfo
 from phidgets_python_api.digital_input import DigitalInput, DigitalInputInfo
 
+HOMING_IDLE = 'idle'
+HOMING_CLEAR_SWITCH = 'clear_switch'
+HOMING_FAST_APPROACH = 'fast_approach'
+HOMING_BACK_OFF = 'back_off'
+HOMING_CREEP = 'creep'
+HOMING_HOMED = 'homed'
+HOMING_FAILED = 'failed'
+
 class StepperJointInfo():
+    __slots__ = ('stepper_info', 'home_switch_info', 'limit_switch_info', 'home_velocity_limit',
+                 'deactivate_home_switch_target_position', 'home_back_off_distance', 'home_creep_velocity_limit',
+                 'home_timeout')
+
     def __init__(self):
         self.stepper_info = StepperInfo()
         self.home_switch_info = DigitalInputInfo()
         self.limit_switch_info = None
         self.home_velocity_limit = -1000
+        # target position that clears a home switch already active when homing starts
         self.deactivate_home_switch_target_position = 200
+        # distance moved away from the home switch after the fast approach, opposite
+        # to the direction of home_velocity_limit
+        self.home_back_off_distance = 200
+        # same direction as home_velocity_limit, None latches at the end of the fast approach
+        self.home_creep_velocity_limit = -100
+        # seconds, None waits forever
+        self.home_timeout = 30.0
 
 class StepperJoint:
     def __init__(self, stepper_joint_info, name, logger):
@@ -56,7 +79,13 @@ class StepperJoint:
 
         self.homed = False
         self.homing = False
+        self.homing_phase = HOMING_IDLE
+        self._homing_lock = threading.RLock()
+        self._home_timer = None
+        self._latch_position = None
+        self._soft_limits_enabled = True
         self._on_homed_handler = None
+        self._on_homing_phase_handler = None
 
     def open(self):
         self.stepper.open()
@@ -65,16 +94,19 @@ class StepperJoint:
             self.limit_switch.open()
 
     def close(self):
+        self._cancel_home_timer()
         self.stepper.close()
         self.home_switch.close()
         if self.limit_switch is not None:
             self.limit_switch.close()
 
     def has_handle(self, handle):
-        if self.limit_switch is not None:
-            if self.limit_switch.has_handle(handle):
-                return True
-        return self.stepper.has_handle(handle) or self.home_switch.has_handle(handle)
+        return self._has_phidget(device_registry.lookup(handle))
+
+    def _has_phidget(self, phidget):
+        if phidget is None:
+            return False
+        return (phidget is self.stepper) or (phidget is self.home_switch) or (phidget is self.limit_switch)
 
     def set_on_attach_handler(self, on_attach_handler):
         self.stepper.set_on_attach_handler(on_attach_handler)
@@ -83,12 +115,27 @@ class StepperJoint:
             self.limit_switch.set_on_attach_handler(on_attach_handler)
 
     def _on_attach_handler(self, handle):
-        if self.stepper.has_handle(handle):
-            self.stepper._on_attach_handler(handle)
-        elif self.home_switch.has_handle(handle):
-            self.home_switch._on_attach_handler(handle)
-        elif self.limit_switch.has_handle(handle):
-            self.limit_switch._on_attach_handler(handle)
+        phidget = device_registry.lookup(handle)
+        if self._has_phidget(phidget):
+            phidget._on_attach_handler(handle)
+
+    def set_on_detach_handler(self, on_detach_handler):
+        self.stepper.set_on_detach_handler(on_detach_handler)
+        self.home_switch.set_on_detach_handler(on_detach_handler)
+        if self.limit_switch is not None:
+            self.limit_switch.set_on_detach_handler(on_detach_handler)
+
+    # the stepper position is lost when it detaches, so the joint has to be homed again
+    def _on_detach_handler(self, handle):
+        phidget = device_registry.lookup(handle)
+        if not self._has_phidget(phidget):
+            return
+        phidget._on_detach_handler(handle)
+        if phidget is self.stepper:
+            with self._homing_lock:
+                self.homed = False
+                if self.homing:
+                    self._fail_homing('stepper detached')
 
     def is_attached(self):
         if self.limit_switch is not None:
@@ -96,39 +143,141 @@ class StepperJoint:
         else:
             return self.stepper.is_attached() and self.home_switch.is_attached()
 
-    def home(self):
-        self.homed = False
-        self.homing = True
-        if not self.home_switch.is_active():
-            self.stepper.set_velocity_control_mode()
-            self.stepper.set_velocity_limit(self.stepper_joint_info.home_velocity_limit)
+    def phidgets(self):
+        if self.limit_switch is not None:
+            return [self.stepper, self.home_switch, self.limit_switch]
         else:
-            self.stepper.set_step_control_mode()
-            self.stepper.set_target_position(self.stepper_joint_info.deactivate_home_switch_target_position)
-            self.home()
+            return [self.stepper, self.home_switch]
+
+    def follow_trajectory(self, waypoints, on_finished_handler=None, look_ahead_count=8):
+        return self.stepper.follow_trajectory(waypoints, on_finished_handler, look_ahead_count)
+
+    def cancel_trajectory(self):
+        self.stepper.cancel_trajectory()
+
+    # Non-blocking homing: a fast approach to the home switch at home_velocity_limit, a
+    # back off until the switch releases, and a slow creep at home_creep_velocity_limit
+    # back onto it. The position where the switch activated during the last approach
+    # becomes 0, so the overshoot of stopping does not depend on the approach speed.
+    # A switch that is already active is cleared with a back off first.
+    def home(self):
+        with self._homing_lock:
+            self._cancel_home_timer()
+            if not self.homing:
+                self._soft_limits_enabled = self.stepper.is_soft_limits_enabled()
+            self.homed = False
+            self.homing = True
+            self._latch_position = None
+            self.stepper.set_soft_limits_enabled(False)
+            if self.stepper_joint_info.home_timeout is not None:
+                self._home_timer = threading.Timer(self.stepper_joint_info.home_timeout, self._home_timeout_handler)
+                self._home_timer.daemon = True
+                self._home_timer.start()
+            self.stepper.set_on_stopped_handler(self._on_stopped_handler)
+            if self.home_switch.is_active():
+                self._back_off(HOMING_CLEAR_SWITCH, self.stepper_joint_info.deactivate_home_switch_target_position)
+            else:
+                self._approach(HOMING_FAST_APPROACH, self.stepper_joint_info.home_velocity_limit)
+
+    def cancel_homing(self):
+        with self._homing_lock:
+            if not self.homing:
+                return
+            self.stepper.stop()
+            self._finish_homing(HOMING_IDLE)
+
+    def _approach(self, homing_phase, velocity_limit):
+        self._set_homing_phase(homing_phase)
+        # a stale step mode velocity limit would otherwise apply until the next write
+        self.stepper.set_velocity_limit(0.0)
+        self.stepper.set_velocity_control_mode()
+        self.stepper.set_velocity_limit(velocity_limit)
+
+    def _back_off(self, homing_phase, target_position):
+        self._set_homing_phase(homing_phase)
+        self.stepper.set_step_control_mode()
+        self.stepper.set_velocity_limit(self.stepper_joint_info.stepper_info.velocity_limit)
+        self.stepper.set_target_position(target_position)
+
+    def _latch(self, handle):
+        latch_position = self._latch_position
+        if latch_position is None:
+            latch_position = self.stepper.get_position()
+        self.stepper.set_step_control_mode()
+        self.stepper.add_position_offset(-latch_position)
+        self.homed = True
+        self._finish_homing(HOMING_HOMED)
+        self.stepper.set_velocity_limit(self.stepper_joint_info.stepper_info.velocity_limit)
+        self.stepper.set_target_position(0.0)
+        if self._on_homed_handler:
+            self._on_homed_handler(handle)
+
+    def _fail_homing(self, reason):
+        self.logger.error('{0} homing failed in phase {1}: {2}'.format(self.name, self.homing_phase, reason))
+        self._finish_homing(HOMING_FAILED)
+
+    def _finish_homing(self, homing_phase):
+        self._cancel_home_timer()
+        self.stepper.set_on_stopped_handler(None)
+        self.stepper.set_soft_limits_enabled(self._soft_limits_enabled)
+        self.homing = False
+        self._set_homing_phase(homing_phase)
+
+    def _cancel_home_timer(self):
+        if self._home_timer is not None:
+            self._home_timer.cancel()
+            self._home_timer = None
+
+    def _home_timeout_handler(self):
+        with self._homing_lock:
+            if not self.homing:
+                return
+            if self.stepper.is_attached():
+                self.stepper.stop()
+            self._fail_homing('timed out after {0} s'.format(self.stepper_joint_info.home_timeout))
+
+    def _set_homing_phase(self, homing_phase):
+        self.homing_phase = homing_phase
+        self.logger.debug('{0} homing phase: {1}'.format(self.name, homing_phase))
+        if self._on_homing_phase_handler:
+            self._on_homing_phase_handler(self.stepper._stepper_handle, homing_phase)
 
     def _home_switch_handler(self, handle, state):
         if not self.stepper.is_attached():
             return
 
-        if self.home_switch.is_active():
-            if self.stepper.is_moving():
-                self.stepper.set_on_stopped_handler(self._on_stopped_handler)
-                self.stepper.stop()
-            else:
-                self._on_stopped_handler(handle)
+        with self._homing_lock:
+            if self.homing_phase not in (HOMING_FAST_APPROACH, HOMING_CREEP):
+                return
+            if self.home_switch.is_active():
+                self._latch_position = self.stepper.get_position()
+                if self.stepper.is_moving():
+                    self.stepper.stop()
+                else:
+                    self._on_stopped_handler(self.stepper._stepper_handle)
 
     def _on_stopped_handler(self, handle):
-        if self.homing:
-            self.stepper.set_on_stopped_handler(None)
-            self.stepper.set_step_control_mode()
-            self.stepper.add_position_offset(-self.stepper.get_position())
-            self.stepper.set_target_position(0.0)
-            self.stepper.set_velocity_limit(self.stepper_joint_info.stepper_info.velocity_limit)
-            self.homed = True
-            self.homing = False
-            if self._on_homed_handler:
-                self._on_homed_handler(handle)
+        with self._homing_lock:
+            if not self.homing:
+                return
+            switch_active = self.home_switch.is_active()
+            if self.homing_phase in (HOMING_FAST_APPROACH, HOMING_CREEP):
+                if not switch_active:
+                    self._fail_homing('stopped before reaching the home switch')
+                elif (self.homing_phase == HOMING_FAST_APPROACH) and (self.stepper_joint_info.home_creep_velocity_limit is not None):
+                    back_off_distance = -math.copysign(abs(self.stepper_joint_info.home_back_off_distance),
+                                                       self.stepper_joint_info.home_velocity_limit)
+                    self._back_off(HOMING_BACK_OFF, self.stepper.get_position() + back_off_distance)
+                else:
+                    self._latch(handle)
+            elif self.homing_phase in (HOMING_CLEAR_SWITCH, HOMING_BACK_OFF):
+                if switch_active:
+                    self._fail_homing('home switch still active after backing off')
+                elif self.homing_phase == HOMING_CLEAR_SWITCH:
+                    self._approach(HOMING_FAST_APPROACH, self.stepper_joint_info.home_velocity_limit)
+                else:
+                    self._latch_position = None
+                    self._approach(HOMING_CREEP, self.stepper_joint_info.home_creep_velocity_limit)
 
     def _stop_handler(self, handle, state):
         if (self.limit_switch is not None) and self.limit_switch.is_active():
@@ -137,6 +286,15 @@ class StepperJoint:
     def set_on_homed_handler(self, on_homed_handler):
         self._on_homed_handler = on_homed_handler
 
+    # def on_homing_phase_handler(handle, homing_phase):
+    # called with the stepper handle on every HOMING_* phase change, ends with
+    # HOMING_HOMED, HOMING_FAILED or HOMING_IDLE when homing is cancelled
+    def set_on_homing_phase_handler(self, on_homing_phase_handler):
+        self._on_homing_phase_handler = on_homing_phase_handler
+
+    def get_on_homing_phase_handler(self):
+        return self._on_homing_phase_handler
+
     def set_limit_switch_handler(self, limit_switch_handler):
         if self.limit_switch is not None:
             self.limit_switch.set_on_state_change_handler(limit_switch_handler)
@@ -0,0 +1,242 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import math
+import threading
+
+from phidgets_python_api import device_registry
+from phidgets_python_api.stepper_joint import StepperJoint, HOMING_HOMED, HOMING_FAILED, HOMING_IDLE
+
+# All axes share one accelerate / cruise / decelerate timing, so each axis profile is
+# the same trapezoid scaled by its distance and every axis arrives at the same time.
+# Returns (duration, velocity_limits, accelerations) with one entry per distance.
+def synchronized_trapezoidal_profiles(distances, velocity_limits, accelerations):
+    cruise_time = 0.0
+    acceleration_area = 0.0
+    for distance, velocity_limit, acceleration in zip(distances, velocity_limits, accelerations):
+        distance = abs(distance)
+        cruise_time = max(cruise_time, distance / velocity_limit)
+        acceleration_area = max(acceleration_area, distance / acceleration)
+    if cruise_time == 0.0:
+        return 0.0, [0.0 for distance in distances], [0.0 for distance in distances]
+    if acceleration_area >= cruise_time * cruise_time:
+        cruise_time = math.sqrt(acceleration_area)
+        acceleration_time = cruise_time
+    else:
+        acceleration_time = acceleration_area / cruise_time
+    synchronized_velocity_limits = [abs(distance) / cruise_time for distance in distances]
+    synchronized_accelerations = [velocity_limit / acceleration_time for velocity_limit in synchronized_velocity_limits]
+    return cruise_time + acceleration_time, synchronized_velocity_limits, synchronized_accelerations
+
+class StepperJointGroupInfo():
+    __slots__ = ('stepper_joints_info',)
+
+    def __init__(self):
+        self.stepper_joints_info = {}
+
+class StepperJointGroup:
+    def __init__(self, stepper_joint_group_info, name, logger):
+        self.stepper_joint_group_info = stepper_joint_group_info
+        self.name = name
+        self.logger = logger
+
+        self.stepper_joints = {}
+        for joint_name, stepper_joint_info in self.stepper_joint_group_info.stepper_joints_info.items():
+            self.stepper_joints[joint_name] = StepperJoint(stepper_joint_info, self.name + '_' + joint_name, self.logger)
+        self._joint_names_by_phidget = {phidget: joint_name for joint_name, stepper_joint in self.stepper_joints.items() for phidget in stepper_joint.phidgets()}
+
+        self._moving_joints = set()
+        self._moving_lock = threading.Lock()
+        # {joint_name: (acceleration, velocity_limit, on_stopped_handler)} from before move_to
+        self._saved_joint_settings = {}
+        self._on_stopped_handler = None
+        self._homing_joints = set()
+        self._unhomed_joints = set()
+        self._homing_lock = threading.Lock()
+        self._on_homed_handler = None
+
+    def open(self):
+        [stepper_joint.open() for stepper_joint in self.stepper_joints.values()]
+
+    def close(self):
+        [stepper_joint.close() for stepper_joint in self.stepper_joints.values()]
+
+    def has_handle(self, handle):
+        return device_registry.lookup(handle) in self._joint_names_by_phidget
+
+    # returns the name of the joint owning handle, or None
+    def get_joint_name(self, handle):
+        return self._joint_names_by_phidget.get(device_registry.lookup(handle))
+
+    def set_on_attach_handler(self, on_attach_handler):
+        [stepper_joint.set_on_attach_handler(on_attach_handler) for stepper_joint in self.stepper_joints.values()]
+
+    def _on_attach_handler(self, handle):
+        joint_name = self.get_joint_name(handle)
+        if joint_name is not None:
+            self.stepper_joints[joint_name]._on_attach_handler(handle)
+
+    def set_on_detach_handler(self, on_detach_handler):
+        [stepper_joint.set_on_detach_handler(on_detach_handler) for stepper_joint in self.stepper_joints.values()]
+
+    def _on_detach_handler(self, handle):
+        joint_name = self.get_joint_name(handle)
+        if joint_name is not None:
+            self.stepper_joints[joint_name]._on_detach_handler(handle)
+
+    def is_attached(self):
+        for stepper_joint in self.stepper_joints.values():
+            if not stepper_joint.is_attached():
+                return False
+        return True
+
+    def phidgets(self):
+        return [phidget for stepper_joint in self.stepper_joints.values() for phidget in stepper_joint.phidgets()]
+
+    def get_positions(self):
+        return {joint_name: stepper_joint.stepper.get_position() for joint_name, stepper_joint in self.stepper_joints.items()}
+
+    # target_positions maps joint names to target positions, joints left out do not move
+    # returns the planned move duration in seconds. Each moving joint gets a scaled
+    # acceleration and velocity limit and the group stopped handler, its own settings
+    # and stopped handler are put back when it stops
+    def move_to(self, target_positions):
+        joint_names = []
+        distances = []
+        velocity_limits = []
+        accelerations = []
+        for joint_name, target_position in target_positions.items():
+            stepper_joint = self.stepper_joints[joint_name]
+            distance = target_position - stepper_joint.stepper.get_position()
+            if distance == 0:
+                continue
+            joint_names.append(joint_name)
+            distances.append(distance)
+            velocity_limits.append(stepper_joint.stepper_joint_info.stepper_info.velocity_limit)
+            accelerations.append(stepper_joint.stepper_joint_info.stepper_info.acceleration)
+        if not joint_names:
+            return 0.0
+        duration, velocity_limits, accelerations = synchronized_trapezoidal_profiles(distances, velocity_limits, accelerations)
+
+        with self._moving_lock:
+            self._moving_joints.update(joint_names)
+            for joint_name in joint_names:
+                if joint_name not in self._saved_joint_settings:
+                    stepper = self.stepper_joints[joint_name].stepper
+                    self._saved_joint_settings[joint_name] = (stepper.get_acceleration(), abs(stepper.get_velocity_limit()),
+                                                              stepper.get_on_stopped_handler())
+        for joint_name, velocity_limit, acceleration in zip(joint_names, velocity_limits, accelerations):
+            stepper = self.stepper_joints[joint_name].stepper
+            stepper.set_on_stopped_handler(self._on_joint_stopped_handler)
+            stepper.set_step_control_mode()
+            stepper.set_acceleration(max(acceleration, stepper.get_min_acceleration()))
+            stepper.set_velocity_limit(max(velocity_limit, stepper.get_min_velocity_limit()))
+        for joint_name in joint_names:
+            self.stepper_joints[joint_name].stepper.set_target_position(target_positions[joint_name])
+        return duration
+
+    def stop(self):
+        [stepper_joint.stepper.stop() for stepper_joint in self.stepper_joints.values()]
+
+    # homes the named joints, or every joint, concurrently
+    # replaces the homing phase handler of each of those joints
+    def home(self, joint_names=None):
+        if joint_names is None:
+            joint_names = list(self.stepper_joints)
+        with self._homing_lock:
+            self._homing_joints = set(joint_names)
+            self._unhomed_joints = set()
+        for joint_name in joint_names:
+            stepper_joint = self.stepper_joints[joint_name]
+            stepper_joint.set_on_homing_phase_handler(self._on_joint_homing_phase_handler)
+            stepper_joint.home()
+
+    def cancel_homing(self):
+        [stepper_joint.cancel_homing() for stepper_joint in self.stepper_joints.values()]
+
+    def is_homing(self):
+        return len(self._homing_joints) > 0
+
+    def is_homed(self):
+        for stepper_joint in self.stepper_joints.values():
+            if not stepper_joint.homed:
+                return False
+        return True
+
+    # def on_homed_handler(unhomed_joint_names):
+    # called once when every joint commanded by home has finished homing,
+    # unhomed_joint_names lists the joints that failed or were cancelled
+    def set_on_homed_handler(self, on_homed_handler):
+        self._on_homed_handler = on_homed_handler
+
+    def _on_joint_homing_phase_handler(self, handle, homing_phase):
+        if homing_phase not in (HOMING_HOMED, HOMING_FAILED, HOMING_IDLE):
+            return
+        with self._homing_lock:
+            joint_name = self.get_joint_name(handle)
+            if joint_name not in self._homing_joints:
+                return
+            self._homing_joints.discard(joint_name)
+            if homing_phase != HOMING_HOMED:
+                self._unhomed_joints.add(joint_name)
+            all_finished = len(self._homing_joints) == 0
+            unhomed_joint_names = sorted(self._unhomed_joints)
+        if all_finished and (self._on_homed_handler is not None):
+            self._on_homed_handler(unhomed_joint_names)
+
+    def is_moving(self):
+        return len(self._moving_joints) > 0
+
+    # def on_stopped_handler(handle):
+    # called once when every joint commanded by move_to has stopped
+    def set_on_stopped_handler(self, on_stopped_handler):
+        self._on_stopped_handler = on_stopped_handler
+
+    def _on_joint_stopped_handler(self, handle):
+        with self._moving_lock:
+            joint_name = self.get_joint_name(handle)
+            if joint_name not in self._moving_joints:
+                return
+            self._moving_joints.discard(joint_name)
+            all_stopped = len(self._moving_joints) == 0
+            acceleration, velocity_limit, on_stopped_handler = self._saved_joint_settings.pop(joint_name)
+        self._restore_joint_settings(joint_name, acceleration, velocity_limit, on_stopped_handler)
+        if on_stopped_handler is not None:
+            on_stopped_handler(handle)
+        if all_stopped and (self._on_stopped_handler is not None):
+            self._on_stopped_handler(handle)
+
+    # a joint stopped short of its target by stop() would carry on to it once its
+    # velocity limit is back, so its target is moved to where it stopped first
+    def _restore_joint_settings(self, joint_name, acceleration, velocity_limit, on_stopped_handler):
+        stepper = self.stepper_joints[joint_name].stepper
+        stepper.set_on_stopped_handler(on_stopped_handler)
+        position = stepper.get_position()
+        if stepper.get_target_position() != position:
+            stepper.set_target_position(position)
+        stepper.set_acceleration(acceleration)
+        stepper.set_velocity_limit(velocity_limit)
@@ -0,0 +1,150 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import collections
+import math
+import threading
+
+# Streams waypoints to a Stepper in step control mode. The next target is sent from
+# the position change handler while the stepper is still moving toward the current
+# one, before the stepper would start its own deceleration, so moves through
+# waypoints in the same direction never stop. Waypoints are positions or
+# (position, velocity_limit) pairs and may come from a generator.
+class StepperTrajectory():
+    def __init__(self, stepper, waypoints, look_ahead_count=8):
+        self.stepper = stepper
+        self.look_ahead_count = max(look_ahead_count, 2)
+        self._waypoints = iter(waypoints)
+        self._window = collections.deque()
+        self._waypoints_exhausted = False
+        self._junction_velocities = []
+        self._target_junction_velocity = 0.0
+        self._target_position = None
+        self._velocity_limit = 0.0
+        self._running = False
+        self._lock = threading.Lock()
+        self._on_finished_handler = None
+
+    # def on_finished_handler(handle):
+    def set_on_finished_handler(self, on_finished_handler):
+        self._on_finished_handler = on_finished_handler
+
+    def is_running(self):
+        return self._running
+
+    def start(self):
+        with self._lock:
+            self._running = True
+            self.stepper.set_step_control_mode()
+            self._fill_window()
+            self._next_target(self.stepper.get_position())
+        if not self._running:
+            self._finish(None, True)
+
+    # stops the stepper and leaves its velocity limit at zero, like Stepper.stop()
+    def cancel(self):
+        with self._lock:
+            if not self._running:
+                return
+            self._running = False
+        self.stepper.set_velocity_limit(0.0)
+        self._finish(None, False)
+
+    def _waypoint(self, waypoint):
+        try:
+            position, velocity_limit = waypoint
+        except TypeError:
+            position, velocity_limit = waypoint, self.stepper.stepper_info.velocity_limit
+        return float(position), abs(float(velocity_limit))
+
+    def _fill_window(self):
+        while (not self._waypoints_exhausted) and (len(self._window) < self.look_ahead_count):
+            try:
+                self._window.append(self._waypoint(next(self._waypoints)))
+            except StopIteration:
+                self._waypoints_exhausted = True
+
+    # junction velocities at each waypoint in the look-ahead window, zero where the
+    # direction reverses and at the end of the window, limited backwards by what the
+    # acceleration can shed over the following segment
+    def _plan(self, start_position):
+        acceleration = self.stepper.stepper_info.acceleration
+        positions = [start_position] + [position for position, velocity_limit in self._window]
+        junction_velocities = [0.0] * len(self._window)
+        for i in range(len(self._window) - 1):
+            if (positions[i + 1] - positions[i]) * (positions[i + 2] - positions[i + 1]) > 0:
+                junction_velocities[i] = min(self._window[i][1], self._window[i + 1][1])
+        for i in range(len(self._window) - 2, -1, -1):
+            reachable_velocity = math.sqrt(junction_velocities[i + 1] ** 2 + 2.0 * acceleration * abs(positions[i + 2] - positions[i + 1]))
+            junction_velocities[i] = min(junction_velocities[i], reachable_velocity)
+        self._junction_velocities = junction_velocities
+
+    def _next_target(self, position):
+        while self._window and (self._window[0][0] == position):
+            self._window.popleft()
+            self._fill_window()
+        if not self._window:
+            self._running = False
+            return
+        self._plan(position)
+        target_position, velocity_limit = self._window.popleft()
+        self._fill_window()
+        self._target_junction_velocity = self._junction_velocities[0]
+        acceleration = self.stepper.stepper_info.acceleration
+        reachable_velocity = math.sqrt(self._target_junction_velocity ** 2 + 2.0 * acceleration * abs(target_position - position))
+        self._velocity_limit = min(velocity_limit, reachable_velocity)
+        self._target_position = target_position
+        self.stepper.set_velocity_limit(self._velocity_limit)
+        self.stepper.set_target_position(target_position)
+
+    def _on_position_change(self, position):
+        with self._lock:
+            if (not self._running) or (not self._window):
+                return
+            if self._target_junction_velocity == 0.0:
+                return
+            acceleration = self.stepper.stepper_info.acceleration
+            data_interval = self.stepper.stepper_info.data_interval / 1000.0
+            braking_distance = self._velocity_limit ** 2 / (2.0 * acceleration) + self._velocity_limit * data_interval
+            if abs(self._target_position - position) <= braking_distance:
+                self._next_target(self._target_position)
+
+    def _on_stopped(self, handle):
+        with self._lock:
+            if not self._running:
+                return
+            self._next_target(self.stepper.get_position())
+            finished = not self._running
+        if finished:
+            self._finish(handle, True)
+
+    def _finish(self, handle, completed):
+        if completed:
+            self.stepper.set_velocity_limit(self.stepper.stepper_info.velocity_limit)
+        self.stepper._on_trajectory_finished(self)
+        if self._on_finished_handler is not None:
+            self._on_finished_handler(handle)
@@ -0,0 +1,193 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import array
+import bisect
+import math
+
+# Streaming filters for the voltage ratio event path. Each filter keeps its state
+# in preallocated arrays and process(value) returns the filtered value, or None
+# when a decimating stage has no output for this input sample. Running sums are
+# recomputed from their window each time it wraps, so rounding error cannot build
+# up over long acquisitions.
+
+class MovingAverageFilter():
+    def __init__(self, window_size):
+        self.window_size = window_size
+        self._window = array.array('d', [0.0] * window_size)
+        self.reset()
+
+    def reset(self):
+        for i in range(self.window_size):
+            self._window[i] = 0.0
+        self._index = 0
+        self._count = 0
+        self._sum = 0.0
+
+    def process(self, value):
+        self._sum += value - self._window[self._index]
+        self._window[self._index] = value
+        self._index = (self._index + 1) % self.window_size
+        if self._index == 0:
+            self._sum = math.fsum(self._window)
+        if self._count < self.window_size:
+            self._count += 1
+        return self._sum / self._count
+
+class ExponentialFilter():
+    def __init__(self, alpha):
+        self.alpha = alpha
+        self.reset()
+
+    def reset(self):
+        self._output = None
+
+    def process(self, value):
+        if self._output is None:
+            self._output = value
+        else:
+            self._output += self.alpha * (value - self._output)
+        return self._output
+
+class BiquadLowPassFilter():
+    def __init__(self, cutoff_frequency, sample_frequency, q=1.0 / math.sqrt(2.0)):
+        self.cutoff_frequency = cutoff_frequency
+        self.sample_frequency = sample_frequency
+        self.q = q
+        w0 = 2.0 * math.pi * cutoff_frequency / sample_frequency
+        alpha = math.sin(w0) / (2.0 * q)
+        cos_w0 = math.cos(w0)
+        a0 = 1.0 + alpha
+        self._b0 = (1.0 - cos_w0) / (2.0 * a0)
+        self._b1 = (1.0 - cos_w0) / a0
+        self._b2 = self._b0
+        self._a1 = -2.0 * cos_w0 / a0
+        self._a2 = (1.0 - alpha) / a0
+        self._state = array.array('d', [0.0, 0.0])
+        self.reset()
+
+    def reset(self):
+        self._state[0] = 0.0
+        self._state[1] = 0.0
+        self._primed = False
+
+    # transposed direct form II, primed to the first value so it starts at steady state
+    def process(self, value):
+        if not self._primed:
+            self._state[0] = value * (1.0 - self._b0)
+            self._state[1] = value * (self._b2 - self._a2)
+            self._primed = True
+        output = self._b0 * value + self._state[0]
+        self._state[0] = self._b1 * value - self._a1 * output + self._state[1]
+        self._state[1] = self._b2 * value - self._a2 * output
+        return output
+
+# keeps the window sorted in a second array, each sample removes the oldest value
+# and inserts the new one by shifting the values between them
+class MedianFilter():
+    def __init__(self, window_size):
+        self.window_size = window_size
+        self._window = array.array('d', [0.0] * window_size)
+        self._sorted = array.array('d', [0.0] * window_size)
+        self.reset()
+
+    def reset(self):
+        self._index = 0
+        self._count = 0
+
+    def process(self, value):
+        sorted_window = self._sorted
+        count = self._count
+        if count == self.window_size:
+            i = bisect.bisect_left(sorted_window, self._window[self._index], 0, count)
+            count -= 1
+            for k in range(i, count):
+                sorted_window[k] = sorted_window[k + 1]
+        self._window[self._index] = value
+        self._index = (self._index + 1) % self.window_size
+        i = bisect.bisect_right(sorted_window, value, 0, count)
+        for k in range(count, i, -1):
+            sorted_window[k] = sorted_window[k - 1]
+        sorted_window[i] = value
+        count += 1
+        self._count = count
+        if count % 2:
+            return sorted_window[count // 2]
+        return 0.5 * (sorted_window[count // 2 - 1] + sorted_window[count // 2])
+
+# cascaded integrator comb style decimator, each stage is a running sum over the
+# last decimation_factor samples instead of a free running integrator
+class DecimateFilter():
+    def __init__(self, decimation_factor, order=1):
+        self.decimation_factor = decimation_factor
+        self.order = order
+        self._windows = [array.array('d', [0.0] * decimation_factor) for stage in range(order)]
+        self._sums = array.array('d', [0.0] * order)
+        self._counts = array.array('l', [0] * order)
+        self.reset()
+
+    def reset(self):
+        for i in range(self.order):
+            for j in range(self.decimation_factor):
+                self._windows[i][j] = 0.0
+            self._sums[i] = 0.0
+            self._counts[i] = 0
+        self._index = 0
+        self._phase = 0
+
+    def process(self, value):
+        index = self._index
+        for i in range(self.order):
+            window = self._windows[i]
+            self._sums[i] += value - window[index]
+            window[index] = value
+            if self._counts[i] < self.decimation_factor:
+                self._counts[i] += 1
+            value = self._sums[i] / self._counts[i]
+        self._index = (index + 1) % self.decimation_factor
+        if self._index == 0:
+            for i in range(self.order):
+                self._sums[i] = math.fsum(self._windows[i])
+        self._phase += 1
+        if self._phase < self.decimation_factor:
+            return None
+        self._phase = 0
+        return value
+
+class FilterChain():
+    def __init__(self, filters):
+        self.filters = list(filters)
+
+    def reset(self):
+        [voltage_ratio_filter.reset() for voltage_ratio_filter in self.filters]
+
+    def process(self, value):
+        for voltage_ratio_filter in self.filters:
+            value = voltage_ratio_filter.process(value)
+            if value is None:
+                return None
+        return value
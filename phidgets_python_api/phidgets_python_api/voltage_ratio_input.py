@@ -25,31 +25,53 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
-from Phidget22.PhidgetException import *
-import Phidget22
-import Phidget22.Devices.VoltageRatioInput
+import numpy
 
+from phidgets_python_api.backend import get_backend
+from phidgets_python_api.event_recorder import EVENT_VOLTAGE_RATIO_CHANGE
 from phidgets_python_api.phidget import Phidget, PhidgetInfo
+from phidgets_python_api.sample_ring_buffer import SampleRingBuffer
+from phidgets_python_api.load_cell_calibration import LoadCellCalibration
+
+# the values of BRIDGE_GAIN_1 and
+# VoltageRatioSensorType.SENSOR_TYPE_VOLTAGERATIO, so that building an info does not
+# need the Phidget22 library
+BRIDGE_GAIN_1 = 1
+SENSOR_TYPE_VOLTAGERATIO = 0
 
 class VoltageRatioInputInfo():
+    __slots__ = ('phidget_info', 'bridge_gain', 'data_interval', 'sensor_type', 'sensor_value_change_trigger',
+                 'voltage_ratio_change_trigger', 'capture_buffer_size')
+
     def __init__(self):
         self.phidget_info = PhidgetInfo()
-        self.bridge_gain = Phidget22.Devices.VoltageRatioInput.BridgeGain.BRIDGE_GAIN_1
+        self.bridge_gain = BRIDGE_GAIN_1
         self.data_interval = 100
-        self.sensor_type = Phidget22.Devices.VoltageRatioInput.VoltageRatioSensorType.SENSOR_TYPE_VOLTAGERATIO
+        self.sensor_type = SENSOR_TYPE_VOLTAGERATIO
         self.sensor_value_change_trigger = None
         self.voltage_ratio_change_trigger = None
+        self.capture_buffer_size = 4096
 
 class VoltageRatioInput(Phidget):
+    CHANNEL_CLASS_NAME = 'VoltageRatioInput'
+
     def __init__(self, voltage_ratio_input_info, name, logger):
         super().__init__(voltage_ratio_input_info.phidget_info, name, logger)
         self.voltage_ratio_input_info = voltage_ratio_input_info
+        self._on_voltage_ratio_change_handler = None
+        self._capture_buffer = None
+        self._voltage_ratio_filter = None
+        self._calibration = None
+        self._tare_sample_count = 0
+        self._tare_remaining_count = 0
+        self._tare_sum = 0.0
+        self._on_tared_handler = None
 
-        self._set_handle_and_on_attach_handler(Phidget22.Devices.VoltageRatioInput.VoltageRatioInput())
+        self._set_handle_and_on_attach_handler(get_backend().create_handle(self.CHANNEL_CLASS_NAME))
 
     def _set_handle_and_on_attach_handler(self, voltage_ratio_input_handle):
         super()._set_handle_and_on_attach_handler(voltage_ratio_input_handle)
-        self._voltage_ratio_input_handle = voltage_ratio_input_handle
+        self._voltage_ratio_input_handle = self._phidget_handle
         self.set_on_attach_handler(self._on_attach_handler)
 
     def _on_attach_handler(self, handle):
@@ -65,6 +87,7 @@ class VoltageRatioInput(Phidget):
     def close(self):
         self.set_on_sensor_change_handler(None)
         self.set_on_voltage_ratio_change_handler(None)
+        self.stop_capture()
         super().close()
 
     def has_handle(self, handle):
@@ -76,40 +99,166 @@ class VoltageRatioInput(Phidget):
 
     # def on_voltage_ratio_change_handler(self, handle, voltage_ratio):
     def set_on_voltage_ratio_change_handler(self, on_voltage_ratio_change_handler):
-        self._voltage_ratio_input_handle.setOnVoltageRatioChangeHandler(on_voltage_ratio_change_handler)
+        self._on_voltage_ratio_change_handler = on_voltage_ratio_change_handler
+        self._update_voltage_ratio_change_handler()
+
+    def get_on_voltage_ratio_change_handler(self):
+        return self._on_voltage_ratio_change_handler
+
+    def _update_voltage_ratio_change_handler(self):
+        if ((self._capture_buffer is not None) or (self._voltage_ratio_filter is not None) or self.is_taring() or
+                (self._event_recorder is not None)):
+            self._voltage_ratio_input_handle.setOnVoltageRatioChangeHandler(self._voltage_ratio_change_handler)
+        else:
+            self._voltage_ratio_input_handle.setOnVoltageRatioChangeHandler(self._on_voltage_ratio_change_handler)
+
+    def _update_event_handlers(self):
+        self._update_voltage_ratio_change_handler()
+
+    def _voltage_ratio_change_handler(self, handle, voltage_ratio):
+        event_recorder = self._event_recorder
+        if event_recorder is not None:
+            event_recorder.record(self._event_channel_id, EVENT_VOLTAGE_RATIO_CHANGE, voltage_ratio)
+        voltage_ratio_filter = self._voltage_ratio_filter
+        if voltage_ratio_filter is not None:
+            voltage_ratio = voltage_ratio_filter.process(voltage_ratio)
+            if voltage_ratio is None:
+                return
+        if self._tare_remaining_count > 0:
+            self._tare_sum += voltage_ratio
+            self._tare_remaining_count -= 1
+            if self._tare_remaining_count == 0:
+                self._finish_tare(handle)
+        capture_buffer = self._capture_buffer
+        if capture_buffer is not None:
+            capture_buffer.write(self._monotonic(), voltage_ratio)
+        if self._on_voltage_ratio_change_handler is not None:
+            self._on_voltage_ratio_change_handler(handle, voltage_ratio)
+
+    # voltage_ratio_filter is any object with process(value) and reset(), see voltage_ratio_filter.py
+    # captured samples and the voltage ratio change handler then receive the filtered output
+    def set_voltage_ratio_filter(self, voltage_ratio_filter):
+        if voltage_ratio_filter is not None:
+            voltage_ratio_filter.reset()
+        self._voltage_ratio_filter = voltage_ratio_filter
+        self._update_voltage_ratio_change_handler()
+
+    def get_voltage_ratio_filter(self):
+        return self._voltage_ratio_filter
+
+    def start_capture(self, buffer_size=None):
+        if buffer_size is None:
+            buffer_size = self.voltage_ratio_input_info.capture_buffer_size
+        if (self._capture_buffer is None) or (self._capture_buffer.size != buffer_size):
+            self._capture_buffer = SampleRingBuffer(buffer_size)
+        else:
+            self._capture_buffer.clear()
+        self._update_voltage_ratio_change_handler()
+
+    def stop_capture(self):
+        self._capture_buffer = None
+        self._update_voltage_ratio_change_handler()
+
+    def is_capturing(self):
+        return self._capture_buffer is not None
+
+    # returns (timestamps, voltage_ratios) numpy arrays, timestamps from the backend clock,
+    # time.monotonic() unless replaying, empty when not capturing
+    def read_block(self, max_samples=None):
+        capture_buffer = self._capture_buffer
+        if capture_buffer is None:
+            return numpy.zeros(0), numpy.zeros(0)
+        return capture_buffer.read_block(max_samples)
+
+    def get_dropped_sample_count(self):
+        capture_buffer = self._capture_buffer
+        if capture_buffer is None:
+            return 0
+        return capture_buffer.dropped_count
+
+    def set_calibration(self, calibration):
+        self._calibration = calibration
+
+    def get_calibration(self):
+        return self._calibration
+
+    # call after attach so the store is keyed by the actual serial number, hub port and channel
+    def load_calibration(self, calibration_store):
+        calibration = calibration_store.get(self.phidget_info)
+        if calibration is not None:
+            self._calibration = calibration
+        return calibration
+
+    def save_calibration(self, calibration_store):
+        self._check_calibration()
+        calibration_store.set(self.phidget_info, self._calibration)
+        calibration_store.save()
+
+    # returns (timestamps, forces) numpy arrays converted with the calibration,
+    # raises RuntimeError when no calibration has been set, loaded or tared
+    def read_force_block(self, max_samples=None):
+        self._check_calibration()
+        timestamps, voltage_ratios = self.read_block(max_samples)
+        return timestamps, self._calibration.convert(voltage_ratios)
+
+    def _check_calibration(self):
+        if self._calibration is None:
+            raise RuntimeError('{0} has no load cell calibration, set, load or tare one first'.format(self.name))
+
+    # def on_tared_handler(handle):
+    # averages the next sample_count (filtered) samples from the live stream without blocking
+    def tare(self, sample_count, on_tared_handler=None):
+        if sample_count < 1:
+            raise ValueError('taring needs at least 1 sample, got {0}'.format(sample_count))
+        if self._calibration is None:
+            self._calibration = LoadCellCalibration()
+        self._on_tared_handler = on_tared_handler
+        self._tare_sum = 0.0
+        self._tare_sample_count = sample_count
+        self._tare_remaining_count = sample_count
+        self._update_voltage_ratio_change_handler()
+
+    def is_taring(self):
+        return self._tare_remaining_count > 0
+
+    def _finish_tare(self, handle):
+        self._calibration.tare(self._tare_sum / self._tare_sample_count)
+        self._update_voltage_ratio_change_handler()
+        if self._on_tared_handler is not None:
+            self._on_tared_handler(handle)
 
     def enable(self):
-        self._voltage_ratio_input_handle.setBridgeEnabled(True)
+        self._set_attribute('bridge_enabled', True, self._voltage_ratio_input_handle.setBridgeEnabled)
 
     def disable(self):
-        self._voltage_ratio_input_handle.setBridgeEnabled(False)
+        self._set_attribute('bridge_enabled', False, self._voltage_ratio_input_handle.setBridgeEnabled)
 
     def is_enabled(self):
-        return self._voltage_ratio_input_handle.getBridgeEnabled()
+        return self._get_attribute('bridge_enabled', self._voltage_ratio_input_handle.getBridgeEnabled)
 
     def set_bridge_gain(self, bridge_gain):
-        self._voltage_ratio_input_handle.setBridgeGain(bridge_gain)
+        self._set_attribute('bridge_gain', bridge_gain, self._voltage_ratio_input_handle.setBridgeGain)
 
     def get_bridge_gain(self):
-        return self._voltage_ratio_input_handle.getBridgeGain()
+        return self._get_attribute('bridge_gain', self._voltage_ratio_input_handle.getBridgeGain)
 
     def get_data_interval(self):
-        return self._voltage_ratio_input_handle.getDataInterval()
+        return self._get_attribute('data_interval', self._voltage_ratio_input_handle.getDataInterval)
 
     def set_data_interval(self, data_interval):
-        self._voltage_ratio_input_handle.setDataInterval(data_interval)
+        self._set_attribute('data_interval', data_interval, self._voltage_ratio_input_handle.setDataInterval)
 
     def get_min_data_interval(self):
-        return self._voltage_ratio_input_handle.getMinDataInterval()
+        return self._get_attribute('min_data_interval', self._voltage_ratio_input_handle.getMinDataInterval)
 
     def get_max_data_interval(self):
-        return self._voltage_ratio_input_handle.getMaxDataInterval()
+        return self._get_attribute('max_data_interval', self._voltage_ratio_input_handle.getMaxDataInterval)
 
     def get_sensor_type(self):
-        return self._voltage_ratio_input_handle.getSensorType()
+        return self._get_attribute('sensor_type', self._voltage_ratio_input_handle.getSensorType)
 
     def set_sensor_type(self, sensor_type):
-        self._voltage_ratio_input_handle.setSensorType(sensor_type)
+        self._set_attribute('sensor_type', sensor_type, self._voltage_ratio_input_handle.setSensorType)
 
     def get_sensor_unit(self):
         return self._voltage_ratio_input_handle.getSensorUnit()
@@ -118,28 +267,28 @@ class VoltageRatioInput(Phidget):
         return self._voltage_ratio_input_handle.getSensorValue()
 
     def get_sensor_value_change_trigger(self):
-        return self._voltage_ratio_input_handle.getSensorValueChangeTrigger()
+        return self._get_attribute('sensor_value_change_trigger', self._voltage_ratio_input_handle.getSensorValueChangeTrigger)
 
     def set_sensor_value_change_trigger(self, sensor_value_change_trigger):
-        self._voltage_ratio_input_handle.setSensorValueChangeTrigger(sensor_value_change_trigger)
+        self._set_attribute('sensor_value_change_trigger', sensor_value_change_trigger, self._voltage_ratio_input_handle.setSensorValueChangeTrigger)
 
     def get_voltage_ratio(self):
         return self._voltage_ratio_input_handle.getVoltageRatio()
 
     def get_min_voltage_ratio(self):
-        return self._voltage_ratio_input_handle.getMinVoltageRatio()
+        return self._get_attribute('min_voltage_ratio', self._voltage_ratio_input_handle.getMinVoltageRatio)
 
     def get_max_voltage_ratio(self):
-        return self._voltage_ratio_input_handle.getMaxVoltageRatio()
+        return self._get_attribute('max_voltage_ratio', self._voltage_ratio_input_handle.getMaxVoltageRatio)
 
     def get_voltage_ratio_change_trigger(self):
-        return self._voltage_ratio_input_handle.getVoltageRatioChangeTrigger()
+        return self._get_attribute('voltage_ratio_change_trigger', self._voltage_ratio_input_handle.getVoltageRatioChangeTrigger)
 
     def set_voltage_ratio_change_trigger(self, voltage_ratio_change_trigger):
-        self._voltage_ratio_input_handle.setVoltageRatioChangeTrigger(voltage_ratio_change_trigger)
+        self._set_attribute('voltage_ratio_change_trigger', voltage_ratio_change_trigger, self._voltage_ratio_input_handle.setVoltageRatioChangeTrigger)
 
     def get_min_voltage_ratio_change_trigger(self):
-        return self._voltage_ratio_input_handle.getMinVoltageRatioChangeTrigger()
+        return self._get_attribute('min_voltage_ratio_change_trigger', self._voltage_ratio_input_handle.getMinVoltageRatioChangeTrigger)
 
     def get_max_voltage_ratio_change_trigger(self):
-        return self._voltage_ratio_input_handle.getMaxVoltageRatioChangeTrigger()
+        return self._get_attribute('max_voltage_ratio_change_trigger', self._voltage_ratio_input_handle.getMaxVoltageRatioChangeTrigger)
@@ -0,0 +1,168 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import copy
+import threading
+import numpy
+
+from phidgets_python_api import device_registry
+from phidgets_python_api.voltage_ratio_input import VoltageRatioInput, VoltageRatioInputInfo
+
+class VoltageRatioInputGroupInfo():
+    __slots__ = ('voltage_ratio_input_info', 'channels', 'frame_interval')
+
+    def __init__(self):
+        self.voltage_ratio_input_info = VoltageRatioInputInfo()
+        self.channels = [0, 1, 2, 3]
+        self.frame_interval = 20
+
+class VoltageRatioInputGroup:
+    def __init__(self, voltage_ratio_input_group_info, name, logger):
+        self.voltage_ratio_input_group_info = voltage_ratio_input_group_info
+        self.name = name
+        self.logger = logger
+
+        self.voltage_ratio_inputs = []
+        for channel in self.voltage_ratio_input_group_info.channels:
+            voltage_ratio_input_info = copy.deepcopy(self.voltage_ratio_input_group_info.voltage_ratio_input_info)
+            voltage_ratio_input_info.phidget_info.channel = channel
+            voltage_ratio_input = VoltageRatioInput(voltage_ratio_input_info, self.name + '_' + str(channel), self.logger)
+            self.voltage_ratio_inputs.append(voltage_ratio_input)
+        self._voltage_ratio_input_set = set(self.voltage_ratio_inputs)
+
+        self._pending = [(numpy.empty(0), numpy.empty(0)) for voltage_ratio_input in self.voltage_ratio_inputs]
+        self.dropped_sample_count = 0
+        self._on_frame_handler = None
+        self._frame_thread = None
+        self._frame_thread_stop = threading.Event()
+
+    def open(self):
+        for voltage_ratio_input in self.voltage_ratio_inputs:
+            voltage_ratio_input.start_capture()
+            voltage_ratio_input.open()
+        self._start_frames()
+
+    def close(self):
+        self._stop_frames()
+        [voltage_ratio_input.close() for voltage_ratio_input in self.voltage_ratio_inputs]
+
+    def has_handle(self, handle):
+        return device_registry.lookup(handle) in self._voltage_ratio_input_set
+
+    def set_on_attach_handler(self, on_attach_handler):
+        [voltage_ratio_input.set_on_attach_handler(on_attach_handler) for voltage_ratio_input in self.voltage_ratio_inputs]
+
+    def _on_attach_handler(self, handle):
+        voltage_ratio_input = device_registry.lookup(handle)
+        if voltage_ratio_input in self._voltage_ratio_input_set:
+            voltage_ratio_input._on_attach_handler(handle)
+
+    def set_on_detach_handler(self, on_detach_handler):
+        [voltage_ratio_input.set_on_detach_handler(on_detach_handler) for voltage_ratio_input in self.voltage_ratio_inputs]
+
+    def _on_detach_handler(self, handle):
+        voltage_ratio_input = device_registry.lookup(handle)
+        if voltage_ratio_input in self._voltage_ratio_input_set:
+            voltage_ratio_input._on_detach_handler(handle)
+
+    def is_attached(self):
+        for voltage_ratio_input in self.voltage_ratio_inputs:
+            if not voltage_ratio_input.is_attached():
+                return False
+        return True
+
+    def phidgets(self):
+        return list(self.voltage_ratio_inputs)
+
+    # def on_frame_handler(timestamps, frame):
+    # timestamps has shape (N_samples,) and frame has shape (N_samples, N_channels)
+    def set_on_frame_handler(self, on_frame_handler):
+        self._on_frame_handler = on_frame_handler
+
+    def _start_frames(self):
+        if self._frame_thread is not None:
+            return
+        self._frame_thread_stop.clear()
+        self._frame_thread = threading.Thread(target=self._frame_loop, name=self.name + '_frames', daemon=True)
+        self._frame_thread.start()
+
+    def _stop_frames(self):
+        if self._frame_thread is None:
+            return
+        self._frame_thread_stop.set()
+        if self._frame_thread is not threading.current_thread():
+            self._frame_thread.join()
+        self._frame_thread = None
+
+    def _frame_loop(self):
+        frame_interval = self.voltage_ratio_input_group_info.frame_interval / 1000.0
+        while not self._frame_thread_stop.wait(frame_interval):
+            frame = self.read_frame()
+            if (frame is not None) and (self._on_frame_handler is not None):
+                try:
+                    self._on_frame_handler(*frame)
+                except Exception as e:
+                    self.logger.error('{0} frame handler failed: {1}'.format(self.name, e))
+
+    # aligns every channel onto the sample times of the first channel, up to the
+    # newest time all channels have reached, samples past that are kept for the next frame.
+    # While a channel reports nothing (for example with a voltage ratio change trigger)
+    # the other channels keep at most capture_buffer_size pending samples, older ones
+    # are dropped and counted in dropped_sample_count
+    def read_frame(self):
+        max_pending_count = self.voltage_ratio_input_group_info.voltage_ratio_input_info.capture_buffer_size
+        for i, voltage_ratio_input in enumerate(self.voltage_ratio_inputs):
+            timestamps, voltage_ratios = voltage_ratio_input.read_block()
+            if len(timestamps) > 0:
+                pending_timestamps, pending_voltage_ratios = self._pending[i]
+                pending_timestamps = numpy.concatenate((pending_timestamps, timestamps))
+                pending_voltage_ratios = numpy.concatenate((pending_voltage_ratios, voltage_ratios))
+                dropped_count = len(pending_timestamps) - max_pending_count
+                if dropped_count > 0:
+                    pending_timestamps = pending_timestamps[dropped_count:]
+                    pending_voltage_ratios = pending_voltage_ratios[dropped_count:]
+                    self.dropped_sample_count += dropped_count
+                self._pending[i] = (pending_timestamps, pending_voltage_ratios)
+        for pending_timestamps, pending_voltage_ratios in self._pending:
+            if len(pending_timestamps) == 0:
+                return None
+        end_timestamp = min(pending_timestamps[-1] for pending_timestamps, pending_voltage_ratios in self._pending)
+
+        reference_timestamps, reference_voltage_ratios = self._pending[0]
+        stop = numpy.searchsorted(reference_timestamps, end_timestamp, side='right')
+        if stop == 0:
+            return None
+        timestamps = reference_timestamps[:stop]
+        frame = numpy.empty((stop, len(self._pending)))
+        frame[:, 0] = reference_voltage_ratios[:stop]
+        self._pending[0] = (reference_timestamps[stop:], reference_voltage_ratios[stop:])
+        for i in range(1, len(self._pending)):
+            pending_timestamps, pending_voltage_ratios = self._pending[i]
+            frame[:, i] = numpy.interp(timestamps, pending_timestamps, pending_voltage_ratios)
+            keep = max(numpy.searchsorted(pending_timestamps, end_timestamp, side='right') - 1, 0)
+            self._pending[i] = (pending_timestamps[keep:], pending_voltage_ratios[keep:])
+        return timestamps, frame
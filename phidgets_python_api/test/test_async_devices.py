@@ -0,0 +1,134 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import asyncio
+import logging
+
+from phidgets_python_api.async_devices import AsyncDigitalInput, AsyncStepper, AsyncStepperJoint, EventQueue
+from phidgets_python_api.stepper import Stepper, StepperInfo
+from phidgets_python_api.stepper_joint import StepperJoint, StepperJointInfo
+
+logger = logging.getLogger(__name__)
+
+
+class _CountingLoop():
+    def __init__(self):
+        self.callbacks = []
+
+    def call_soon_threadsafe(self, callback, *args):
+        self.callbacks.append(callback)
+
+
+def _open_stepper_joint(wait_until):
+    stepper_joint_info = StepperJointInfo()
+    stepper_joint_info.stepper_info.data_interval = 1
+    stepper_joint_info.stepper_info.acceleration = 100000
+    stepper_joint_info.home_switch_info.phidget_info.hub_port = 1
+    stepper_joint = StepperJoint(stepper_joint_info, 'joint', logger)
+    stepper_joint.open()
+    assert wait_until(stepper_joint.is_attached)
+    return stepper_joint
+
+
+def test_event_queue_drops_on_the_event_thread():
+    loop = _CountingLoop()
+    event_queue = EventQueue(loop, 4)
+    for item in range(100):
+        event_queue.put_threadsafe(item)
+    assert event_queue.qsize() == 4
+    assert event_queue.dropped_count == 96
+    assert len(loop.callbacks) == 1
+
+
+def test_event_queue_delivers_newest_items():
+    async def main():
+        event_queue = EventQueue(asyncio.get_running_loop(), 2)
+        for item in range(5):
+            event_queue.put_threadsafe(item)
+        return [await event_queue.get(), await event_queue.get()]
+    assert asyncio.run(main()) == [3, 4]
+
+
+def test_wait_for_keeps_home_switch_handler(simulator, wait_until):
+    stepper_joint = _open_stepper_joint(wait_until)
+    home_switch = stepper_joint.home_switch
+    home_switch_handler = home_switch.get_on_state_change_handler()
+
+    async def main():
+        waiting = asyncio.ensure_future(AsyncDigitalInput(home_switch).wait_for(True))
+        await asyncio.sleep(0.05)
+        assert home_switch.get_on_state_change_handler() is not home_switch_handler
+        home_switch._digital_input_handle.simulate_state(True)
+        return await asyncio.wait_for(waiting, 2.0)
+
+    assert asyncio.run(main()) is True
+    assert home_switch.get_on_state_change_handler() == home_switch_handler
+    stepper_joint.close()
+
+
+def test_move_to_restores_stopped_handler(simulator, wait_until):
+    stepper_info = StepperInfo()
+    stepper_info.data_interval = 1
+    stepper_info.acceleration = 100000
+    stepper = Stepper(stepper_info, 'stepper', logger)
+    stopped = []
+    stepper.set_on_stopped_handler(stopped.append)
+    stepper.open()
+    assert wait_until(stepper.is_attached)
+    asyncio.run(asyncio.wait_for(AsyncStepper(stepper).move_to(500), 5.0))
+    assert stepper.get_position() == 500
+    assert len(stopped) == 1
+    assert stepper.get_on_stopped_handler() == stopped.append
+    stepper.close()
+
+
+def test_move_to_returns_at_soft_limit(simulator, wait_until):
+    stepper_info = StepperInfo()
+    stepper_info.data_interval = 1
+    stepper_info.acceleration = 100000
+    stepper = Stepper(stepper_info, 'stepper', logger)
+    stepper.open()
+    assert wait_until(stepper.is_attached)
+    stepper.set_soft_limits(-100, 100)
+    asyncio.run(asyncio.wait_for(AsyncStepper(stepper).move_to(500), 5.0))
+    assert stepper.get_position() == 100
+    stepper.close()
+
+
+def test_home_fails_without_switch(simulator, wait_until):
+    stepper_joint = _open_stepper_joint(wait_until)
+    stepper_joint.stepper_joint_info.home_timeout = 0.2
+
+    async def main():
+        try:
+            await asyncio.wait_for(AsyncStepperJoint(stepper_joint).home(), 5.0)
+        except RuntimeError as e:
+            return str(e)
+
+    assert 'failed' in asyncio.run(main())
+    assert stepper_joint.get_on_homing_phase_handler() is None
+    stepper_joint.close()
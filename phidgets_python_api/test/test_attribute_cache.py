@@ -0,0 +1,88 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import logging
+
+from phidgets_python_api.digital_output import DigitalOutput, DigitalOutputInfo, EPHIDGET_OK
+from phidgets_python_api.stepper import Stepper, StepperInfo
+
+logger = logging.getLogger(__name__)
+
+
+def _open_stepper(wait_until):
+    stepper = Stepper(StepperInfo(), 'stepper', logger)
+    stepper.open()
+    assert wait_until(stepper.is_attached)
+    return stepper
+
+
+def test_get_after_set_is_a_cache_hit(simulator, wait_until):
+    stepper = _open_stepper(wait_until)
+    statistics = stepper.get_attribute_cache_statistics()
+    stepper.set_acceleration(5000)
+    assert stepper.get_acceleration() == 5000
+    stepper.set_acceleration(5000)
+    assert stepper.get_attribute_cache_statistics()['hits'] == statistics['hits'] + 2
+    assert stepper.get_attribute_cache_statistics()['misses'] == statistics['misses'] + 1
+    assert stepper._stepper_handle.getAcceleration() == 5000
+    stepper.close()
+
+
+def test_cache_is_cleared_on_detach_and_attach(simulator, wait_until):
+    stepper = _open_stepper(wait_until)
+    stepper.get_min_acceleration()
+    assert stepper._get_cached_attribute('min_acceleration') is not None
+    stepper._stepper_handle.simulate_detach()
+    assert stepper.get_attribute_cache_statistics()['size'] == 0
+    stepper.get_min_acceleration()
+    stepper._stepper_handle.simulate_attach()
+    assert wait_until(stepper.is_attached)
+    assert stepper._get_cached_attribute('min_acceleration') is None
+    assert stepper._get_cached_attribute('acceleration') == stepper.stepper_info.acceleration
+    stepper.close()
+
+
+def test_max_current_limit_is_the_maximum(simulator, wait_until):
+    stepper = _open_stepper(wait_until)
+    assert stepper.get_max_current_limit() == stepper._stepper_handle.getMaxCurrentLimit()
+    assert stepper.get_max_current_limit() > stepper.get_min_current_limit()
+    stepper.close()
+
+
+def test_async_write_of_the_cached_state_is_skipped(simulator, wait_until):
+    digital_output = DigitalOutput(DigitalOutputInfo(), 'output', logger)
+    digital_output.open()
+    assert wait_until(digital_output.is_attached)
+    results = []
+    digital_output.set_state_async(True, lambda handle, result, details: results.append(result))
+    assert wait_until(lambda: results)
+    hits = digital_output.get_attribute_cache_statistics()['hits']
+    digital_output.set_state_async(True, lambda handle, result, details: results.append(result))
+    assert results == [EPHIDGET_OK, EPHIDGET_OK]
+    assert digital_output.get_attribute_cache_statistics()['hits'] == hits + 1
+    assert digital_output.get_written_attributes()['state'][0] is True
+    digital_output.close()
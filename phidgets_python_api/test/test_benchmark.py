@@ -0,0 +1,88 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import json
+import logging
+
+from phidgets_python_api import benchmark
+import pytest
+
+logger = logging.getLogger(__name__)
+
+
+@pytest.mark.benchmark
+def test_voltage_ratio_input_throughput():
+    result = benchmark.benchmark_voltage_ratio_input_throughput(channel_count=2, duration=0.2, logger=logger)
+    assert result['events_per_second'] > 0
+
+
+@pytest.mark.benchmark
+def test_stepper_position_change_throughput():
+    result = benchmark.benchmark_stepper_position_change_throughput(stepper_count=2, duration=0.2, logger=logger)
+    assert result['events_per_second'] > 0
+
+
+@pytest.mark.benchmark
+def test_home_switch_stop_latency():
+    result = benchmark.benchmark_home_switch_stop_latency(iterations=20, logger=logger)
+    assert result['count'] == 20
+    assert result['mean'] >= 0.0
+
+
+@pytest.mark.benchmark
+def test_open_attach_with_the_default_logger():
+    result = benchmark.benchmark_open_attach(channel_count=8)
+    assert result['attached_count'] == 8
+
+
+@pytest.mark.benchmark
+def test_event_recorder_record():
+    result = benchmark.benchmark_event_recorder_record(event_count=20000, segment_event_count=4096, logger=logger)
+    assert result['event_count'] == 20000
+
+
+@pytest.mark.benchmark
+def test_event_replay():
+    result = benchmark.benchmark_event_replay(event_count=20000, segment_event_count=4096, logger=logger)
+    assert result['event_count'] == 20000
+    assert result['position_count'] == 19999
+
+
+@pytest.mark.benchmark
+def test_results_are_json(tmp_path):
+    output_path = tmp_path / 'benchmark.json'
+    assert benchmark.main(['--output', str(output_path), 'memory_per_device']) == 0
+    results = json.loads(output_path.read_text())
+    assert results['benchmarks']['memory_per_device']['stepper'] > 0
+
+
+@pytest.mark.benchmark
+def test_import_time_budget():
+    results = benchmark.benchmark_import_time(repeat=3, logger=logger)
+    for module_name, result in results.items():
+        assert not result['phidget22_loaded'], module_name
+        assert result['within_budget'], (module_name, result['seconds'])
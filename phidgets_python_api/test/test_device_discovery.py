@@ -0,0 +1,90 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import logging
+import time
+
+from phidgets_python_api.device_discovery import DeviceDiscovery
+from phidgets_python_api.phidget import ANY_HUB_PORT, PhidgetInfo
+from phidgets_python_api.stepper import Stepper, StepperInfo
+
+logger = logging.getLogger(__name__)
+
+
+def test_discover_returns_when_channels_settle(simulator):
+    simulator.add_connected_channel('Stepper', hub_port=0)
+    simulator.add_connected_channel('DigitalInput', hub_port=1, is_hub_port_device=True)
+    start_time = time.monotonic()
+    channels = DeviceDiscovery(logger).discover(timeout=5.0, settle_time=0.05)
+    assert time.monotonic() - start_time < 1.0
+    assert sorted(channel['channel_class_name'] for channel in channels) == ['DigitalInput', 'Stepper']
+
+
+def test_discover_in_background(simulator, wait_until):
+    simulator.add_connected_channel('Stepper')
+    discovered = []
+    DeviceDiscovery(logger).discover_in_background(discovered.append, settle_time=0.05)
+    assert wait_until(lambda: discovered)
+    assert len(discovered[0]) == 1
+
+
+def test_find_treats_empty_label_as_wildcard(simulator):
+    simulator.add_connected_channel('Stepper', hub_port=2)
+    device_discovery = DeviceDiscovery(logger)
+    device_discovery.discover(settle_time=0.05)
+    phidget_info = PhidgetInfo()
+    phidget_info.label = ''
+    assert len(device_discovery.find('Stepper', phidget_info)) == 1
+
+
+def test_stale_cached_address_is_rediscovered(simulator, tmp_path):
+    cache_path = str(tmp_path / 'channels.json')
+    connected_channel = simulator.add_connected_channel('Stepper', hub_port=2)
+    DeviceDiscovery(logger, cache_path).discover(settle_time=0.05)
+
+    # the stepper moves to another hub port after the cache was written
+    simulator.remove_connected_channel(connected_channel)
+    simulator.add_connected_channel('Stepper', hub_port=4)
+    device_discovery = DeviceDiscovery(logger, cache_path)
+    stepper = Stepper(StepperInfo(), 'stepper', logger)
+    missing = device_discovery.open_device(stepper, timeout=0.2, discover_timeout=1.0)
+    assert missing == []
+    assert stepper.phidget_info.hub_port == 4
+    assert [channel['hub_port'] for channel in DeviceDiscovery(logger, cache_path).channels] == [4]
+    stepper.close()
+
+
+def test_invalidate_restores_wildcard_address(simulator):
+    simulator.add_connected_channel('Stepper', hub_port=3)
+    device_discovery = DeviceDiscovery(logger)
+    device_discovery.discover(settle_time=0.05)
+    phidget_info = PhidgetInfo()
+    assert device_discovery.resolve('Stepper', phidget_info)
+    assert phidget_info.hub_port == 3
+    assert device_discovery.invalidate('Stepper', phidget_info)
+    assert phidget_info.hub_port == ANY_HUB_PORT
+    assert device_discovery.channels == []
@@ -0,0 +1,87 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import logging
+
+from phidgets_python_api.device_manager import DeviceManager
+from phidgets_python_api.digital_input import DigitalInput, DigitalInputInfo
+
+logger = logging.getLogger(__name__)
+
+
+def _digital_input(name, hub_port):
+    digital_input_info = DigitalInputInfo()
+    digital_input_info.phidget_info.hub_port = hub_port
+    return DigitalInput(digital_input_info, name, logger)
+
+
+def test_open_all_chains_and_restores_attach_handlers(simulator, wait_until):
+    digital_input = _digital_input('switch', 1)
+    attached = []
+
+    def on_attach_handler(handle):
+        digital_input._on_attach_handler(handle)
+        attached.append(handle)
+
+    digital_input.set_on_attach_handler(on_attach_handler)
+    device_manager = DeviceManager(logger)
+    device_manager.add_device(digital_input)
+    manager_attached = []
+    device_manager.set_on_attach_handler(manager_attached.append)
+    report = device_manager.open_all(1.0)
+    assert [name for name, attach_time in report['attached']] == ['switch']
+    assert len(attached) == 1
+    assert len(manager_attached) == 1
+    assert digital_input.get_on_attach_handler() is on_attach_handler
+    digital_input._digital_input_handle.simulate_detach()
+    digital_input._digital_input_handle.simulate_attach()
+    assert wait_until(lambda: len(attached) == 2)
+    assert len(manager_attached) == 1
+    device_manager.close_all()
+
+
+def test_open_all_reports_devices_sharing_a_name(simulator):
+    device_manager = DeviceManager(logger)
+    device_manager.add_device(_digital_input('switch', 1))
+    device_manager.add_device(_digital_input('switch', 2))
+    report = device_manager.open_all(1.0)
+    assert [name for name, attach_time in report['attached']] == ['switch', 'switch']
+    assert report['missing'] == []
+    assert device_manager.is_attached()
+    device_manager.close_all()
+
+
+def test_open_all_reports_missing_channels(simulator):
+    is_hub_port_device = DigitalInputInfo().phidget_info.is_hub_port_device
+    simulator.add_connected_channel('DigitalInput', hub_port=1, is_hub_port_device=is_hub_port_device)
+    device_manager = DeviceManager(logger)
+    device_manager.add_device(_digital_input('connected', 1))
+    device_manager.add_device(_digital_input('disconnected', 2))
+    report = device_manager.open_all(0.2)
+    assert [name for name, attach_time in report['attached']] == ['connected']
+    assert report['missing'] == ['disconnected']
+    device_manager.close_all()
@@ -0,0 +1,68 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import logging
+
+from phidgets_python_api import device_registry
+from phidgets_python_api.digital_input import DigitalInput, DigitalInputInfo
+from phidgets_python_api.stepper_joint import StepperJoint, StepperJointInfo
+
+logger = logging.getLogger(__name__)
+
+
+def test_close_unregisters_the_handle(simulator, wait_until):
+    digital_input_info = DigitalInputInfo()
+    digital_input_info.phidget_info.hub_port = 3
+    digital_input = DigitalInput(digital_input_info, 'digital_input', logger)
+    digital_input_handle = digital_input._digital_input_handle
+    digital_input.open()
+    assert wait_until(digital_input.is_attached)
+    assert device_registry.lookup(digital_input_handle) is digital_input
+    digital_input.close()
+    assert device_registry.lookup(digital_input_handle) is None
+    digital_input.open()
+    assert wait_until(digital_input.is_attached)
+    assert device_registry.lookup(digital_input_handle) is digital_input
+    digital_input.close()
+
+
+def test_stepper_joint_has_only_its_own_handles(simulator, wait_until):
+    stepper_joint_info = StepperJointInfo()
+    stepper_joint_info.home_switch_info.phidget_info.hub_port = 1
+    stepper_joint = StepperJoint(stepper_joint_info, 'joint', logger)
+    digital_input_info = DigitalInputInfo()
+    digital_input_info.phidget_info.hub_port = 2
+    digital_input = DigitalInput(digital_input_info, 'digital_input', logger)
+    stepper_joint.open()
+    digital_input.open()
+    assert wait_until(lambda: stepper_joint.is_attached() and digital_input.is_attached())
+    assert stepper_joint.has_handle(stepper_joint.stepper._stepper_handle)
+    assert stepper_joint.has_handle(stepper_joint.home_switch._digital_input_handle)
+    assert not stepper_joint.has_handle(digital_input._digital_input_handle)
+    digital_input.close()
+    assert not stepper_joint.has_handle(digital_input._digital_input_handle)
+    stepper_joint.close()
@@ -0,0 +1,95 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import logging
+import time
+
+from phidgets_python_api.digital_input import DigitalInput, DigitalInputInfo, EDGE_RISING
+
+logger = logging.getLogger(__name__)
+
+
+def _open_digital_input(wait_until, debounce_interval, edge_filter=None):
+    digital_input = DigitalInput(DigitalInputInfo(), 'input', logger)
+    edges = []
+    digital_input.set_on_state_change_handler(lambda handle, state: edges.append(state))
+    if edge_filter is None:
+        digital_input.set_debounce(debounce_interval)
+    else:
+        digital_input.set_debounce(debounce_interval, edge_filter)
+    digital_input.open()
+    assert wait_until(digital_input.is_attached)
+    return digital_input, edges
+
+
+def test_bounces_are_suppressed(simulator, wait_until):
+    digital_input, edges = _open_digital_input(wait_until, 50)
+    digital_input._digital_input_handle.schedule_bouncing_state(0, True, 6, 1)
+    assert wait_until(lambda: edges)
+    time.sleep(0.1)
+    assert edges == [True]
+    assert digital_input.get_edge_statistics()['rising_edge_count'] == 1
+    digital_input.close()
+
+
+def test_short_press_is_reported_when_the_window_ends(simulator, wait_until):
+    digital_input, edges = _open_digital_input(wait_until, 50)
+    handle = digital_input._digital_input_handle
+    handle.simulate_state(True)
+    press_time = digital_input.last_rising_edge_time
+    time.sleep(0.01)
+    handle.simulate_state(False)
+    release_time = time.monotonic()
+    assert edges == [True]
+    assert wait_until(lambda: len(edges) == 2)
+    assert edges == [True, False]
+    falling_edge_time = digital_input.last_falling_edge_time
+    assert abs(falling_edge_time - release_time) < 0.005
+    assert falling_edge_time - press_time < 0.05
+    digital_input.close()
+
+
+def test_press_inside_window_that_returns_is_not_reported(simulator, wait_until):
+    digital_input, edges = _open_digital_input(wait_until, 30)
+    handle = digital_input._digital_input_handle
+    handle.simulate_state(True)
+    handle.simulate_state(False)
+    handle.simulate_state(True)
+    time.sleep(0.06)
+    assert edges == [True]
+    digital_input.close()
+
+
+def test_edge_filter_counts_filtered_edges(simulator, wait_until):
+    digital_input, edges = _open_digital_input(wait_until, 0, EDGE_RISING)
+    handle = digital_input._digital_input_handle
+    for state in [True, False, True, False]:
+        handle.simulate_state(state)
+    assert edges == [True, True]
+    assert digital_input.falling_edge_count == 2
+    assert digital_input.get_pulse_rate() > 0.0
+    digital_input.close()
@@ -0,0 +1,69 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import logging
+
+from phidgets_python_api.digital_output import DigitalOutput, DigitalOutputInfo
+from phidgets_python_api.led_hub import LedHub, LedHubInfo
+from phidgets_python_api.phidget import ANY_HUB_PORT
+
+logger = logging.getLogger(__name__)
+
+
+def test_failed_async_write_invalidates_cached_state(simulator, wait_until):
+    digital_output = DigitalOutput(DigitalOutputInfo(), 'output', logger)
+    digital_output.open()
+    assert wait_until(digital_output.is_attached)
+    digital_output._digital_output_handle.async_result = 1
+    results = []
+    digital_output.set_state_async(True, lambda handle, result, details: results.append(result))
+    assert wait_until(lambda: results)
+    assert results == [1]
+    assert digital_output._get_cached_attribute('state') is None
+    assert digital_output.get_state() is False
+    digital_output.close()
+
+
+def test_led_frame_retries_failed_writes(simulator, wait_until):
+    led_hub_info = LedHubInfo()
+    led_hub_info.led_count = 2
+    led_hub = LedHub(led_hub_info, 'led_hub', logger)
+    led_hub.open()
+    assert wait_until(led_hub.is_attached)
+    led_handle = led_hub.leds[0]._digital_output_handle
+    led_handle.async_result = 1
+    assert led_hub.set_led_frame(0b01, wait=True)
+    assert led_handle.getState() is False
+    led_handle.async_result = 0
+    assert led_hub.set_led_frame(0b01, wait=True)
+    assert led_handle.getState() is True
+    led_hub.close()
+
+
+def test_led_hub_info_leaves_hub_ports_unset():
+    led_hub_info = LedHubInfo()
+    assert [led_info.phidget_info.hub_port for led_info in led_hub_info.leds_info] == [ANY_HUB_PORT] * 6
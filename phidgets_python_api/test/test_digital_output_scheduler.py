@@ -0,0 +1,97 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import logging
+import time
+
+from phidgets_python_api.digital_output import DigitalOutput, DigitalOutputInfo
+from phidgets_python_api.digital_output_scheduler import DigitalOutputScheduler
+import pytest
+
+logger = logging.getLogger(__name__)
+
+
+class _Output():
+    def __init__(self, name, fail=False):
+        self.name = name
+        self.fail = fail
+        self.states = []
+
+    def _write(self, state):
+        if self.fail:
+            raise RuntimeError('not attached')
+        self.states.append(state)
+
+    def activate(self):
+        self._write(True)
+
+    def deactivate(self):
+        self._write(False)
+
+
+def test_pulse_train_writes_count_pulses(wait_until):
+    digital_output_scheduler = DigitalOutputScheduler()
+    digital_output_scheduler.start()
+    output = _Output('output')
+    digital_output_scheduler.add_pulse_train(output, 1.0, 2.0, count=3)
+    assert wait_until(lambda: len(output.states) == 6)
+    time.sleep(0.02)
+    digital_output_scheduler.stop()
+    assert output.states == [True, False] * 3
+    assert digital_output_scheduler.get_jitter_statistics()['count'] == 6
+
+
+def test_failed_write_does_not_stop_other_outputs(wait_until):
+    digital_output_scheduler = DigitalOutputScheduler(logger=logger)
+    digital_output_scheduler.start()
+    failing_output = _Output('failing', fail=True)
+    output = _Output('output')
+    digital_output_scheduler.add_pulse_train(failing_output, 1.0, 2.0)
+    digital_output_scheduler.add_pulse_train(output, 1.0, 2.0, count=5)
+    assert wait_until(lambda: len(output.states) == 10)
+    failing_output.fail = False
+    assert wait_until(lambda: len(failing_output.states) >= 2)
+    digital_output_scheduler.stop()
+
+
+def test_pulse_width_must_be_shorter_than_period():
+    with pytest.raises(ValueError):
+        DigitalOutputScheduler().add_pulse_train(_Output('output'), 2.0, 2.0)
+
+
+def test_pwm_drives_simulated_output(simulator, wait_until):
+    digital_output = DigitalOutput(DigitalOutputInfo(), 'output', logger)
+    digital_output.open()
+    assert wait_until(digital_output.is_attached)
+    digital_output_scheduler = DigitalOutputScheduler()
+    digital_output_scheduler.start()
+    digital_output_scheduler.set_pwm(digital_output, 100.0, 0.5)
+    assert wait_until(lambda: digital_output_scheduler.get_jitter_statistics()['count'] >= 4)
+    digital_output_scheduler.stop()
+    digital_output_scheduler.cancel(digital_output)
+    assert digital_output._digital_output_handle.getState() is False
+    digital_output.close()
@@ -0,0 +1,104 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import logging
+import time
+
+from phidgets_python_api.event_coalescer import EventCoalescer
+
+logger = logging.getLogger(__name__)
+
+
+class _Stepper():
+    def __init__(self):
+        self.on_position_change_handler = None
+        self.on_velocity_change_handler = None
+
+    def set_on_position_change_handler(self, on_position_change_handler):
+        self.on_position_change_handler = on_position_change_handler
+
+    def set_on_velocity_change_handler(self, on_velocity_change_handler):
+        self.on_velocity_change_handler = on_velocity_change_handler
+
+
+def test_delivers_latest_value_at_max_rate(wait_until):
+    event_coalescer = EventCoalescer(max_rate=20.0)
+    stepper = _Stepper()
+    positions = []
+    event_coalescer.coalesce_position_change(stepper, lambda handle, position: positions.append(position))
+    event_coalescer.start()
+    for position in range(1000):
+        stepper.on_position_change_handler('handle', position)
+    assert wait_until(lambda: positions and positions[-1] == 999)
+    event_coalescer.stop()
+    assert len(positions) <= 3
+
+
+def test_final_value_after_burst_is_delivered(wait_until):
+    event_coalescer = EventCoalescer(max_rate=100.0)
+    stepper = _Stepper()
+    positions = []
+    event_coalescer.coalesce_position_change(stepper, lambda handle, position: positions.append(position))
+    event_coalescer.start()
+    for position in range(20):
+        stepper.on_position_change_handler('handle', position)
+        time.sleep(0.002)
+    assert wait_until(lambda: positions[-1:] == [19])
+    event_coalescer.stop()
+
+
+def test_min_change_delivers_early(wait_until):
+    event_coalescer = EventCoalescer(max_rate=1.0)
+    stepper = _Stepper()
+    positions = []
+    event_coalescer.coalesce_position_change(stepper, lambda handle, position: positions.append(position), min_change=10)
+    event_coalescer.start()
+    stepper.on_position_change_handler('handle', 0)
+    assert wait_until(lambda: positions == [0], timeout=0.5)
+    stepper.on_position_change_handler('handle', 50)
+    assert wait_until(lambda: positions == [0, 50], timeout=0.5)
+    event_coalescer.stop()
+
+
+def test_handler_exception_keeps_dispatcher_running(wait_until):
+    event_coalescer = EventCoalescer(max_rate=100.0, logger=logger)
+    stepper = _Stepper()
+    velocities = []
+
+    def on_velocity_change_handler(handle, velocity):
+        velocities.append(velocity)
+        raise RuntimeError('handler failed')
+
+    event_coalescer.coalesce_velocity_change(stepper, on_velocity_change_handler)
+    event_coalescer.start()
+    stepper.on_velocity_change_handler('handle', 1.0)
+    assert wait_until(lambda: velocities == [1.0])
+    stepper.on_velocity_change_handler('handle', 2.0)
+    assert wait_until(lambda: velocities == [1.0, 2.0])
+    event_coalescer.remove(stepper)
+    assert stepper.on_velocity_change_handler is None
+    event_coalescer.stop()
@@ -0,0 +1,72 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import json
+import os
+import tracemalloc
+
+import numpy
+
+from phidgets_python_api.event_recorder import (EventRecorder, EVENT_COLUMNS, EVENT_POSITION_CHANGE, MANIFEST_FILE_NAME,
+                                                segment_column_path)
+
+
+def test_stop_closes_segments_filled_since_the_last_flush(tmp_path):
+    directory = str(tmp_path)
+    event_recorder = EventRecorder(directory, segment_event_count=10, flush_interval=60.0)
+    event_recorder.start()
+    for index in range(25):
+        event_recorder.record(0, EVENT_POSITION_CHANGE, index)
+    segments = list(event_recorder._segments)
+    event_recorder.stop()
+    assert all(not segment.columns for segment in segments)
+    with open(os.path.join(directory, MANIFEST_FILE_NAME)) as f:
+        manifest = json.load(f)
+    assert manifest['closed']
+    assert [segment['event_count'] for segment in manifest['segments']] == [10, 10, 5]
+    values = []
+    for segment in manifest['segments']:
+        for column_name, dtype in EVENT_COLUMNS:
+            path = segment_column_path(directory, segment['index'], column_name)
+            assert os.path.getsize(path) == segment['event_count'] * numpy.dtype(dtype).itemsize
+        values.extend(numpy.fromfile(segment_column_path(directory, segment['index'], 'value'), dtype='<f8'))
+    assert values == list(range(25))
+
+
+def test_record_does_not_allocate(tmp_path):
+    event_recorder = EventRecorder(str(tmp_path), segment_event_count=100000, flush_interval=60.0)
+    event_recorder.start()
+    event_recorder.record(0, EVENT_POSITION_CHANGE, 0.5)
+    tracemalloc.start()
+    try:
+        for index in range(10000):
+            event_recorder.record(0, EVENT_POSITION_CHANGE, 0.5)
+        current_size, peak_size = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    event_recorder.stop()
+    assert peak_size < 4096
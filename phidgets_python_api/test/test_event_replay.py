@@ -0,0 +1,74 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import logging
+
+from phidgets_python_api import backend
+from phidgets_python_api.event_recorder import EventRecorder
+from phidgets_python_api.event_replay import EventReplay
+from phidgets_python_api.stepper import Stepper, StepperInfo
+
+logger = logging.getLogger(__name__)
+
+
+def _create_stepper(positions):
+    stepper_info = StepperInfo()
+    stepper_info.data_interval = 1
+    stepper = Stepper(stepper_info, 'stepper', logger)
+    stepper.set_on_position_change_handler(lambda handle, position: positions.append(position))
+    return stepper
+
+
+def test_replay_reproduces_the_recorded_events(simulator, wait_until, tmp_path):
+    directory = str(tmp_path)
+    recorded_positions = []
+    stepper = _create_stepper(recorded_positions)
+    event_recorder = EventRecorder(directory, segment_event_count=64, flush_interval=0.01)
+    event_recorder.add_device(stepper)
+    event_recorder.start()
+    stepper.open()
+    assert wait_until(stepper.is_attached)
+    stepper.set_target_position(200)
+    assert wait_until(lambda: recorded_positions and (recorded_positions[-1] == 200) and not stepper.is_moving())
+    stepper.close()
+    event_recorder.stop()
+
+    event_replay = EventReplay(directory)
+    assert event_replay.get_event_count() == event_recorder.get_event_count()
+    previous_backend = backend.get_backend()
+    backend.set_backend(event_replay)
+    try:
+        replayed_positions = []
+        replayed_stepper = _create_stepper(replayed_positions)
+        event_replay.add_device(replayed_stepper)
+        replayed_stepper.open()
+        statistics = event_replay.run()
+    finally:
+        backend.set_backend(previous_backend)
+    assert statistics['event_count'] == event_replay.get_event_count()
+    assert replayed_positions == recorded_positions
+    assert not replayed_stepper.is_attached()
@@ -0,0 +1,115 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import logging
+
+from phidgets_python_api.instrumentation import InstrumentedHandle, LatencyHistogram, PhidgetInstrumentation
+from phidgets_python_api.stepper import Stepper, StepperInfo
+
+logger = logging.getLogger(__name__)
+
+
+def test_percentiles_of_known_latencies():
+    histogram = LatencyHistogram()
+    for iteration in range(99):
+        histogram.record(1000)
+    histogram.record(1000000)
+    assert histogram.count == 100
+    assert histogram.max == 1000000
+    assert histogram.percentile(0.5) == 1023
+    assert histogram.percentile(0.99) == 1023
+    assert histogram.percentile(1.0) == 1000000
+    histogram.reset()
+    assert histogram.percentile(0.5) == 0
+    for duration in range(4):
+        histogram.record(duration)
+    assert [histogram.percentile(fraction) for fraction in (0.25, 0.5, 0.75, 1.0)] == [0, 1, 2, 3]
+
+
+def test_bucket_upper_bounds_are_within_a_quarter():
+    previous_bucket = 0
+    for duration in list(range(1, 4096)) + [10 ** exponent + 7 for exponent in range(4, 18)]:
+        bucket = LatencyHistogram._bucket(duration)
+        upper_bound = LatencyHistogram._bucket_upper_bound(bucket)
+        assert bucket >= previous_bucket
+        assert duration <= upper_bound <= duration * 1.25 + 1
+        previous_bucket = bucket
+
+
+def test_snapshot_reports_seconds():
+    instrumentation = PhidgetInstrumentation('stepper')
+    histogram = instrumentation.histogram('getPosition')
+    for iteration in range(99):
+        histogram.record(1000)
+    histogram.record(1000000)
+    instrumentation.histogram('getVelocity')
+    snapshot = instrumentation.snapshot()
+    assert list(snapshot) == ['getPosition']
+    statistics = snapshot['getPosition']
+    assert statistics['count'] == 100
+    assert statistics['p50'] == 1023e-9
+    assert statistics['max'] == 1e-3
+    assert abs(statistics['mean'] - (99 * 1000 + 1000000) / 100 * 1e-9) < 1e-15
+
+
+def test_instrumented_handle_times_calls_and_handlers():
+    class Handle():
+        def __init__(self):
+            self.handler = None
+
+        def getPosition(self):
+            return 42
+
+        def setOnPositionChangeHandler(self, handler):
+            self.handler = handler
+
+    handle = Handle()
+    instrumentation = PhidgetInstrumentation('stepper')
+    instrumented_handle = InstrumentedHandle(handle, instrumentation)
+    assert instrumented_handle == handle
+    assert instrumented_handle.getPosition() == 42
+    positions = []
+    instrumented_handle.setOnPositionChangeHandler(lambda handle, position: positions.append(position))
+    handle.handler(handle, 7)
+    assert positions == [7]
+    snapshot = instrumentation.snapshot()
+    assert snapshot['getPosition']['count'] == 1
+    assert snapshot['OnPositionChangeHandler']['count'] == 1
+
+
+def test_disabled_instrumentation_uses_the_handle_directly(simulator, wait_until):
+    stepper = Stepper(StepperInfo(), 'stepper', logger)
+    assert not isinstance(stepper._stepper_handle, InstrumentedHandle)
+    assert stepper.get_instrumentation_snapshot() is None
+    stepper_info = StepperInfo()
+    stepper_info.phidget_info.instrumentation_enabled = True
+    instrumented_stepper = Stepper(stepper_info, 'instrumented_stepper', logger)
+    assert isinstance(instrumented_stepper._stepper_handle, InstrumentedHandle)
+    instrumented_stepper.open()
+    assert wait_until(instrumented_stepper.is_attached)
+    assert instrumented_stepper.get_instrumentation_snapshot()['open']['count'] == 1
+    instrumented_stepper.close()
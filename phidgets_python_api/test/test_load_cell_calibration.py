@@ -0,0 +1,80 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import logging
+
+import numpy
+from phidgets_python_api.load_cell_calibration import LoadCellCalibration, LoadCellCalibrationStore
+from phidgets_python_api.voltage_ratio_input import VoltageRatioInput, VoltageRatioInputInfo
+import pytest
+
+logger = logging.getLogger(__name__)
+
+
+def test_fit_and_tare():
+    calibration = LoadCellCalibration()
+    calibration.fit([0.0, 0.1, 0.2], [1.0, 11.0, 21.0])
+    assert numpy.allclose(calibration.convert([0.3]), [31.0])
+    calibration.tare(0.1)
+    assert numpy.allclose(calibration.convert([0.1, 0.2]), [0.0, 10.0])
+
+
+def test_store_round_trip(tmp_path, simulator):
+    voltage_ratio_input = VoltageRatioInput(VoltageRatioInputInfo(), 'load_cell', logger)
+    calibration = LoadCellCalibration()
+    calibration.coefficients = [2.0, 1.0]
+    voltage_ratio_input.set_calibration(calibration)
+    path = str(tmp_path / 'calibrations.json')
+    voltage_ratio_input.save_calibration(LoadCellCalibrationStore(path))
+    loaded = LoadCellCalibrationStore(path).get(voltage_ratio_input.phidget_info)
+    assert loaded.coefficients == [2.0, 1.0]
+
+
+def test_read_force_block_without_calibration_raises(simulator):
+    voltage_ratio_input = VoltageRatioInput(VoltageRatioInputInfo(), 'load_cell', logger)
+    voltage_ratio_input.start_capture()
+    with pytest.raises(RuntimeError, match='no load cell calibration'):
+        voltage_ratio_input.read_force_block()
+
+
+def test_read_force_block_converts_captured_samples(simulator):
+    voltage_ratio_input = VoltageRatioInput(VoltageRatioInputInfo(), 'load_cell', logger)
+    voltage_ratio_input.start_capture()
+    calibration = LoadCellCalibration()
+    calibration.coefficients = [10.0, 0.0]
+    voltage_ratio_input.set_calibration(calibration)
+    voltage_ratio_input._capture_buffer.write(0.0, 0.5)
+    timestamps, forces = voltage_ratio_input.read_force_block()
+    assert forces.tolist() == [5.0]
+
+
+def test_tare_needs_a_sample(simulator):
+    voltage_ratio_input = VoltageRatioInput(VoltageRatioInputInfo(), 'load_cell', logger)
+    for sample_count in (0, -1):
+        with pytest.raises(ValueError):
+            voltage_ratio_input.tare(sample_count)
+    assert not voltage_ratio_input.is_taring()
@@ -0,0 +1,85 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+from phidgets_python_api.position_trigger_table import PositionTriggerTable, CROSS_ABOVE, CROSS_BELOW
+
+
+def _add_triggers(position_trigger_table, crossings):
+    trigger_ids = {}
+    for trigger_position, direction in [(10, CROSS_ABOVE), (20, CROSS_BELOW), (30, None)]:
+        def on_position_trigger_handler(handle, position, trigger_position, crossed_above):
+            crossings.append((position, trigger_position, crossed_above))
+        if direction is None:
+            trigger_ids[trigger_position] = position_trigger_table.add(trigger_position, on_position_trigger_handler)
+        else:
+            trigger_ids[trigger_position] = position_trigger_table.add(trigger_position, on_position_trigger_handler, direction)
+    return trigger_ids
+
+
+def test_crossings_follow_the_direction_of_travel():
+    position_trigger_table = PositionTriggerTable()
+    crossings = []
+    _add_triggers(position_trigger_table, crossings)
+    position_trigger_table.update(None, 0)
+    assert crossings == []
+    position_trigger_table.update(None, 30)
+    assert crossings == [(30, 10, True), (30, 30, True)]
+    crossings.clear()
+    position_trigger_table.update(None, 30)
+    assert crossings == []
+    position_trigger_table.update(None, 0)
+    assert crossings == [(0, 30, False), (0, 20, False)]
+
+
+def test_trigger_boundaries_and_removal():
+    position_trigger_table = PositionTriggerTable()
+    crossings = []
+    trigger_ids = _add_triggers(position_trigger_table, crossings)
+    position_trigger_table.update(None, 29)
+    position_trigger_table.update(None, 30)
+    assert crossings == [(30, 30, True)]
+    crossings.clear()
+    position_trigger_table.update(None, 29.5)
+    assert crossings == [(29.5, 30, False)]
+    crossings.clear()
+    position_trigger_table.remove(trigger_ids[30])
+    position_trigger_table.remove(trigger_ids[30])
+    assert len(position_trigger_table) == 2
+    position_trigger_table.update(None, 31)
+    assert crossings == []
+
+
+def test_reset_does_not_report_a_jump():
+    position_trigger_table = PositionTriggerTable()
+    crossings = []
+    _add_triggers(position_trigger_table, crossings)
+    position_trigger_table.update(None, 0)
+    position_trigger_table.reset()
+    position_trigger_table.update(None, 100)
+    assert crossings == []
+    position_trigger_table.update(None, 0)
+    assert crossings == [(0, 30, False), (0, 20, False)]
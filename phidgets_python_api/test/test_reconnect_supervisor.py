@@ -0,0 +1,61 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import logging
+import time
+
+from phidgets_python_api.reconnect_supervisor import ReconnectSupervisor
+from phidgets_python_api.stepper import Stepper, StepperInfo
+
+logger = logging.getLogger(__name__)
+
+
+def test_moving_stepper_is_stationary_after_reattach(simulator, wait_until):
+    stepper_info = StepperInfo()
+    stepper_info.data_interval = 1
+    stepper = Stepper(stepper_info, 'stepper', logger)
+    reconnect_supervisor = ReconnectSupervisor(logger, reopen_delay=10.0)
+    reconnect_supervisor.add_device(stepper)
+    stepper.open()
+    assert wait_until(stepper.is_attached)
+    reconnect_supervisor.start()
+    stepper.set_velocity_control_mode()
+    stepper.set_velocity_limit(1000)
+    stepper.enable()
+    assert wait_until(lambda: stepper.get_velocity() != 0.0)
+    stepper_handle = stepper._stepper_handle
+    stepper_handle.simulate_detach()
+    stepper_handle.simulate_attach()
+    assert wait_until(lambda: reconnect_supervisor.get_recovery_statistics()['recoveries'] == 1)
+    time.sleep(0.05)
+    assert not stepper.in_step_control_mode()
+    assert stepper.is_enabled()
+    assert stepper_handle.getControlMode() == 1
+    assert stepper_handle.getVelocityLimit() == 0.0
+    assert stepper.get_velocity() == 0.0
+    reconnect_supervisor.stop()
+    stepper.close()
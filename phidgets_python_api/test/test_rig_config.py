@@ -0,0 +1,94 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import importlib.util
+import json
+
+import pytest
+
+from phidgets_python_api import rig_config
+from phidgets_python_api.rig_config import RigConfigError, compile_rig_config, load_rig_config
+
+
+def _digital_input(**phidget_info):
+    return {'type': 'digital_input', 'phidget_info': phidget_info}
+
+
+def test_duplicate_exact_address_is_reported():
+    with pytest.raises(RigConfigError) as excinfo:
+        compile_rig_config({'devices': {'first': _digital_input(serial_number=123456, hub_port=1, channel=0),
+                                        'second': _digital_input(serial_number=123456, hub_port=1, channel=0)}})
+    assert excinfo.value.errors == ['devices.second: DigitalInput channel also used by devices.first']
+
+
+def test_wildcard_addresses_are_not_duplicates():
+    compile_rig_config({'devices': {'exact': _digital_input(serial_number=123456, hub_port=1, channel=0),
+                                    'any_channel': _digital_input(serial_number=123456, hub_port=1),
+                                    'any_serial_number': _digital_input(hub_port=1, channel=0)}})
+    compile_rig_config({'devices': {'leds': {'type': 'led_hub'}}})
+    compile_rig_config({'devices': {'x_axis': {'type': 'stepper_joint'}, 'y_axis': {'type': 'stepper_joint'}}})
+
+
+def test_enumeration_numbers_do_not_need_phidget22():
+    config = compile_rig_config({'devices': {'load_cell': {'type': 'voltage_ratio_input', 'bridge_gain': 1}}})
+    assert config.devices_info[0][2].bridge_gain == 1
+
+
+@pytest.mark.skipif(importlib.util.find_spec('Phidget22') is not None, reason='Phidget22 is installed')
+def test_enumeration_names_without_phidget22_are_errors():
+    with pytest.raises(RigConfigError) as excinfo:
+        compile_rig_config({'devices': {'load_cell': {'type': 'voltage_ratio_input', 'bridge_gain': 'BRIDGE_GAIN_128'}}})
+    assert excinfo.value.errors[0].startswith('devices.load_cell.bridge_gain: cannot look up member')
+
+
+def test_distinct_addresses_compile():
+    config = compile_rig_config({'devices': {'first': _digital_input(serial_number=123456, hub_port=1),
+                                             'second': _digital_input(serial_number=123456, hub_port=2),
+                                             'other_device': _digital_input(serial_number=654321)}})
+    assert [name for name, _, _ in config.devices_info] == ['first', 'second', 'other_device']
+
+
+def test_cache_is_reused_only_for_the_same_info_layout(tmp_path, monkeypatch):
+    path = str(tmp_path / 'rig.json')
+    cache_path = str(tmp_path / 'rig.pickle')
+    with open(path, 'w') as f:
+        json.dump({'devices': {'switch': _digital_input(serial_number=123456, hub_port=1)}}, f)
+    compiled = []
+    compile = rig_config.compile_rig_config
+
+    def counting_compile_rig_config(description):
+        compiled.append(description)
+        return compile(description)
+
+    monkeypatch.setattr(rig_config, 'compile_rig_config', counting_compile_rig_config)
+    load_rig_config(path, cache_path)
+    cached = load_rig_config(path, cache_path)
+    assert len(compiled) == 1
+    assert cached.devices_info[0][2].phidget_info.hub_port == 1
+    monkeypatch.setattr(rig_config, '_INFO_LAYOUT_DIGEST', 'changed')
+    load_rig_config(path, cache_path)
+    assert len(compiled) == 2
@@ -0,0 +1,87 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import logging
+
+from phidgets_python_api.sample_ring_buffer import SampleRingBuffer
+from phidgets_python_api.voltage_ratio_input import VoltageRatioInput, VoltageRatioInputInfo
+
+logger = logging.getLogger(__name__)
+
+
+def test_read_block_returns_samples_in_order():
+    ring_buffer = SampleRingBuffer(4)
+    for index in range(3):
+        ring_buffer.write(float(index), 10.0 * index)
+    timestamps, values = ring_buffer.read_block()
+    assert timestamps.tolist() == [0.0, 1.0, 2.0]
+    assert values.tolist() == [0.0, 10.0, 20.0]
+    assert len(ring_buffer) == 0
+
+
+def test_overwritten_samples_are_counted_as_dropped():
+    ring_buffer = SampleRingBuffer(4)
+    for index in range(10):
+        ring_buffer.write(float(index), float(index))
+    timestamps, values = ring_buffer.read_block(max_samples=2)
+    assert timestamps.tolist() == [6.0, 7.0]
+    assert ring_buffer.dropped_count == 6
+    timestamps, values = ring_buffer.read_block()
+    assert timestamps.tolist() == [8.0, 9.0]
+
+
+def test_slot_being_written_is_not_read():
+    ring_buffer = SampleRingBuffer(4)
+    for index in range(4):
+        ring_buffer.write(float(index), float(index))
+    # the producer has started on the next sample but not published it
+    next_index = ring_buffer._write_count % ring_buffer._slot_count
+    ring_buffer._timestamps[next_index] = -1.0
+    timestamps, values = ring_buffer.read_block()
+    assert timestamps.tolist() == [0.0, 1.0, 2.0, 3.0]
+    assert ring_buffer.dropped_count == 0
+
+
+def test_read_block_without_capture_is_empty(simulator):
+    voltage_ratio_input = VoltageRatioInput(VoltageRatioInputInfo(), 'voltage_ratio_input', logger)
+    timestamps, voltage_ratios = voltage_ratio_input.read_block()
+    assert len(timestamps) == 0
+    assert len(voltage_ratios) == 0
+    assert voltage_ratio_input.get_dropped_sample_count() == 0
+
+
+def test_capture_reads_simulated_samples(simulator, wait_until):
+    voltage_ratio_input_info = VoltageRatioInputInfo()
+    voltage_ratio_input_info.data_interval = 1
+    voltage_ratio_input = VoltageRatioInput(voltage_ratio_input_info, 'voltage_ratio_input', logger)
+    voltage_ratio_input.start_capture(buffer_size=1024)
+    voltage_ratio_input.open()
+    assert wait_until(lambda: len(voltage_ratio_input._capture_buffer) >= 10)
+    timestamps, voltage_ratios = voltage_ratio_input.read_block()
+    voltage_ratio_input.close()
+    assert len(timestamps) >= 10
+    assert (timestamps[1:] >= timestamps[:-1]).all()
@@ -0,0 +1,103 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import logging
+
+from phidgets_python_api.stepper_joint import (StepperJoint, StepperJointInfo, HOMING_BACK_OFF, HOMING_CLEAR_SWITCH,
+                                               HOMING_CREEP, HOMING_FAST_APPROACH, HOMING_HOMED)
+
+logger = logging.getLogger(__name__)
+
+
+def _open_joint(simulator, wait_until, switch_position, active_below=True, home_direction=-1):
+    stepper_joint_info = StepperJointInfo()
+    stepper_joint_info.stepper_info.data_interval = 1
+    stepper_joint_info.stepper_info.acceleration = 1e6
+    stepper_joint_info.home_velocity_limit = home_direction * 10000
+    stepper_joint_info.home_creep_velocity_limit = home_direction * 1000
+    stepper_joint_info.home_switch_info.phidget_info.hub_port = 1
+    stepper_joint = StepperJoint(stepper_joint_info, 'joint', logger)
+    stepper_joint.open()
+    assert wait_until(stepper_joint.is_attached)
+    stepper_handle = stepper_joint.stepper._stepper_handle
+    home_switch_handle = stepper_joint.home_switch._digital_input_handle
+    simulator.link_switch(stepper_handle, home_switch_handle, switch_position, active_below=active_below)
+    return stepper_joint
+
+
+def _record_homing_phases(stepper_joint):
+    homing_phases = []
+
+    def on_homing_phase_handler(handle, homing_phase):
+        homing_phases.append((homing_phase, stepper_joint.homed, stepper_joint.stepper.get_position()))
+
+    stepper_joint.set_on_homing_phase_handler(on_homing_phase_handler)
+    return homing_phases
+
+
+def test_home_latches_where_the_switch_activates(simulator, wait_until):
+    stepper_joint = _open_joint(simulator, wait_until, -500)
+    homing_phases = _record_homing_phases(stepper_joint)
+    homed = []
+    stepper_joint.set_on_homed_handler(homed.append)
+    stepper_joint.home()
+    assert wait_until(lambda: homed)
+    assert [homing_phase for homing_phase, _, _ in homing_phases] == [HOMING_FAST_APPROACH, HOMING_BACK_OFF,
+                                                                       HOMING_CREEP, HOMING_HOMED]
+    assert homing_phases[-1][1]
+    assert stepper_joint.homed
+    assert not stepper_joint.homing
+    assert wait_until(lambda: not stepper_joint.stepper.is_moving())
+    assert stepper_joint.stepper.get_position() == 0.0
+    stepper_joint.close()
+
+
+def test_home_clears_an_active_switch_at_the_absolute_target(simulator, wait_until):
+    stepper_joint = _open_joint(simulator, wait_until, 500)
+    stepper_joint.stepper_joint_info.deactivate_home_switch_target_position = 1000
+    stepper_joint.home_switch._digital_input_handle.simulate_state(True)
+    assert wait_until(stepper_joint.home_switch.is_active)
+    homing_phases = _record_homing_phases(stepper_joint)
+    stepper_joint.home()
+    assert wait_until(lambda: stepper_joint.homing_phase == HOMING_HOMED)
+    assert homing_phases[0][0] == HOMING_CLEAR_SWITCH
+    assert homing_phases[1][0] == HOMING_FAST_APPROACH
+    assert homing_phases[1][2] == 1000
+    assert stepper_joint.homed
+    stepper_joint.close()
+
+
+def test_home_backs_off_against_a_positive_home_velocity(simulator, wait_until):
+    stepper_joint = _open_joint(simulator, wait_until, 500, active_below=False, home_direction=1)
+    homing_phases = _record_homing_phases(stepper_joint)
+    stepper_joint.home()
+    assert wait_until(lambda: stepper_joint.homing_phase == HOMING_HOMED)
+    assert [homing_phase for homing_phase, _, _ in homing_phases] == [HOMING_FAST_APPROACH, HOMING_BACK_OFF,
+                                                                       HOMING_CREEP, HOMING_HOMED]
+    assert homing_phases[2][2] < homing_phases[1][2]
+    assert stepper_joint.homed
+    stepper_joint.close()
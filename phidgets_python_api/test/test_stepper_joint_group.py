@@ -0,0 +1,114 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import logging
+
+from phidgets_python_api.stepper_joint import StepperJointInfo
+from phidgets_python_api.stepper_joint_group import (StepperJointGroup, StepperJointGroupInfo,
+                                                     synchronized_trapezoidal_profiles)
+
+logger = logging.getLogger(__name__)
+
+
+def _open_group(wait_until):
+    stepper_joint_group_info = StepperJointGroupInfo()
+    for index, joint_name in enumerate(['x', 'y']):
+        stepper_joint_info = StepperJointInfo()
+        stepper_joint_info.stepper_info.phidget_info.hub_port = index
+        stepper_joint_info.stepper_info.data_interval = 1
+        stepper_joint_info.stepper_info.acceleration = 100000
+        stepper_joint_info.home_switch_info.phidget_info.hub_port = index + 2
+        stepper_joint_group_info.stepper_joints_info[joint_name] = stepper_joint_info
+    stepper_joint_group = StepperJointGroup(stepper_joint_group_info, 'group', logger)
+    stepper_joint_group.open()
+    assert wait_until(stepper_joint_group.is_attached)
+    return stepper_joint_group
+
+
+def test_synchronized_profiles_share_duration():
+    duration, velocity_limits, accelerations = synchronized_trapezoidal_profiles([100.0, -50.0], [10.0, 10.0], [10.0, 10.0])
+    assert duration == 11.0
+    assert velocity_limits == [10.0, 5.0]
+    assert accelerations == [10.0, 5.0]
+
+
+def test_move_to_restores_limits_and_stopped_handlers(simulator, wait_until):
+    stepper_joint_group = _open_group(wait_until)
+    stepper = stepper_joint_group.stepper_joints['x'].stepper
+    stepper_stopped = []
+
+    def on_stopped_handler(handle):
+        stepper_stopped.append(handle)
+
+    stepper.set_on_stopped_handler(on_stopped_handler)
+    group_stopped = []
+    stepper_joint_group.set_on_stopped_handler(group_stopped.append)
+    stepper_joint_group.move_to({'x': 1000, 'y': 10})
+    assert wait_until(lambda: group_stopped)
+    assert stepper_joint_group.get_positions() == {'x': 1000, 'y': 10}
+    assert len(stepper_stopped) == 1
+    assert stepper.get_on_stopped_handler() is on_stopped_handler
+    for stepper_joint in stepper_joint_group.stepper_joints.values():
+        assert stepper_joint.stepper.get_acceleration() == 100000
+        assert stepper_joint.stepper.get_velocity_limit() == 10000
+        assert stepper_joint.stepper.get_on_stopped_handler() in (on_stopped_handler, None)
+    stepper_joint_group.close()
+
+
+def test_move_to_clamps_velocity_to_minimum(simulator, wait_until):
+    stepper_joint_group = _open_group(wait_until)
+    for stepper_joint in stepper_joint_group.stepper_joints.values():
+        stepper_joint.stepper._stepper_handle._min_velocity_limit = 500.0
+    velocity_limits = []
+    stepper = stepper_joint_group.stepper_joints['y'].stepper
+    set_velocity_limit = stepper.set_velocity_limit
+
+    def record_velocity_limit(velocity_limit):
+        velocity_limits.append(velocity_limit)
+        set_velocity_limit(velocity_limit)
+
+    stepper.set_velocity_limit = record_velocity_limit
+    stepper_joint_group.move_to({'x': 10000, 'y': 1})
+    assert velocity_limits[0] == 500.0
+    stepper_joint_group.close()
+
+
+def test_stopped_move_does_not_resume(simulator, wait_until):
+    stepper_joint_group = _open_group(wait_until)
+    stepper_joint_group.stepper_joints['x'].stepper_joint_info.stepper_info.velocity_limit = 1000
+    stopped = []
+    stepper_joint_group.set_on_stopped_handler(stopped.append)
+    stepper_joint_group.move_to({'x': 100000})
+    assert wait_until(lambda: stepper_joint_group.get_positions()['x'] > 100)
+    stepper_joint_group.stop()
+    assert wait_until(lambda: stopped)
+    stepper = stepper_joint_group.stepper_joints['x'].stepper
+    assert wait_until(lambda: stepper.get_velocity_limit() == 10000)
+    position = stepper.get_position()
+    assert stepper.get_target_position() == position
+    assert not wait_until(lambda: stepper.get_position() != position, timeout=0.2)
+    stepper_joint_group.close()
@@ -0,0 +1,97 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import logging
+import time
+
+from phidgets_python_api.digital_input import DigitalInputInfo
+from phidgets_python_api.stepper import Stepper, StepperInfo
+from phidgets_python_api.stepper_joint import StepperJoint, StepperJointInfo
+
+logger = logging.getLogger(__name__)
+
+
+def _open_stepper(wait_until):
+    stepper_info = StepperInfo()
+    stepper_info.data_interval = 1
+    stepper = Stepper(stepper_info, 'stepper', logger)
+    stepper.open()
+    assert wait_until(stepper.is_attached)
+    return stepper
+
+
+def _assert_stationary(stepper, wait_until):
+    assert wait_until(lambda: not stepper.is_moving())
+    position = stepper.get_position()
+    time.sleep(0.1)
+    assert stepper.get_position() == position
+    assert not stepper.is_following_trajectory()
+
+
+def test_follow_trajectory_reaches_every_waypoint(simulator, wait_until):
+    stepper = _open_stepper(wait_until)
+    positions = []
+    stepper.set_on_position_change_handler(lambda handle, position: positions.append(position))
+    finished = []
+    stepper.follow_trajectory([100, 300, (200, 5000)], finished.append)
+    assert wait_until(lambda: finished)
+    assert stepper.get_position() == 200
+    assert max(positions) == 300
+    assert not stepper.is_following_trajectory()
+    assert stepper.get_velocity_limit() == stepper.stepper_info.velocity_limit
+    stepper.close()
+
+
+def test_stop_cancels_a_running_trajectory(simulator, wait_until):
+    stepper = _open_stepper(wait_until)
+    finished = []
+    stepper.follow_trajectory([(20000, 2000), (40000, 2000)], finished.append)
+    assert wait_until(lambda: stepper.get_position() > 100)
+    stepper.stop()
+    assert finished == [None]
+    _assert_stationary(stepper, wait_until)
+    assert stepper.get_position() < 1000
+    stepper.close()
+
+
+def test_limit_switch_stops_a_running_trajectory(simulator, wait_until):
+    stepper_joint_info = StepperJointInfo()
+    stepper_joint_info.stepper_info.data_interval = 1
+    stepper_joint_info.home_switch_info.phidget_info.hub_port = 1
+    stepper_joint_info.limit_switch_info = DigitalInputInfo()
+    stepper_joint_info.limit_switch_info.phidget_info.hub_port = 2
+    stepper_joint = StepperJoint(stepper_joint_info, 'joint', logger)
+    stepper_joint.open()
+    assert wait_until(stepper_joint.is_attached)
+    simulator.link_switch(stepper_joint.stepper._stepper_handle, stepper_joint.limit_switch._digital_input_handle,
+                          500, active_below=False)
+    stepper_joint.set_limit_switch_handler_to_stop()
+    stepper_joint.follow_trajectory([(20000, 2000), (40000, 2000)])
+    assert wait_until(lambda: stepper_joint.limit_switch.is_active())
+    _assert_stationary(stepper_joint.stepper, wait_until)
+    assert stepper_joint.stepper.get_position() < 1000
+    stepper_joint.close()
@@ -0,0 +1,87 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import numpy
+from phidgets_python_api.voltage_ratio_filter import (BiquadLowPassFilter, DecimateFilter, ExponentialFilter,
+                                                      FilterChain, MedianFilter, MovingAverageFilter)
+
+
+def test_moving_average_matches_window_mean():
+    values = numpy.random.default_rng(0).normal(size=200)
+    moving_average_filter = MovingAverageFilter(8)
+    outputs = [moving_average_filter.process(value) for value in values]
+    assert numpy.isclose(outputs[3], values[:4].mean())
+    assert numpy.allclose(outputs[7:], numpy.convolve(values, numpy.ones(8) / 8, mode='valid'))
+
+
+def test_moving_average_does_not_drift():
+    moving_average_filter = MovingAverageFilter(4)
+    for index in range(100000):
+        moving_average_filter.process(1e6 if index % 2 else 1e-6)
+    for index in range(4):
+        output = moving_average_filter.process(0.25)
+    assert output == 0.25
+
+
+def test_median_filter_matches_numpy():
+    values = numpy.random.default_rng(1).normal(size=300)
+    for window_size in (1, 4, 7):
+        median_filter = MedianFilter(window_size)
+        outputs = [median_filter.process(value) for value in values]
+        for index in range(len(values)):
+            window = values[max(index - window_size + 1, 0):index + 1]
+            assert outputs[index] == numpy.median(window)
+
+
+def test_median_filter_rejects_spike():
+    median_filter = MedianFilter(3)
+    outputs = [median_filter.process(value) for value in [1.0, 1.0, 100.0, 1.0, 1.0]]
+    assert outputs[2:] == [1.0, 1.0, 1.0]
+
+
+def test_exponential_filter_starts_at_first_value():
+    exponential_filter = ExponentialFilter(0.5)
+    assert exponential_filter.process(2.0) == 2.0
+    assert exponential_filter.process(4.0) == 3.0
+
+
+def test_biquad_passes_constant():
+    biquad_low_pass_filter = BiquadLowPassFilter(10.0, 1000.0)
+    outputs = [biquad_low_pass_filter.process(0.5) for index in range(100)]
+    assert numpy.allclose(outputs, 0.5)
+
+
+def test_decimate_outputs_window_mean_at_decimated_rate():
+    decimate_filter = DecimateFilter(4)
+    outputs = [decimate_filter.process(float(index)) for index in range(12)]
+    assert outputs == [None, None, None, 1.5, None, None, None, 5.5, None, None, None, 9.5]
+
+
+def test_filter_chain_stops_at_decimation():
+    filter_chain = FilterChain([DecimateFilter(2), MovingAverageFilter(2)])
+    outputs = [filter_chain.process(value) for value in [1.0, 3.0, 5.0, 7.0]]
+    assert outputs == [None, 2.0, None, 4.0]
@@ -0,0 +1,93 @@
+# Copyright (c) 2020, Howard Hughes Medical Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the copyright holder nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import logging
+
+import numpy
+from phidgets_python_api.voltage_ratio_input_group import VoltageRatioInputGroup, VoltageRatioInputGroupInfo
+
+logger = logging.getLogger(__name__)
+
+
+def _create_group(capture_buffer_size=16):
+    voltage_ratio_input_group_info = VoltageRatioInputGroupInfo()
+    voltage_ratio_input_group_info.channels = [0, 1]
+    voltage_ratio_input_group_info.voltage_ratio_input_info.capture_buffer_size = capture_buffer_size
+    voltage_ratio_input_group = VoltageRatioInputGroup(voltage_ratio_input_group_info, 'group', logger)
+    for voltage_ratio_input in voltage_ratio_input_group.voltage_ratio_inputs:
+        voltage_ratio_input.start_capture()
+    return voltage_ratio_input_group
+
+
+def _write(voltage_ratio_input, timestamps, voltage_ratios):
+    for timestamp, voltage_ratio in zip(timestamps, voltage_ratios):
+        voltage_ratio_input._capture_buffer.write(timestamp, voltage_ratio)
+
+
+def test_read_frame_aligns_channels(simulator):
+    voltage_ratio_input_group = _create_group()
+    first, second = voltage_ratio_input_group.voltage_ratio_inputs
+    _write(first, [0.0, 1.0, 2.0, 3.0], [0.0, 1.0, 2.0, 3.0])
+    _write(second, [0.5, 2.5], [5.0, 25.0])
+    timestamps, frame = voltage_ratio_input_group.read_frame()
+    assert timestamps.tolist() == [0.0, 1.0, 2.0]
+    assert numpy.allclose(frame[:, 0], [0.0, 1.0, 2.0])
+    assert numpy.allclose(frame[:, 1], [5.0, 10.0, 20.0])
+
+
+def test_silent_channel_bounds_pending_samples(simulator):
+    voltage_ratio_input_group = _create_group(capture_buffer_size=16)
+    first, second = voltage_ratio_input_group.voltage_ratio_inputs
+    for block in range(10):
+        _write(first, range(block * 10, block * 10 + 10), [1.0] * 10)
+        assert voltage_ratio_input_group.read_frame() is None
+        assert len(voltage_ratio_input_group._pending[0][0]) <= 16
+    assert voltage_ratio_input_group.dropped_sample_count == 100 - 16
+    _write(second, [95.0], [2.0])
+    timestamps, frame = voltage_ratio_input_group.read_frame()
+    assert timestamps[0] == 84.0
+
+
+def test_frame_handler_exception_keeps_frames_running(simulator, wait_until):
+    voltage_ratio_input_group = _create_group()
+    voltage_ratio_input_group.voltage_ratio_input_group_info.frame_interval = 1
+    first, second = voltage_ratio_input_group.voltage_ratio_inputs
+    frame_count = []
+
+    def on_frame_handler(timestamps, frame):
+        frame_count.append(len(timestamps))
+        raise RuntimeError('handler failed')
+
+    voltage_ratio_input_group.set_on_frame_handler(on_frame_handler)
+    voltage_ratio_input_group._start_frames()
+    _write(first, [0.0], [0.0])
+    _write(second, [0.0], [0.0])
+    assert wait_until(lambda: len(frame_count) == 1)
+    _write(first, [1.0], [1.0])
+    _write(second, [1.0], [1.0])
+    assert wait_until(lambda: len(frame_count) == 2)
+    voltage_ratio_input_group._stop_frames()